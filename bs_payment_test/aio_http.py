@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+BS支付系统 - HTTP服务端与客户端（aiohttp 的薄封装）
+
+用于回调接收服务、本地模拟网关和压测工具，HTTP协议处理全部由 aiohttp 完成，本模块只统一
+处理协程签名、JSON编解码和异常类型:
+1. HTTPServer: aiohttp.web 服务，所有路径交给一个处理协程；
+   keep-alive、chunked请求体、非法头部（400）、请求体上限（413）由 aiohttp 处理
+2. HTTPConnection: keep-alive客户端（压测），单连接
+3. post_json: 一次性POST JSON（回调推送），支持 http/https
+
+网络错误统一抛出 ConnectionError，调用方无需依赖 aiohttp 的异常类型。
+
+作者: OpenClaw
+日期: 2026-02-11
+"""
+
+import json
+import asyncio
+from typing import Awaitable, Callable, Dict, Optional, Tuple, Union
+from urllib.parse import parse_qsl
+
+import aiohttp
+from aiohttp import web
+
+# 请求体上限（字节），超过返回413
+MAX_BODY_SIZE = 1024 * 1024
+
+Body = Union[bytes, Dict]
+Handler = Callable[["HTTPRequest"], Awaitable[Tuple[int, Body]]]
+
+
+class HTTPRequest:
+    """HTTP请求"""
+
+    __slots__ = ("method", "path", "query", "headers", "body")
+
+    def __init__(self, method: str, path: str, query: str, headers: Dict[str, str], body: bytes):
+        self.method = method
+        self.path = path
+        self.query = query
+        self.headers = headers
+        self.body = body
+
+    def json(self) -> Dict:
+        """
+        解析请求体（JSON或表单）
+
+        Raises:
+            ValueError: 不是合法的JSON，或JSON不是对象（如数组、字符串）
+        """
+        content_type = self.headers.get("content-type", "")
+        if "application/x-www-form-urlencoded" in content_type:
+            return dict(parse_qsl(self.body.decode("utf-8"), keep_blank_values=True))
+        data = json.loads(self.body or b"{}")
+        if not isinstance(data, dict):
+            raise ValueError(f"请求体必须是JSON对象，实际为 {type(data).__name__}")
+        return data
+
+
+def _encode_body(body: Body) -> bytes:
+    if isinstance(body, (bytes, bytearray)):
+        return bytes(body)
+    return json.dumps(body, ensure_ascii=False).encode("utf-8")
+
+
+# ============== 服务端 ==============
+class HTTPServer:
+    """HTTP服务端（aiohttp.web，全部路径交给同一个处理协程）"""
+
+    def __init__(
+        self,
+        handler: Handler,
+        host: str = "127.0.0.1",
+        port: int = 8000,
+        max_body_size: int = MAX_BODY_SIZE
+    ):
+        """
+        Args:
+            handler: 处理协程，接收HTTPRequest，返回 (状态码, dict或bytes)
+            host: 监听地址
+            port: 监听端口（0为随机端口）
+            max_body_size: 请求体上限（字节）
+        """
+        self.handler = handler
+        self.host = host
+        self.port = port
+        self.max_body_size = max_body_size
+        self._runner: Optional[web.AppRunner] = None
+
+    async def start(self) -> "HTTPServer":
+        """启动监听"""
+        app = web.Application(client_max_size=self.max_body_size)
+        app.router.add_route("*", "/{tail:.*}", self._handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port, backlog=1024)
+        await site.start()
+        self.port = self._runner.addresses[0][1]
+        return self
+
+    async def serve_forever(self):
+        """持续运行"""
+        if self._runner is None:
+            await self.start()
+        try:
+            await asyncio.Event().wait()
+        finally:
+            await self.stop()
+
+    async def stop(self):
+        """停止监听并关闭已建立的keep-alive连接"""
+        if self._runner is not None:
+            runner, self._runner = self._runner, None
+            await runner.cleanup()
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        try:
+            body = await request.read()
+        except web.HTTPException as e:
+            # 请求体超过上限等
+            return self._response(e.status, {"code": "fail", "msg": e.reason})
+
+        http_request = HTTPRequest(
+            request.method.upper(), request.path, request.query_string,
+            {name.lower(): value for name, value in request.headers.items()}, body
+        )
+        try:
+            status, payload = await self.handler(http_request)
+        except Exception as e:
+            status, payload = 500, {"code": "fail", "msg": str(e)}
+        return self._response(status, payload)
+
+    @staticmethod
+    def _response(status: int, payload: Body) -> web.Response:
+        return web.Response(
+            status=status, body=_encode_body(payload),
+            content_type="application/json", charset="utf-8"
+        )
+
+
+# ============== 客户端 ==============
+class HTTPConnection:
+    """单连接keep-alive HTTP客户端（请求串行，并发请使用多个连接）"""
+
+    def __init__(self, host: str, port: int, scheme: str = "http"):
+        self.host = host
+        self.port = port
+        self.base_url = f"{scheme}://{host}:{port}"
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    async def connect(self):
+        self._session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=1),
+            timeout=aiohttp.ClientTimeout(total=None)
+        )
+
+    async def request(
+        self,
+        method: str,
+        path: str,
+        body: Body = b"",
+        headers: Dict[str, str] = None
+    ) -> Tuple[int, bytes]:
+        """
+        发送请求（连接断开时由连接池重连）
+
+        Returns:
+            (状态码, 响应体)
+
+        Raises:
+            ConnectionError: 网络错误
+        """
+        if self._session is None:
+            await self.connect()
+        request_headers = {"Content-Type": "application/json"}
+        request_headers.update(headers or {})
+        try:
+            async with self._session.request(
+                method, self.base_url + path, data=_encode_body(body), headers=request_headers
+            ) as response:
+                return response.status, await response.read()
+        except aiohttp.ClientError as e:
+            raise ConnectionError(str(e) or type(e).__name__) from e
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+        self._session = None
+
+
+async def post_json(url: str, data: Dict, timeout: float = 10) -> Tuple[int, Dict]:
+    """
+    一次性POST JSON（用于回调推送等低频场景，支持 http/https）
+
+    Returns:
+        (状态码, 响应JSON)
+
+    Raises:
+        ConnectionError: 网络错误
+        asyncio.TimeoutError: 超时
+    """
+    try:
+        async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=timeout)) as session:
+            async with session.post(url, data=_encode_body(data),
+                                    headers={"Content-Type": "application/json"}) as response:
+                payload = await response.read()
+                status = response.status
+    except aiohttp.ClientError as e:
+        raise ConnectionError(str(e) or type(e).__name__) from e
+    try:
+        return status, json.loads(payload or b"{}")
+    except ValueError:
+        return status, {"raw": payload.decode("utf-8", "replace")}
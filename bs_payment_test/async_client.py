@@ -0,0 +1,325 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+BS支付系统 - 异步API客户端
+
+功能:
+1. 基于asyncio + aiohttp，业务方法与BSClient一一对应
+2. 信号量限流的批量提交（如: 1万笔订单，并发64）
+3. 结果按提交顺序返回，附带单次调用耗时
+4. RSA签名提交到签名进程池（batch_sign），不阻塞事件循环，并发请求的签名可同时使用多个核
+
+使用示例:
+    async with AsyncBSClient("test") as client:
+        result = await client.query_balance("USDT", use_cache=False)
+
+        specs = [
+            {"method": "create_collection_order",
+             "params": {"amount": "10", "coin_type": "USDT_TRC20", "callback_currency_code": "USDT"}}
+            for _ in range(10000)
+        ]
+        results = await client.submit_many(specs, concurrency=64)
+
+作者: OpenClaw
+日期: 2026-02-11
+"""
+
+import time
+import asyncio
+from typing import Dict, List, Optional
+
+import aiohttp
+
+import serializer
+from batch_sign import get_batch_signer
+from bs_api_client import BSClient, CONFIG
+from retry import EXISTS, HTTP_5XX, INVALID, MISSING, NETWORK, REJECTED, TIMEOUT
+
+
+class AsyncBSClient(BSClient):
+    """
+    异步BS支付API客户端
+
+    继承BSClient的参数构建与签名逻辑，仅将 _request 替换为协程，
+    因此 create_collection_order / query_remit_order 等所有业务方法
+    在本类中都返回可await的协程，参数与BSClient完全相同。
+    """
+
+    def __init__(
+        self,
+        env: str = "test",
+        concurrency: int = 64,
+        merchant: Dict = None,
+        verbose: bool = True,
+        sign_executor: str = "process",
+        sign_workers: int = None
+    ):
+        """
+        初始化客户端
+
+        Args:
+            env: 环境（test/production）
+            concurrency: submit_many 默认并发数，同时也是每个主机的连接上限
+            merchant: 商户配置，默认 CONFIG["merchant"]
+            verbose: 是否打印初始化信息
+            sign_executor: RSA签名执行器，process（进程池）或 thread（线程池，依赖OpenSSL释放GIL）
+            sign_workers: 签名进程/线程数（默认CPU核数）
+        """
+        super().__init__(env, merchant, verbose)
+        self.concurrency = concurrency
+        self.sign_executor = sign_executor
+        self.sign_workers = sign_workers
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        """获取aiohttp会话（需在事件循环内首次调用）"""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=max(self.concurrency, self.transport.pool_maxsize),
+                limit_per_host=self.concurrency,
+                keepalive_timeout=30
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                headers={
+                    "Content-Type": "application/json",
+                    "Accept": "application/json"
+                }
+            )
+        return self._session
+
+    def _get_timeout(self, endpoint: str) -> aiohttp.ClientTimeout:
+        """将传输层的端点超时转换为aiohttp超时"""
+        timeout = self.transport.get_timeout(endpoint)
+        if isinstance(timeout, tuple):
+            return aiohttp.ClientTimeout(sock_connect=timeout[0], sock_read=timeout[1])
+        return aiohttp.ClientTimeout(total=timeout)
+
+    async def _request(self, endpoint: str, params: Dict, sign_type: str = "RSA") -> Dict:
+        """
+        发起HTTP请求（异步，重试规则与BSClient._request相同）
+
+        Args:
+            endpoint: API端点
+            params: 请求参数
+            sign_type: 签名类型
+
+        Returns:
+            响应结果；下单失败后经查询确认订单已存在时，返回查询结果
+        """
+        policy = self.retry_policy
+        policy.start()
+        confirm_endpoint = policy.confirm_endpoint(endpoint)
+        submit_time = self._get_timestamp() if confirm_endpoint else None
+
+        attempt = 0
+        while True:
+            result, failure = await self._send(endpoint, params, sign_type)
+            attempt += 1
+            if confirm_endpoint and attempt > 1 and failure is None and policy.is_duplicate(result):
+                confirmed = await self._request(confirm_endpoint, self._confirm_params(params, submit_time))
+                return confirmed if str(confirmed.get("code")) == "0" else result
+            if not policy.should_retry(endpoint, attempt, failure):
+                if confirm_endpoint and policy.is_ambiguous(failure):
+                    return policy.unknown_result(result, params["merchantOrderNo"])
+                return result
+
+            await asyncio.sleep(policy.backoff(attempt))
+            if confirm_endpoint:
+                confirmed = await self._request(confirm_endpoint, self._confirm_params(params, submit_time))
+                state = policy.confirmation(confirmed)
+                if state == EXISTS:
+                    return confirmed
+                if state != MISSING:
+                    return policy.unknown_result(result, params["merchantOrderNo"])
+
+    async def _send(self, endpoint: str, params: Dict, sign_type: str = "RSA") -> tuple:
+        """
+        发送一次请求（异步，不重试）
+
+        Returns:
+            (响应结果, 失败类型)；网关正常应答时失败类型为None
+        """
+        url = f"{self.base_url}{endpoint}"
+        log = self.request_log
+
+        guard = self._guard(endpoint)
+        rejected, wait = guard.admit()
+        if rejected:
+            log.log_error(endpoint, rejected, 0.0)
+            return {"code": -1, "msg": rejected}, REJECTED
+        if wait:
+            await asyncio.sleep(wait)
+
+        data = await self._build_params_async(params, sign_type, endpoint)
+
+        sampled = log.sampled()
+        if sampled:
+            log.log_request(endpoint, url, data)
+
+        start = time.perf_counter()
+        status = None
+        try:
+            session = self._get_session()
+            async with session.post(
+                url,
+                data=serializer.dumps(data),
+                timeout=self._get_timeout(endpoint)
+            ) as response:
+                status = response.status
+                guard.record(status < 500)
+                result = serializer.loads(await response.read())
+
+                log.log_response(endpoint, status, result,
+                                 (time.perf_counter() - start) * 1000, sampled)
+
+                return result, HTTP_5XX if status >= 500 else None
+
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+            if status is None:
+                guard.record(False)
+                failure = TIMEOUT if isinstance(e, asyncio.TimeoutError) else NETWORK
+            elif status >= 500:
+                failure = HTTP_5XX
+            else:
+                failure = INVALID if isinstance(e, ValueError) else NETWORK
+            log.log_error(endpoint, e, (time.perf_counter() - start) * 1000)
+            return {"code": -1, "msg": str(e) or type(e).__name__}, failure
+
+    async def _build_params_async(self, params: Dict, sign_type: str, endpoint: str) -> Dict:
+        """构建请求参数；RSA签名在签名进程池中计算，事件循环只等待结果"""
+        private_key = self.config["rsa_private_key"]
+        if sign_type != "RSA" or not private_key:
+            return self._build_params(params, sign_type, endpoint)
+
+        data = self._build_params(params, sign_type, endpoint, sign=False)
+        signer = get_batch_signer(private_key, "SHA1", self.sign_workers, self.sign_executor)
+        data["sign"] = await asyncio.wrap_future(signer.submit(data))
+        return data
+
+    def _cached(self, cache, kind: str, coin_type: str, loader):
+        """读穿缓存（协程版本，loader返回协程）"""
+        key = (self.base_url, self.config["id"], coin_type)
+        ttl = CONFIG["cache"][kind]["ttl_by_coin"].get(coin_type)
+        return cache.get_or_load_async(key, loader, ttl)
+
+    async def close(self):
+        """关闭会话"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    # ============== 批量提交 ==============
+    async def submit_many(
+        self,
+        specs: List[Dict],
+        concurrency: int = None
+    ) -> List[Dict]:
+        """
+        批量并发调用（信号量限流）
+
+        Args:
+            specs: 调用列表，每项为 {"method": 方法名, "params": 关键字参数}
+                   方法名为BSClient的任意业务方法，如 create_remit_order
+            concurrency: 最大并发数（默认使用初始化时的concurrency）
+
+        Returns:
+            按提交顺序排列的结果列表，每项为:
+            {"index", "method", "result", "latency_ms", "error"}
+        """
+        semaphore = asyncio.Semaphore(concurrency or self.concurrency)
+
+        async def run_one(index: int, spec: Dict) -> Dict:
+            method_name = spec["method"]
+            async with semaphore:
+                start = time.perf_counter()
+                try:
+                    method = getattr(self, method_name)
+                    result = await method(**spec.get("params", {}))
+                    error = None
+                except Exception as e:
+                    result = None
+                    error = f"{type(e).__name__}: {e}"
+                latency_ms = (time.perf_counter() - start) * 1000
+
+            return {
+                "index": index,
+                "method": method_name,
+                "result": result,
+                "latency_ms": latency_ms,
+                "error": error
+            }
+
+        # gather 保证结果顺序与提交顺序一致
+        return await asyncio.gather(*(run_one(i, spec) for i, spec in enumerate(specs)))
+
+
+# ============== 便捷函数 ==============
+def run_many(specs: List[Dict], env: str = "test", concurrency: int = 64) -> List[Dict]:
+    """
+    同步入口: 创建异步客户端并批量提交
+
+    Args:
+        specs: 调用列表（格式同 AsyncBSClient.submit_many）
+        env: 环境
+        concurrency: 最大并发数
+
+    Returns:
+        按提交顺序排列的结果列表
+    """
+    async def _run():
+        async with AsyncBSClient(env, concurrency=concurrency) as client:
+            return await client.submit_many(specs)
+
+    return asyncio.run(_run())
+
+
+def main():
+    """主程序入口: 批量查询余额，观察并发耗时"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="BS支付系统 - 异步批量调用")
+    parser.add_argument("--env", "-e", choices=["test", "production", "mock"],
+                        default="test", help="环境配置")
+    parser.add_argument("--count", "-n", type=int, default=100, help="调用次数")
+    parser.add_argument("--concurrency", "-c", type=int, default=64, help="并发数")
+    parser.add_argument("--log-level", choices=["DEBUG", "INFO", "WARNING", "ERROR", "OFF"],
+                        default="WARNING", help="请求日志级别（批量运行默认只记录失败）")
+    parser.add_argument("--log-sample", type=float, default=0.01, help="INFO请求日志采样率")
+    parser.add_argument("--log-jsonl", default="", help="请求日志JSON Lines文件路径")
+
+    args = parser.parse_args()
+
+    CONFIG["logging"].update(
+        level=args.log_level,
+        sample_rate=args.log_sample,
+        jsonl_path=args.log_jsonl
+    )
+
+    # 绕过余额缓存，每次调用都请求网关
+    specs = [{"method": "query_balance", "params": {"coin_type": "USDT", "use_cache": False}}] * args.count
+
+    start = time.perf_counter()
+    results = run_many(specs, args.env, args.concurrency)
+    elapsed = time.perf_counter() - start
+
+    latencies = sorted(r["latency_ms"] for r in results)
+    ok = sum(1 for r in results if r["result"] and r["result"].get("code") == "0")
+
+    print("\n" + "=" * 60)
+    print(f"📊 {args.count} 次调用，并发 {args.concurrency}")
+    print(f"   成功: {ok}")
+    print(f"   总耗时: {elapsed:.2f}s（{args.count / elapsed:.1f} 次/秒）")
+    if latencies:
+        print(f"   p50: {latencies[len(latencies) // 2]:.1f}ms")
+        print(f"   最大: {latencies[-1]:.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+BS/CFB支付系统 - RSA批量签名
+
+RSA签名是CPU密集型操作，单线程批量预签名时只能用满一个核。
+BatchSigner 把签名分发到进程池（或线程池）:
+1. 结果按输入顺序返回
+2. 私钥PEM只在工作进程启动时传递一次，由进程内的KEY_REGISTRY缓存，
+   每个任务只传参数字典
+3. 签名串构建也在工作进程中完成
+
+使用示例:
+    with BatchSigner(private_pem, hash_name="SHA1") as signer:
+        signs = signer.sign_many(params_list)
+
+    # 单条异步签名（不阻塞事件循环）
+    sign = await asyncio.wrap_future(signer.submit(params))
+
+作者: OpenClaw
+日期: 2026-02-11
+"""
+
+import os
+import base64
+import threading
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.asymmetric import padding
+
+from keystore import KEY_REGISTRY
+from sign_string import build_sign_string
+
+HASHES = {
+    "SHA1": hashes.SHA1,
+    "SHA256": hashes.SHA256
+}
+
+# ============== 工作进程 ==============
+# 工作进程内的签名上下文（由initializer设置一次）
+_worker_key = None
+_worker_hash = None
+
+
+def _init_worker(private_pem: str, hash_name: str):
+    """工作进程初始化: 解析私钥一次并缓存"""
+    global _worker_key, _worker_hash
+    _worker_key = KEY_REGISTRY.private_key(private_pem)
+    _worker_hash = HASHES[hash_name]()
+
+
+def _sign_in_worker(params: Dict) -> str:
+    """在工作进程中签名单个参数字典"""
+    signature = _worker_key.sign(
+        build_sign_string(params).encode("utf-8"),
+        padding.PKCS1v15(),
+        _worker_hash
+    )
+    return base64.b64encode(signature).decode("utf-8")
+
+
+def rsa_sign_params(params: Dict, private_pem: str, hash_name: str = "SHA1") -> str:
+    """单个参数字典RSA签名（线程池模式及单条调用使用）"""
+    signature = KEY_REGISTRY.private_key(private_pem).sign(
+        build_sign_string(params).encode("utf-8"),
+        padding.PKCS1v15(),
+        HASHES[hash_name]()
+    )
+    return base64.b64encode(signature).decode("utf-8")
+
+
+# ============== 批量签名器 ==============
+class BatchSigner:
+    """RSA批量签名器"""
+
+    def __init__(
+        self,
+        private_key: str,
+        hash_name: str = "SHA1",
+        workers: int = None,
+        executor: str = "process"
+    ):
+        """
+        初始化批量签名器
+
+        Args:
+            private_key: RSA私钥PEM
+            hash_name: 摘要算法（SHA1/SHA256）
+            workers: 工作进程/线程数（默认CPU核数）
+            executor: process（进程池）或 thread（线程池，依赖OpenSSL释放GIL）
+
+        Raises:
+            ValueError: 私钥为空或无法解析、算法或执行器不支持
+        """
+        if not private_key:
+            raise ValueError("RSA私钥为空")
+        if hash_name not in HASHES:
+            raise ValueError(f"不支持的摘要算法: {hash_name}")
+        if executor not in ("process", "thread"):
+            raise ValueError(f"不支持的执行器: {executor}")
+
+        # 在本进程先解析一次: 私钥无效时直接报错，而不是在工作进程初始化时失败（BrokenProcessPool）
+        KEY_REGISTRY.private_key(private_key)
+
+        self.private_key = private_key
+        self.hash_name = hash_name
+        self.workers = workers or os.cpu_count() or 1
+        self.executor_type = executor
+        self._executor: Optional[Executor] = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _get_executor(self) -> Executor:
+        """懒创建执行器（进程池启动开销较大，跨批次复用）"""
+        if self._executor is None:
+            if self.executor_type == "process":
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    initializer=_init_worker,
+                    initargs=(self.private_key, self.hash_name)
+                )
+            else:
+                # 线程共享本进程的KEY_REGISTRY（初始化时已解析）
+                self._executor = ThreadPoolExecutor(max_workers=self.workers)
+        return self._executor
+
+    def sign_many(self, params_list: List[Dict], chunksize: int = None) -> List[str]:
+        """
+        批量签名
+
+        Args:
+            params_list: 参数字典列表
+            chunksize: 每个任务包含的参数个数（默认按工作数自动计算）
+
+        Returns:
+            签名列表，与输入顺序一致
+        """
+        if not params_list:
+            return []
+
+        executor = self._get_executor()
+
+        if self.executor_type == "process":
+            if chunksize is None:
+                chunksize = max(1, len(params_list) // (self.workers * 4))
+            return list(executor.map(_sign_in_worker, params_list, chunksize=chunksize))
+
+        return list(executor.map(
+            rsa_sign_params,
+            params_list,
+            [self.private_key] * len(params_list),
+            [self.hash_name] * len(params_list)
+        ))
+
+    def submit(self, params: Dict) -> Future:
+        """
+        提交单个参数字典签名（异步客户端逐条签名时使用）
+
+        Returns:
+            concurrent.futures.Future，结果为签名（Base64编码）
+        """
+        executor = self._get_executor()
+        if self.executor_type == "process":
+            return executor.submit(_sign_in_worker, params)
+        return executor.submit(rsa_sign_params, params, self.private_key, self.hash_name)
+
+    def close(self):
+        """关闭执行器"""
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+
+# ============== 共享签名器 ==============
+_signers: Dict[Tuple[str, str, str, int], BatchSigner] = {}
+_signers_lock = threading.Lock()
+
+
+def get_batch_signer(
+    private_key: str,
+    hash_name: str = "SHA1",
+    workers: int = None,
+    executor: str = "process"
+) -> BatchSigner:
+    """
+    获取共享的批量签名器（同一私钥/算法/执行器复用同一个进程池）
+
+    Returns:
+        BatchSigner实例
+    """
+    key = (KEY_REGISTRY.fingerprint(private_key), hash_name, executor, workers or 0)
+    signer = _signers.get(key)
+    if signer is None:
+        with _signers_lock:
+            signer = _signers.get(key)
+            if signer is None:
+                signer = _signers[key] = BatchSigner(private_key, hash_name, workers, executor)
+    return signer
+
+
+def shutdown_batch_signers():
+    """关闭所有共享签名器"""
+    with _signers_lock:
+        for signer in _signers.values():
+            signer.close()
+        _signers.clear()
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+BS支付系统 - 订单号生成器基准测试与唯一性压测
+
+1. 单线程吞吐: 旧实现（时间戳 + 4位随机数）与雪花算法对比
+2. 多线程: 共享一个生成器并发生成，检查重复
+3. 多进程: 每个进程独立机器号（显式指定，以及未设置 BS_WORKER_ID 时的默认租用），合并后检查重复
+
+使用示例:
+    python bench_order_no.py
+    python bench_order_no.py --count 1000000 --threads 8 --processes 4
+"""
+
+import random
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import List
+
+from order_id import OrderNoGenerator, default_worker_id
+
+MAX_LENGTH = 30
+
+
+def legacy_order_no(prefix: str = "") -> str:
+    """旧实现（原 BSClient._generate_order_no）"""
+    timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
+    random_suffix = str(random.randint(1000, 9999))
+    return f"{prefix}{timestamp}{random_suffix}"
+
+
+def bench_single(count: int):
+    """单线程吞吐"""
+    print("\n📊 单线程吞吐")
+
+    start = time.perf_counter()
+    legacy = [legacy_order_no("CZ") for _ in range(count)]
+    elapsed = time.perf_counter() - start
+    print(f"   旧实现:   {count / elapsed:>12,.0f} 个/秒  重复 {count - len(set(legacy)):,}")
+
+    generator = OrderNoGenerator(worker_id=1)
+    next_order_no = generator.next_order_no
+    start = time.perf_counter()
+    ids = [next_order_no("CZ") for _ in range(count)]
+    elapsed = time.perf_counter() - start
+    print(f"   雪花算法: {count / elapsed:>12,.0f} 个/秒  重复 {count - len(set(ids)):,}")
+
+    next_id = generator.next_id
+    start = time.perf_counter()
+    for _ in range(count):
+        next_id()
+    elapsed = time.perf_counter() - start
+    print(f"   整数ID:   {count / elapsed:>12,.0f} 个/秒")
+
+    lengths = {len(i) for i in ids}
+    assert max(lengths) <= MAX_LENGTH, f"订单号超长: {lengths}"
+    assert all(i[2:].isdigit() for i in ids[:1000])
+    print(f"   订单号长度: {sorted(lengths)}  示例: {ids[0]}")
+
+
+def bench_threads(count: int, threads: int):
+    """多线程共享生成器"""
+    print(f"\n🧵 {threads} 个线程共享生成器，每线程 {count:,} 个")
+
+    generator = OrderNoGenerator(worker_id=2)
+    results: List[List[str]] = [None] * threads
+
+    def worker(index: int):
+        results[index] = [generator.next_order_no("DF") for _ in range(count)]
+
+    workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    start = time.perf_counter()
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    elapsed = time.perf_counter() - start
+
+    total = count * threads
+    unique = len({i for r in results for i in r})
+    print(f"   吞吐: {total / elapsed:,.0f} 个/秒  重复: {total - unique:,}")
+    assert unique == total, "多线程生成的订单号出现重复"
+
+
+def _generate_in_process(args) -> List[str]:
+    worker_id, count = args
+    generator = OrderNoGenerator(worker_id=worker_id)
+    return [generator.next_order_no("CZ") for _ in range(count)]
+
+
+def bench_processes(count: int, processes: int, default_ids: bool = False):
+    """
+    多进程（不同机器号）
+
+    Args:
+        count: 每进程生成数量
+        processes: 进程数
+        default_ids: 使用默认机器号（default_worker_id，未设置 BS_WORKER_ID 时在本机租用）
+    """
+    mode = "默认机器号" if default_ids else "指定机器号"
+    print(f"\n🖥️  {processes} 个进程（{mode}），每进程 {count:,} 个")
+
+    tasks = [(None if default_ids else i, count) for i in range(processes)]
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        results = list(executor.map(_generate_in_process, tasks))
+    elapsed = time.perf_counter() - start
+
+    total = count * processes
+    unique = len({i for r in results for i in r})
+    workers = {OrderNoGenerator.parse(r[0])["worker_id"] for r in results}
+    print(f"   吞吐: {total / elapsed:,.0f} 个/秒（含进程启动）  机器号: {sorted(workers)}  重复: {total - unique:,}")
+    assert len(workers) == processes, "多个进程分配到了相同的机器号"
+    assert unique == total, "多进程生成的订单号出现重复"
+
+
+def main():
+    """主程序入口"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="订单号生成器基准测试")
+    parser.add_argument("--count", "-n", type=int, default=500000, help="每线程/进程生成数量")
+    parser.add_argument("--threads", type=int, default=8, help="线程数")
+    parser.add_argument("--processes", type=int, default=4, help="进程数")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("🚀 订单号生成器基准测试")
+    print("=" * 60)
+
+    bench_single(args.count)
+    bench_threads(args.count, args.threads)
+    bench_processes(args.count, args.processes)
+    print(f"\n   本进程默认机器号: {default_worker_id()}")
+    bench_processes(args.count, args.processes, default_ids=True)
+
+    print("\n✅ 未发现重复订单号")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+BS支付系统 - JSON序列化基准测试
+
+用典型网关报文对比各JSON后端:
+1. 编码: 已签名的下单请求（含RSA签名）
+2. 解码: 下单、订单查询、余额、汇率响应
+3. 类型化解码: 字节 → Result + 模型
+4. 旧路径: json.dumps请求 + 解码响应 + 打印时再 json.dumps 两次
+5. 内存: 持有大量订单时，响应dict与 CollectionOrder 模型的每单内存
+
+使用示例:
+    python bench_serializer.py
+    python bench_serializer.py --count 200000 --orders 500000
+"""
+
+import gc
+import json
+import time
+import tracemalloc
+from typing import Callable, Dict
+
+import serializer
+from models import CollectionOrder
+
+# 典型报文（与网关文档/模拟网关一致）
+SIGN = "Qm9ndXNTaWduYXR1cmU" * 18  # 约344字符，与RSA-2048签名的Base64长度相同
+
+REQUEST = {
+    "merchantOrderNo": "CZ0370022819795587072",
+    "amount": "10",
+    "coinType": "USDT_TRC20",
+    "callbackCurrencyCode": "USDT",
+    "notifyUrl": "https://your-callback-url.com/callback",
+    "version": "6.0.0",
+    "merchantId": "10216",
+    "signType": "RSA",
+    "sign": SIGN
+}
+
+RESPONSES = {
+    "/api/coin/payOrder/create": {
+        "code": "0", "msg": "操作成功",
+        "data": {
+            "orderNo": "CZ202506241839391065350",
+            "merchantOrderNo": "CZ0370022819795587072",
+            "bookingAddress": "TWNn1GqsodkoyTrYKnc6YkS4TM4JFpy",
+            "payCoinAmount": "10",
+            "orderExpireDate": "2025-06-24 18:54:39"
+        }
+    },
+    "/api/coin/payOrder/query": {
+        "code": "0", "msg": "操作成功",
+        "data": {
+            "orderNo": "CZ202506241839391065350",
+            "merchantOrderNo": "CZ0370022819795587072",
+            "amount": "10",
+            "coinType": "USDT_TRC20",
+            "status": "1",
+            "submitTime": "20250624183939",
+            "payCoinAmount": "10",
+            "supplementOrderState": "0"
+        }
+    },
+    "/api/coin/balance/query": {
+        "code": "0", "msg": "操作成功",
+        "data": {"coinType": "USDT", "availableAmount": "100000.00", "frozenAmount": "0.00", "unsettledAmount": "0.00"}
+    },
+    "/api/merchant/queryChannelRate": {
+        "code": "0", "msg": "操作成功",
+        "data": {"coinType": "USDT_TRC20", "collectionExchangeRate": "7.20", "paymentExchangeRate": "7.25"}
+    }
+}
+
+
+# 端点 -> 报表中的名称
+LABELS = {
+    "/api/coin/payOrder/create": "下单响应",
+    "/api/coin/payOrder/query": "订单查询响应",
+    "/api/coin/balance/query": "余额响应",
+    "/api/merchant/queryChannelRate": "汇率响应"
+}
+
+
+def _rate(func: Callable[[], object], count: int) -> float:
+    start = time.perf_counter()
+    for _ in range(count):
+        func()
+    return count / (time.perf_counter() - start)
+
+
+def bench_backend(name: str, count: int) -> Dict[str, float]:
+    """单个后端的编码/解码吞吐（次/秒）"""
+    serializer.set_backend(name)
+    dumps, loads = serializer.dumps, serializer.loads
+
+    rates = {"编码 下单请求": _rate(lambda: dumps(REQUEST), count)}
+    for endpoint, response in RESPONSES.items():
+        payload = json.dumps(response, ensure_ascii=False).encode("utf-8")
+        rates[f"解码 {LABELS[endpoint]}"] = _rate(lambda: loads(payload), count)
+
+    payload = json.dumps(RESPONSES["/api/coin/payOrder/query"], ensure_ascii=False).encode("utf-8")
+    rates["类型化 订单查询"] = _rate(lambda: serializer.decode_result(payload, "/api/coin/payOrder/query"), count)
+    return rates
+
+
+def bench_legacy(count: int) -> float:
+    """旧路径: 每次请求编码一次、解码一次、打印时再编码两次"""
+    payload = json.dumps(RESPONSES["/api/coin/payOrder/create"]).encode("utf-8")
+
+    def round_trip():
+        json.dumps(REQUEST, ensure_ascii=False)
+        body = json.dumps(REQUEST)
+        result = json.loads(payload)
+        json.dumps(result, ensure_ascii=False)
+        return body
+
+    return _rate(round_trip, count)
+
+
+def bench_round_trip(name: str, count: int) -> float:
+    """当前路径: 编码一次、解码一次（日志关闭或未采样时不再序列化）"""
+    serializer.set_backend(name)
+    dumps, loads = serializer.dumps, serializer.loads
+    payload = json.dumps(RESPONSES["/api/coin/payOrder/create"]).encode("utf-8")
+
+    def round_trip():
+        body = dumps(REQUEST)
+        loads(payload)
+        return body
+
+    return _rate(round_trip, count)
+
+
+def _traced(build: Callable[[], list]) -> tuple:
+    """构建对象并返回 (对象, 占用字节)"""
+    gc.collect()
+    tracemalloc.start()
+    objects = build()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return objects, size
+
+
+def bench_memory(orders: int):
+    """持有N个订单查询结果的内存（均从响应字节解码）"""
+    data = RESPONSES["/api/coin/payOrder/query"]["data"]
+    payloads = [
+        serializer.dumps(dict(data, merchantOrderNo=f"CZ{i:019d}", orderNo=f"CZ{i:021d}"))
+        for i in range(orders)
+    ]
+    loads = serializer.loads
+
+    dicts, dict_size = _traced(lambda: [loads(p) for p in payloads])
+    del dicts
+    models, model_size = _traced(lambda: [CollectionOrder.from_dict(loads(p)) for p in payloads])
+    del models
+
+    print(f"\n💾 持有 {orders:,} 个订单（订单查询data）")
+    print(f"   {'dict':<22}{dict_size / orders:>10,.0f} 字节/单  合计 {dict_size / 2 ** 20:,.1f} MB")
+    print(f"   {'CollectionOrder':<22}{model_size / orders:>10,.0f} 字节/单  合计 {model_size / 2 ** 20:,.1f} MB"
+          f"  ({1 - model_size / dict_size:.0%} 节省)")
+
+
+def main():
+    """主程序入口"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="JSON序列化基准测试")
+    parser.add_argument("--count", "-n", type=int, default=100000, help="每项测试的次数")
+    parser.add_argument("--orders", type=int, default=100000, help="内存测试的订单数")
+    args = parser.parse_args()
+
+    default = serializer.BACKEND
+    backends = serializer.available_backends()
+
+    print("=" * 72)
+    print("🚀 JSON序列化基准测试")
+    print("=" * 72)
+    print(f"   可用后端: {', '.join(backends)}（默认 {default}）")
+
+    results = {name: bench_backend(name, args.count) for name in backends}
+    rows = list(results[backends[0]])
+    print(f"\n📊 吞吐（次/秒）")
+    print(f"   {'':<22}" + "".join(f"{name:>14}" for name in backends))
+    for row in rows:
+        print(f"   {row:<22}" + "".join(f"{results[name][row]:>14,.0f}" for name in backends))
+
+    print(f"\n🔁 每次请求的序列化开销（下单请求 + 响应）")
+    legacy = bench_legacy(args.count)
+    print(f"   {'旧路径 (json x4)':<22}{legacy:>14,.0f} 次/秒")
+    for name in backends:
+        rate = bench_round_trip(name, args.count)
+        print(f"   {name:<22}{rate:>14,.0f} 次/秒  ({rate / legacy:.1f}x)")
+
+    serializer.set_backend(default)
+    bench_memory(args.orders)
+
+
+if __name__ == "__main__":
+    main()
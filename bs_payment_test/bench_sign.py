@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+BS支付系统 - 签名串构建基准测试
+
+对比:
+1. 旧实现: 过滤dict → sorted列表 → f-string拼接（原 Signer.md5_sign）
+2. 新实现: sign_string 通用路径（排序，复用缓冲区）
+3. 新实现: sign_string 字段表快速路径（跳过排序）
+
+使用示例:
+    python bench_sign.py
+    python bench_sign.py --count 500000
+"""
+
+import time
+import hashlib
+from typing import Callable, Dict
+
+from bs_api_client import COMMON_FIELDS, ENDPOINT_FIELDS
+from sign_string import get_schema, md5_sign, register_schema
+
+# 代付下单的典型参数
+SAMPLE_PARAMS = {
+    "merchantOrderNo": "DF202602111230451234",
+    "amount": "100.50",
+    "coinType": "USDT_TRC20",
+    "bookingAddress": "TWNn1GqsodkoyTrYKnc6YkS4TM4JFpyAbc",
+    "callbackCurrencyCode": "USDT",
+    "notifyUrl": "https://your-callback-url.com/callback",
+    "remark": None,
+    "rate": None,
+    "version": "6.0.0",
+    "merchantId": "10216",
+    "signType": "MD5"
+}
+SECRET_KEY = "d7fdce63f5c74621a1877d6c7e3d43a2"
+ENDPOINT = "/api/coin/remitOrder/create"
+
+
+def legacy_md5_sign(params: Dict, secret_key: str) -> str:
+    """旧实现（逐字复制自原 Signer.md5_sign）"""
+    filtered = {k: v for k, v in params.items() if v is not None and v != ""}
+    sorted_keys = sorted(filtered.keys())
+    sign_str = "&".join([f"{k}={filtered[k]}" for k in sorted_keys])
+    sign_str = f"{sign_str}&key={secret_key}"
+    return hashlib.md5(sign_str.encode()).hexdigest()
+
+
+def bench(name: str, func: Callable[[], str], count: int) -> float:
+    """执行count次，返回每秒签名数"""
+    func()
+    start = time.perf_counter()
+    for _ in range(count):
+        func()
+    elapsed = time.perf_counter() - start
+    rate = count / elapsed
+    print(f"   {name:<24} {rate:>12,.0f} 次/秒  ({elapsed / count * 1e6:.2f} µs/次)")
+    return rate
+
+
+def main():
+    """主程序入口"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="签名串构建基准测试")
+    parser.add_argument("--count", "-n", type=int, default=200000, help="每项签名次数")
+    args = parser.parse_args()
+
+    schema = get_schema(ENDPOINT) or register_schema(ENDPOINT, COMMON_FIELDS + ENDPOINT_FIELDS[ENDPOINT])
+    params = SAMPLE_PARAMS
+
+    # 三种实现结果必须一致
+    expected = legacy_md5_sign(params, SECRET_KEY)
+    assert md5_sign(params, SECRET_KEY) == expected
+    assert md5_sign(params, SECRET_KEY, schema) == expected
+
+    print("=" * 60)
+    print(f"📊 MD5签名吞吐（{len(params)} 个参数，{args.count:,} 次）")
+    print("=" * 60)
+
+    before = bench("旧实现", lambda: legacy_md5_sign(params, SECRET_KEY), args.count)
+    generic = bench("新实现-通用路径", lambda: md5_sign(params, SECRET_KEY), args.count)
+    fast = bench("新实现-字段表", lambda: md5_sign(params, SECRET_KEY, schema), args.count)
+
+    print(f"\n   通用路径: {generic / before:.2f}x")
+    print(f"   字段表:   {fast / before:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -18,14 +18,24 @@ BS支付系统 - API测试项目
 
 import os
 import sys
-import json
 import time
-import hashlib
 import requests
 from urllib.parse import urlencode, quote
 from typing import Dict, Any, Optional, List
 from datetime import datetime
 
+from cache import get_cache
+from models import Balance, ChannelRate, CollectionOrder, RemitOrder, Result
+from order_id import next_order_no
+from order_ledger import OrderLedger
+from order_poller import OrderPoller
+from request_log import get_request_logger
+import serializer
+from resilience import get_guard, guard_metrics
+from retry import EXISTS, HTTP_5XX, INVALID, MISSING, NETWORK, REJECTED, TIMEOUT, get_retry_policy, retry_metrics
+from transport import get_transport
+from sign_string import FieldSchema, build_sign_string, get_schema, md5_sign, register_schema
+
 # ============== 配置 ==============
 CONFIG = {
     # 正式环境
@@ -40,6 +50,12 @@ CONFIG = {
         "gateway": "https://test-gateway.cfbaopay.com"
     },
     
+    # 本地模拟网关（python mock_gateway.py）
+    "mock": {
+        "base_url": "http://127.0.0.1:8090",
+        "gateway": "http://127.0.0.1:8090"
+    },
+    
     # 当前环境
     "current_env": "test",
     
@@ -55,7 +71,63 @@ CONFIG = {
     "notify_url": "https://your-callback-url.com/callback",
     
     # 请求超时
-    "timeout": 30
+    "timeout": 30,
+    
+    # 传输层配置（进程内所有BSClient共享）
+    "transport": {
+        "pool_connections": 10,  # 缓存的主机连接池数量
+        "pool_maxsize": 50,      # 每个主机的最大keep-alive连接数
+        # 按端点覆盖超时（秒），未配置的端点使用 timeout
+        "endpoint_timeouts": {
+            "/api/coin/payOrder/query": 10,
+            "/api/coin/remitOrder/query": 10,
+            "/api/remitMatchOrder/query": 10,
+            "/api/coin/balance/query": 10,
+            "/api/merchant/queryChannelRate": 10
+        }
+    },
+    
+    # 查询缓存（进程内所有BSClient共享，键含网关地址和商户ID）
+    "cache": {
+        "refresh_ahead": 0.8,   # 使用80%有效期后后台刷新
+        "channel_rate": {"ttl": 60, "ttl_by_coin": {"CNY": 30}},
+        "balance": {"ttl": 5, "ttl_by_coin": {}}
+    },
+    
+    # 限流与熔断（按 网关地址+端点 共享）
+    "resilience": {
+        "max_wait": 5,            # 限流排队最长等待（秒），超过直接返回失败
+        "failure_threshold": 5,   # 连续失败（网络异常/超时/HTTP 5xx）次数达到后熔断
+        "recovery_timeout": 30,   # 熔断后多久放行探测请求（秒）
+        "half_open_max": 1,       # 半开状态同时放行的探测请求数
+        # 每秒请求数上限（rate=0 为不限流），可按端点覆盖
+        "rate_limits": {
+            "default": {"rate": 50, "burst": 100},
+            "/api/coin/payOrder/create": {"rate": 20, "burst": 40},
+            "/api/coin/remitOrder/create": {"rate": 20, "burst": 40},
+            "/api/remitMatchOrder/create": {"rate": 20, "burst": 40}
+        }
+    },
+    
+    # 重试（同一网关共享重试预算）
+    # 查询类端点直接重试；下单先用同一商户订单号查询确认，确认不存在才重新提交
+    "retry": {
+        "max_attempts": 3,          # 每次调用最多请求次数（含首次）
+        "base_delay": 0.2,          # 首次重试退避上限（秒），之后翻倍
+        "max_delay": 5,             # 退避上限（秒）
+        "budget_ratio": 0.1,        # 重试最多占请求数的10%
+        "budget_min_per_sec": 5,    # 每秒保底重试次数
+        "not_found_codes": ["5"],   # 订单查询"订单不存在"的返回码（以网关实际返回为准）
+        "duplicate_codes": ["7"]    # 下单"订单号已存在"的返回码
+    },
+    
+    # 请求日志（进程内所有BSClient共享）
+    "logging": {
+        "level": "INFO",        # INFO: 请求/响应; WARNING: 仅失败; OFF: 关闭
+        "sample_rate": 1.0,     # INFO日志采样率，批量运行时调低（如0.01）
+        "jsonl_path": "",       # JSON Lines文件路径（空为不写文件）
+        "console": True         # 是否输出到控制台
+    }
 }
 
 # ============== 签名工具 ==============
@@ -63,61 +135,44 @@ class Signer:
     """签名工具类"""
     
     @staticmethod
-    def md5_sign(params: Dict, secret_key: str) -> str:
+    def md5_sign(params: Dict, secret_key: str, schema: FieldSchema = None) -> str:
         """
         MD5签名
         
         Args:
             params: 参数字典
             secret_key: 商户密钥
+            schema: 端点字段表（可选，已知字段顺序时跳过排序）
             
         Returns:
             签名字符串
         """
-        # 1. 过滤空值参数
-        filtered = {k: v for k, v in params.items() if v is not None and v != ""}
-        
-        # 2. 按键名ASCII排序
-        sorted_keys = sorted(filtered.keys())
-        
-        # 3. 拼接键值对
-        sign_str = "&".join([f"{k}={filtered[k]}" for k in sorted_keys])
-        
-        # 4. 追加密钥
-        sign_str = f"{sign_str}&key={secret_key}"
-        
-        # 5. MD5加密（32位小写）
-        return hashlib.md5(sign_str.encode()).hexdigest()
+        # 过滤空值 → ASCII排序 → 拼接 → 追加密钥 → MD5（32位小写）
+        return md5_sign(params, secret_key, schema)
     
     @staticmethod
-    def rsa_sign(params: Dict, private_key: str) -> str:
+    def rsa_sign(params: Dict, private_key: str, schema: FieldSchema = None) -> str:
         """
         RSA签名（SHA1withRSA）
         
         Args:
             params: 参数字典
             private_key: RSA私钥
+            schema: 端点字段表（可选）
             
         Returns:
             签名字符串
         """
         try:
-            from cryptography.hazmat.primitives import hashes, serialization
+            from cryptography.hazmat.primitives import hashes
             from cryptography.hazmat.primitives.asymmetric import padding
-            from cryptography.hazmat.backends import default_backend
-            
-            # 1. 过滤空值参数
-            filtered = {k: v for k, v in params.items() if v is not None and v != ""}
+            from keystore import KEY_REGISTRY
             
-            # 2. 按键值+数值的ASCII编码顺序拼接
-            sign_str = "&".join([f"{k}={filtered[k]}" for k in sorted(filtered.keys())])
+            # 1. 过滤空值参数，按键值+数值的ASCII编码顺序拼接
+            sign_str = build_sign_string(params, schema)
             
-            # 3. RSA私钥签名
-            private_key_obj = serialization.load_pem_private_key(
-                private_key.encode(),
-                password=None,
-                backend=default_backend()
-            )
+            # 2. RSA私钥签名（私钥对象按指纹缓存，仅首次解析PEM）
+            private_key_obj = KEY_REGISTRY.private_key(private_key)
             
             signature = private_key_obj.sign(
                 sign_str.encode(),
@@ -125,7 +180,7 @@ class Signer:
                 hashes.SHA1()
             )
             
-            # 4. Base64编码
+            # 3. Base64编码
             import base64
             return base64.b64encode(signature).decode()
             
@@ -133,6 +188,40 @@ class Signer:
             print("❌ 需要安装cryptography库: pip install cryptography")
             return ""
     
+    @staticmethod
+    def sign_many(
+        params_list: List[Dict],
+        private_key: str,
+        workers: int = None,
+        executor: str = "process"
+    ) -> List[str]:
+        """
+        RSA批量签名（SHA1withRSA，多进程并行）
+        
+        Args:
+            params_list: 参数字典列表
+            private_key: RSA私钥
+            workers: 工作进程数（默认CPU核数）
+            executor: process（进程池）或 thread（线程池）
+            
+        Returns:
+            签名列表，与输入顺序一致
+            
+        Raises:
+            ValueError: 私钥为空或无法解析（在启动进程池之前检查）
+        """
+        if not private_key:
+            raise ValueError("未配置RSA私钥，无法批量签名")
+        try:
+            from batch_sign import get_batch_signer
+            
+            signer = get_batch_signer(private_key, "SHA1", workers, executor)
+            return signer.sign_many(params_list)
+            
+        except ImportError:
+            print("❌ 需要安装cryptography库: pip install cryptography")
+            return [""] * len(params_list)
+    
     @staticmethod
     def rsa_verify(params: Dict, sign: str, public_key: str) -> bool:
         """
@@ -147,22 +236,16 @@ class Signer:
             验签结果
         """
         try:
-            from cryptography.hazmat.primitives import hashes, serialization
+            from cryptography.hazmat.primitives import hashes
             from cryptography.hazmat.primitives.asymmetric import padding
-            from cryptography.hazmat.backends import default_backend
+            from keystore import KEY_REGISTRY
             import base64
             
-            # 1. 过滤空值参数
-            filtered = {k: v for k, v in params.items() if v is not None and v != ""}
+            # 1. 过滤空值参数（及sign字段），按ASCII顺序拼接
+            sign_str = build_sign_string(params)
             
-            # 2. 按键值+数值的ASCII编码顺序拼接
-            sign_str = "&".join([f"{k}={filtered[k]}" for k in sorted(filtered.keys())])
-            
-            # 3. RSA公钥验签
-            public_key_obj = serialization.load_pem_public_key(
-                public_key.encode(),
-                backend=default_backend()
-            )
+            # 2. RSA公钥验签（公钥对象按指纹缓存）
+            public_key_obj = KEY_REGISTRY.public_key(public_key)
             
             public_key_obj.verify(
                 base64.b64decode(sign),
@@ -178,21 +261,75 @@ class Signer:
             return False
 
 
+# ============== 端点字段表 ==============
+# 各端点的全部签名字段（含公共字段），预编译后签名时跳过排序
+COMMON_FIELDS = ("version", "merchantId", "signType")
+
+ENDPOINT_FIELDS = {
+    "/api/coin/payOrder/create": (
+        "merchantOrderNo", "amount", "coinType", "callbackCurrencyCode", "notifyUrl", "rate"
+    ),
+    "/api/coin/payOrder/createCashier": (
+        "merchantOrderNo", "amount", "coinType", "callbackCurrencyCode", "language",
+        "notifyUrl", "returnUrl", "rate"
+    ),
+    "/api/coin/payOrder/query": ("merchantOrderNo", "submitTime"),
+    "/api/coin/remitOrder/create": (
+        "merchantOrderNo", "amount", "coinType", "bookingAddress", "callbackCurrencyCode",
+        "notifyUrl", "remark", "rate"
+    ),
+    "/api/coin/remitOrder/query": ("merchantOrderNo", "submitTime"),
+    "/api/coin/balance/query": ("coinType", "requestTime"),
+    "/api/merchant/queryChannelRate": ("coinType",),
+    "/api/coin/quick/queryAddress": ("memberNo", "coinType"),
+    "/api/remitMatchOrder/create": (
+        "merchantOrderNo", "amount", "bankCode", "bankcardAccountNo", "bankcardAccountName",
+        "memberNo", "notifyUrl"
+    ),
+    "/api/remitMatchOrder/query": ("merchantOrderNo", "submitTime"),
+}
+
+for _endpoint, _fields in ENDPOINT_FIELDS.items():
+    register_schema(_endpoint, COMMON_FIELDS + _fields)
+
+
 # ============== API客户端 ==============
 class BSClient:
     """BS支付API客户端"""
     
-    def __init__(self, env: str = "test"):
+    def __init__(self, env: str = "test", merchant: Dict = None, verbose: bool = True):
         """
         初始化客户端
         
+        传输层、限流熔断、重试预算、缓存均为进程内共享实例，创建客户端只做字典查找；
+        多商户请用 client_registry.py 按商户ID获取客户端。
+        
         Args:
-            env: 环境（test/production）
+            env: 环境（test/production/mock）
+            merchant: 商户配置（id/md5_key/rsa_private_key/rsa_public_key），默认 CONFIG["merchant"]
+            verbose: 是否打印初始化信息
         """
+        self.env = env
         self.base_url = CONFIG[env]["base_url"]
-        self.config = CONFIG["merchant"]
+        self.config = merchant if merchant is not None else CONFIG["merchant"]
         self.signer = Signer()
-        
+        self.transport = get_transport(
+            pool_connections=CONFIG["transport"]["pool_connections"],
+            pool_maxsize=CONFIG["transport"]["pool_maxsize"],
+            default_timeout=CONFIG["timeout"],
+            endpoint_timeouts=CONFIG["transport"]["endpoint_timeouts"]
+        )
+        self.request_log = get_request_logger(**CONFIG["logging"])
+        self.rate_cache = get_cache("channel_rate", ttl=CONFIG["cache"]["channel_rate"]["ttl"],
+                                    refresh_ahead=CONFIG["cache"]["refresh_ahead"])
+        self.balance_cache = get_cache("balance", ttl=CONFIG["cache"]["balance"]["ttl"],
+                                       refresh_ahead=CONFIG["cache"]["refresh_ahead"])
+        self.retry_policy = get_retry_policy(self.base_url, **CONFIG["retry"])
+        self._warned = set()
+        self._guards = {}
+        
+        if not verbose:
+            return
         print(f"\n🌐 初始化BS支付API客户端")
         print(f"   环境: {env}")
         print(f"   基础URL: {self.base_url}")
@@ -200,49 +337,104 @@ class BSClient:
     
     # ============== 辅助方法 ==============
     def _generate_order_no(self, prefix: str = "") -> str:
-        """生成订单号"""
-        timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
-        import random
-        random_suffix = str(random.randint(1000, 9999))
-        return f"{prefix}{timestamp}{random_suffix}"
+        """生成订单号（雪花算法，跨线程/进程唯一）"""
+        return next_order_no(prefix)
+    
+    def pool_stats(self) -> Dict:
+        """连接池统计（共享传输层，所有BSClient合计）"""
+        return self.transport.pool_stats()
+    
+    def _guard(self, endpoint: str):
+        """获取端点的限流熔断器（同一网关的同一端点在进程内共享）"""
+        url = f"{self.base_url}{endpoint}"
+        guard = self._guards.get(url)
+        if guard is not None:
+            return guard
+        settings = CONFIG["resilience"]
+        limit = settings["rate_limits"].get(endpoint, settings["rate_limits"]["default"])
+        guard = self._guards[url] = get_guard(
+            url,
+            rate=limit["rate"],
+            burst=limit.get("burst"),
+            max_wait=settings["max_wait"],
+            failure_threshold=settings["failure_threshold"],
+            recovery_timeout=settings["recovery_timeout"],
+            half_open_max=settings["half_open_max"]
+        )
+        return guard
+    
+    def resilience_stats(self) -> Dict:
+        """限流熔断统计（所有端点）"""
+        return guard_metrics()
+    
+    def retry_stats(self) -> Dict:
+        """重试统计（按网关）"""
+        return retry_metrics()
+    
+    def cache_stats(self) -> Dict:
+        """缓存统计（共享缓存，所有BSClient合计）"""
+        return {
+            "channel_rate": self.rate_cache.metrics(),
+            "balance": self.balance_cache.metrics()
+        }
+    
+    def _cached(self, cache, kind: str, coin_type: str, loader):
+        """
+        读穿缓存（键: 网关地址 + 商户ID + 币种，有效期按币种配置）
+        
+        AsyncBSClient 覆盖此方法以返回协程
+        """
+        key = (self.base_url, self.config["id"], coin_type)
+        ttl = CONFIG["cache"][kind]["ttl_by_coin"].get(coin_type)
+        return cache.get_or_load(key, loader, ttl)
     
     def _get_timestamp(self) -> str:
         """获取时间戳"""
         return datetime.now().strftime("%Y%m%d%H%M%S")
     
-    def _build_params(self, params: Dict, sign_type: str = "RSA") -> Dict:
+    def _build_params(self, params: Dict, sign_type: str = "RSA", endpoint: str = None,
+                      sign: bool = True) -> Dict:
         """
         构建请求参数（包含签名）
         
         Args:
             params: 原始参数
             sign_type: 签名类型（RSA/MD5）
+            endpoint: API端点（用于查找预编译字段表）
+            sign: 是否计算RSA签名（异步客户端在签名进程池中计算时传False）
             
         Returns:
             包含签名的完整参数
         """
         params["version"] = "6.0.0"
         params["merchantId"] = self.config["id"]
+        schema = get_schema(endpoint) if endpoint else None
         
         # 生成签名
         if sign_type == "RSA":
             params["signType"] = "RSA"
-            if self.config["rsa_private_key"]:
-                params["sign"] = self.signer.rsa_sign(params, self.config["rsa_private_key"])
-            else:
-                print("⚠️ 未配置RSA私钥，跳过签名")
+            if not self.config["rsa_private_key"]:
+                self._warn_once("⚠️ 未配置RSA私钥，跳过签名")
+            elif sign:
+                params["sign"] = self.signer.rsa_sign(params, self.config["rsa_private_key"], schema)
         else:
             params["signType"] = "MD5"
             if self.config["md5_key"]:
-                params["sign"] = self.signer.md5_sign(params, self.config["md5_key"])
+                params["sign"] = self.signer.md5_sign(params, self.config["md5_key"], schema)
             else:
-                print("⚠️ 未配置MD5密钥，跳过签名")
+                self._warn_once("⚠️ 未配置MD5密钥，跳过签名")
         
         return params
     
+    def _warn_once(self, message: str):
+        """同一提示只打印一次（压测时避免刷屏）"""
+        if message not in self._warned:
+            self._warned.add(message)
+            print(message)
+    
     def _request(self, endpoint: str, params: Dict, sign_type: str = "RSA") -> Dict:
         """
-        发起HTTP请求
+        发起HTTP请求（按端点幂等性重试，见 retry.py）
         
         Args:
             endpoint: API端点
@@ -250,39 +442,92 @@ class BSClient:
             sign_type: 签名类型
             
         Returns:
-            响应结果
+            响应结果；下单失败后经查询确认订单已存在时，返回查询结果
+        """
+        policy = self.retry_policy
+        policy.start()
+        confirm_endpoint = policy.confirm_endpoint(endpoint)
+        submit_time = self._get_timestamp() if confirm_endpoint else None
+        
+        attempt = 0
+        while True:
+            result, failure = self._send(endpoint, params, sign_type)
+            attempt += 1
+            if confirm_endpoint and attempt > 1 and failure is None and policy.is_duplicate(result):
+                # 重新提交时网关报单号重复: 首次提交其实已成功
+                confirmed = self._request(confirm_endpoint, self._confirm_params(params, submit_time))
+                return confirmed if str(confirmed.get("code")) == "0" else result
+            if not policy.should_retry(endpoint, attempt, failure):
+                if confirm_endpoint and policy.is_ambiguous(failure):
+                    return policy.unknown_result(result, params["merchantOrderNo"])
+                return result
+            
+            time.sleep(policy.backoff(attempt))
+            if confirm_endpoint:
+                confirmed = self._request(confirm_endpoint, self._confirm_params(params, submit_time))
+                state = policy.confirmation(confirmed)
+                if state == EXISTS:
+                    return confirmed
+                if state != MISSING:
+                    return policy.unknown_result(result, params["merchantOrderNo"])
+    
+    @staticmethod
+    def _confirm_params(params: Dict, submit_time: str) -> Dict:
+        """下单确认查询的参数（同一商户订单号）"""
+        return {"merchantOrderNo": params["merchantOrderNo"], "submitTime": submit_time}
+    
+    def _send(self, endpoint: str, params: Dict, sign_type: str = "RSA") -> tuple:
+        """
+        发送一次请求（不重试）
+        
+        Args:
+            endpoint: API端点
+            params: 请求参数
+            sign_type: 签名类型
+            
+        Returns:
+            (响应结果, 失败类型)；网关正常应答时失败类型为None
         """
         url = f"{self.base_url}{endpoint}"
-        data = self._build_params(params, sign_type)
+        log = self.request_log
         
-        print(f"\n📤 请求: {endpoint}")
-        print(f"   URL: {url}")
-        print(f"   参数: {json.dumps(data, ensure_ascii=False)}")
+        # 熔断中或超出限流等待上限时快速失败，不占用连接和线程
+        guard = self._guard(endpoint)
+        rejected, wait = guard.admit()
+        if rejected:
+            log.log_error(endpoint, rejected, 0.0)
+            return {"code": -1, "msg": rejected}, REJECTED
+        if wait:
+            time.sleep(wait)
         
+        data = self._build_params(params, sign_type, endpoint)
+        
+        sampled = log.sampled()
+        if sampled:
+            log.log_request(endpoint, url, data)
+        
+        start = time.perf_counter()
+        status_code = None
         try:
-            headers = {
-                "Content-Type": "application/json",
-                "Accept": "application/json"
-            }
+            response = self.transport.post(url, serializer.dumps(data), endpoint)
+            status_code = response.status_code
+            guard.record(status_code < 500)
             
-            response = requests.post(
-                url,
-                data=json.dumps(data),
-                headers=headers,
-                timeout=CONFIG["timeout"]
-            )
-            
-            result = response.json()
+            result = serializer.loads(response.content)
             
-            print(f"\n📥 响应:")
-            print(f"   状态码: {response.status_code}")
-            print(f"   响应体: {json.dumps(result, ensure_ascii=False)}")
+            log.log_response(endpoint, status_code, result,
+                             (time.perf_counter() - start) * 1000, sampled)
             
-            return result
+            return result, HTTP_5XX if status_code >= 500 else None
             
-        except requests.exceptions.RequestException as e:
-            print(f"\n❌ 请求失败: {e}")
-            return {"code": -1, "msg": str(e)}
+        except (requests.exceptions.RequestException, ValueError) as e:
+            if status_code is not None:
+                failure = HTTP_5XX if status_code >= 500 else INVALID
+            else:
+                guard.record(False)
+                failure = TIMEOUT if isinstance(e, requests.exceptions.Timeout) else NETWORK
+            log.log_error(endpoint, e, (time.perf_counter() - start) * 1000)
+            return {"code": -1, "msg": str(e)}, failure
     
     # ============== USDT代收 ==============
     def create_collection_order(
@@ -470,7 +715,7 @@ class BSClient:
         return self._request("/api/coin/remitOrder/query", params)
     
     # ============== 余额查询 ==============
-    def query_balance(self, coin_type: str = "USDT") -> Dict:
+    def query_balance(self, coin_type: str = "USDT", use_cache: bool = True) -> Dict:
         """
         余额查询
         
@@ -478,19 +723,24 @@ class BSClient:
         
         Args:
             coin_type: 币种（USDT）
+            use_cache: 是否使用缓存（默认有效期5秒，需要实时余额时传False）
             
         Returns:
             API响应
         """
-        params = {
-            "coinType": coin_type,
-            "requestTime": self._get_timestamp()
-        }
+        def load():
+            params = {
+                "coinType": coin_type,
+                "requestTime": self._get_timestamp()
+            }
+            return self._request("/api/coin/balance/query", params)
         
-        return self._request("/api/coin/balance/query", params)
+        if not use_cache:
+            return load()
+        return self._cached(self.balance_cache, "balance", coin_type, load)
     
     # ============== 通道汇率 ==============
-    def query_channel_rate(self, coin_type: str) -> Dict:
+    def query_channel_rate(self, coin_type: str, use_cache: bool = True) -> Dict:
         """
         商户通道汇率查询
         
@@ -498,15 +748,20 @@ class BSClient:
         
         Args:
             coin_type: 币种类型（USDT_TRC20, CNY）
+            use_cache: 是否使用缓存（有效期按币种配置，见 CONFIG["cache"]）
             
         Returns:
             API响应
         """
-        params = {
-            "coinType": coin_type
-        }
+        def load():
+            params = {
+                "coinType": coin_type
+            }
+            return self._request("/api/merchant/queryChannelRate", params)
         
-        return self._request("/api/merchant/queryChannelRate", params)
+        if not use_cache:
+            return load()
+        return self._cached(self.rate_cache, "channel_rate", coin_type, load)
     
     # ============== 闪付 ==============
     def quick_query_address(
@@ -608,18 +863,50 @@ class BSClient:
 class BSTestCases:
     """BS支付测试用例"""
     
-    def __init__(self, env: str = "test"):
+    def __init__(
+        self,
+        env: str = "test",
+        ledger: OrderLedger = None,
+        poll_timeout: float = 10,
+        client: BSClient = None,
+        verbose: bool = True,
+        use_cache: bool = True
+    ):
         """
         初始化测试
         
         Args:
             env: 环境
+            ledger: 订单台账（可选，记录测试中创建的订单）
+            poll_timeout: 代付订单状态轮询超时（秒，0为只查询一次，压测使用）
+            client: 客户端（默认按env创建；压测时传入 load_test.MeteredBSClient）
+            verbose: 是否打印测试过程
+            use_cache: 汇率/余额查询是否使用缓存（压测测量网关时传False）
         """
-        self.client = BSClient(env)
+        self.client = client or BSClient(env)
         self.results = []
+        self.ledger = ledger
+        self.poll_timeout = poll_timeout
+        self.verbose = verbose
+        self.use_cache = use_cache
     
-    def log_result(self, name: str, success: bool, response: Dict = None):
-        """记录测试结果"""
+    def _log(self, message: str):
+        """打印测试过程（verbose关闭时不输出）"""
+        if self.verbose:
+            print(message)
+    
+    def record_order(self, order_type: str, order_no: str, amount: str, coin_type: str, response: Dict,
+                     submit_time: str = None):
+        """登记测试中创建的订单"""
+        if self.ledger is not None and order_no:
+            self.ledger.record_order(
+                order_type, order_no,
+                amount=amount, coin_type=coin_type, submit_time=submit_time,
+                merchant_id=self.client.config["id"], data=response
+            )
+    
+    def log_result(self, name: str, success: bool, response: Result = None):
+        """记录测试结果（只保留类型化结果，不持有完整响应dict）"""
         self.results.append({
             "name": name,
             "success": success,
@@ -627,7 +914,7 @@ class BSTestCases:
         })
         
         status = "✅ 通过" if success else "❌ 失败"
-        print(f"\n{status} {name}")
+        self._log(f"\n{status} {name}")
     
     def test_collection_trc20(self) -> str:
         """
@@ -636,29 +923,34 @@ class BSTestCases:
         Returns:
             商户订单号
         """
-        print("\n" + "="*60)
-        print("🧪 测试: USDT代收（TRC20）")
-        print("="*60)
+        self._log("\n" + "="*60)
+        self._log("🧪 测试: USDT代收（TRC20）")
+        self._log("="*60)
         
         # 查询汇率
-        rate_result = self.client.query_channel_rate("USDT_TRC20")
-        print(f"\n📊 查询汇率: {rate_result}")
+        rate_result = Result.from_dict(self.client.query_channel_rate("USDT_TRC20", use_cache=self.use_cache), ChannelRate)
+        self._log(f"\n📊 查询汇率: {rate_result}")
         
-        # 下单
-        result = self.client.create_collection_order(
+        # 下单（记录提交时间，查询时按下单时间定位订单）
+        submit_time = self.client._get_timestamp()
+        response = self.client.create_collection_order(
             amount="10",
             coin_type="USDT_TRC20",
             callback_currency_code="USDT"
         )
+        result = Result.from_dict(response, CollectionOrder)
         
-        order_no = result.get("data", {}).get("merchantOrderNo") if result.get("code") == "0" else None
+        order_no = result.data.merchant_order_no if result.ok else None
         
-        self.log_result("USDT代收-TRC20", result.get("code") == "0", result)
+        self.log_result("USDT代收-TRC20", result.ok, result)
+        self.record_order("collection", order_no, "10", "USDT_TRC20", response, submit_time)
         
         if order_no:
             # 查询订单
-            query_result = self.client.query_collection_order(order_no)
-            self.log_result("USDT代收查询", query_result.get("code") == "0", query_result)
+            query_result = Result.from_dict(
+                self.client.query_collection_order(order_no, submit_time), CollectionOrder
+            )
+            self.log_result("USDT代收查询", query_result.ok, query_result)
         
         return order_no
     
@@ -669,20 +961,22 @@ class BSTestCases:
         Returns:
             商户订单号
         """
-        print("\n" + "="*60)
-        print("🧪 测试: USDT代收（CNY）")
-        print("="*60)
+        self._log("\n" + "="*60)
+        self._log("🧪 测试: USDT代收（CNY）")
+        self._log("="*60)
         
-        result = self.client.create_collection_order(
+        response = self.client.create_collection_order(
             amount="100",
             coin_type="CNY",
             callback_currency_code="CNY",
             rate="8"  # 可选指定汇率
         )
+        result = Result.from_dict(response, CollectionOrder)
         
-        order_no = result.get("data", {}).get("merchantOrderNo") if result.get("code") == "0" else None
+        order_no = result.data.merchant_order_no if result.ok else None
         
-        self.log_result("USDT代收-CNY", result.get("code") == "0", result)
+        self.log_result("USDT代收-CNY", result.ok, result)
+        self.record_order("collection", order_no, "100", "CNY", response)
         
         return order_no
     
@@ -693,52 +987,61 @@ class BSTestCases:
         Returns:
             商户订单号
         """
-        print("\n" + "="*60)
-        print("🧪 测试: USDT代付（TRC20）")
-        print("="*60)
+        self._log("\n" + "="*60)
+        self._log("🧪 测试: USDT代付（TRC20）")
+        self._log("="*60)
         
-        result = self.client.create_remit_order(
+        submit_time = self.client._get_timestamp()
+        response = self.client.create_remit_order(
             amount="1",
             coin_type="USDT_TRC20",
             booking_address="TYourAddress",
             callback_currency_code="USDT"
         )
-        
-        order_no = result.get("data", {}).get("merchantOrderNo") if result.get("code") == "0" else None
-        
-        self.log_result("USDT代付-TRC20", result.get("code") == "0", result)
-        
-        if order_no:
-            # 查询订单
-            time.sleep(2)  # 等待
-            query_result = self.client.query_remit_order(order_no)
-            self.log_result("USDT代付查询", query_result.get("code") == "0", query_result)
+        result = Result.from_dict(response, RemitOrder)
+        
+        order_no = result.data.merchant_order_no if result.ok else None
+        
+        self.log_result("USDT代付-TRC20", result.ok, result)
+        self.record_order("remit", order_no, "1", "USDT_TRC20", response, submit_time)
+        
+        if order_no and self.poll_timeout <= 0:
+            # 只查询一次（压测不等待终态）
+            query_result = Result.from_dict(self.client.query_remit_order(order_no, submit_time), RemitOrder)
+            self.log_result("USDT代付查询", query_result.ok, query_result)
+        elif order_no:
+            # 轮询订单（指数退避），直到终态或超时
+            poller = OrderPoller(self.client, ledger=self.ledger)
+            query_result = Result.from_dict(
+                poller.poll_until_complete(order_no, "remit", submit_time, timeout=self.poll_timeout), RemitOrder
+            )
+            self.log_result("USDT代付查询", query_result.ok, query_result)
         
         return order_no
     
-    def test_balance(self) -> Dict:
+    def test_balance(self) -> Result:
         """
         测试余额查询
         """
-        print("\n" + "="*60)
-        print("🧪 测试: 余额查询")
-        print("="*60)
+        self._log("\n" + "="*60)
+        self._log("🧪 测试: 余额查询")
+        self._log("="*60)
         
-        result = self.client.query_balance("USDT")
-        self.log_result("余额查询", result.get("code") == "0", result)
+        result = Result.from_dict(self.client.query_balance("USDT", use_cache=self.use_cache), Balance)
+        self.log_result("余额查询", result.ok, result)
         
         return result
     
-    def test_channel_rate(self) -> Dict:
+    def test_channel_rate(self) -> Result:
         """
         测试通道汇率查询
         """
-        print("\n" + "="*60)
-        print("🧪 测试: 通道汇率查询")
-        print("="*60)
+        self._log("\n" + "="*60)
+        self._log("🧪 测试: 通道汇率查询")
+        self._log("="*60)
         
-        result = self.client.query_channel_rate("USDT_TRC20")
-        self.log_result("通道汇率查询", result.get("code") == "0", result)
+        result = Result.from_dict(self.client.query_channel_rate("USDT_TRC20", use_cache=self.use_cache), ChannelRate)
+        self.log_result("通道汇率查询", result.ok, result)
         
         return result
     
@@ -749,12 +1052,12 @@ class BSTestCases:
         Returns:
             测试结果列表
         """
-        print("\n" + "="*80)
-        print("🚀 BS支付系统 - API自动化测试")
-        print("="*80)
-        print(f"📅 时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-        print(f"🌐 环境: {self.client.base_url}")
-        print("="*80)
+        self._log("\n" + "="*80)
+        self._log("🚀 BS支付系统 - API自动化测试")
+        self._log("="*80)
+        self._log(f"📅 时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+        self._log(f"🌐 环境: {self.client.base_url}")
+        self._log("="*80)
         
         # 依次执行测试
         self.test_channel_rate()
@@ -764,25 +1067,41 @@ class BSTestCases:
         self.test_remit_trc20()
         
         # 汇总结果
-        print("\n" + "="*80)
-        print("📊 测试结果汇总")
-        print("="*80)
+        self._log("\n" + "="*80)
+        self._log("📊 测试结果汇总")
+        self._log("="*80)
         
         passed = sum(1 for r in self.results if r["success"])
         failed = sum(1 for r in self.results if not r["success"])
         total = len(self.results)
         
-        print(f"✅ 通过: {passed}")
-        print(f"❌ 失败: {failed}")
-        print(f"📝 总计: {total}")
-        print(f"📈 通过率: {passed/total*100:.1f}%" if total > 0 else "📈 通过率: N/A")
+        self._log(f"✅ 通过: {passed}")
+        self._log(f"❌ 失败: {failed}")
+        self._log(f"📝 总计: {total}")
+        self._log(f"📈 通过率: {passed/total*100:.1f}%" if total > 0 else "📈 通过率: N/A")
+        
+        # 连接复用情况
+        for host, stats in self.client.pool_stats().items():
+            self._log(f"🔌 连接池 {host}: 请求 {stats['requests']}, 复用 {stats['hits']}, 新建 {stats['misses']}")
+        for endpoint, stats in self.client.resilience_stats().items():
+            if stats["opened"] or stats["rejected"] or stats["throttled"] or stats["rate_rejected"]:
+                self._log(f"🛡️ {endpoint}: 状态 {stats['state']}, 熔断 {stats['opened']} 次, "
+                      f"拒绝 {stats['rejected'] + stats['rate_rejected']}, 限流等待 {stats['throttled']}")
+        for gateway, stats in self.client.retry_stats().items():
+            if stats["retries"] or stats["budget_exhausted"] or stats["confirmations"]:
+                self._log(f"🔁 重试 {gateway}: 重试 {stats['retries']}, 预算不足 {stats['budget_exhausted']}, "
+                      f"下单确认 {stats['confirmations']}（已存在 {stats['confirmed_existing']}, "
+                      f"状态未知 {stats['unknown']}）")
+        for name, stats in self.client.cache_stats().items():
+            self._log(f"🗃️ 缓存 {name}: 命中 {stats['hits']}, 未命中 {stats['misses']}, 合并 {stats['coalesced']}, "
+                  f"命中率 {stats['hit_rate'] * 100:.1f}%")
         
         # 列出失败项
         if failed > 0:
-            print("\n❌ 失败项:")
+            self._log("\n❌ 失败项:")
             for r in self.results:
                 if not r["success"]:
-                    print(f"   - {r['name']}: {r['response']}")
+                    self._log(f"   - {r['name']}: {r['response']}")
         
         return self.results
 
@@ -793,15 +1112,32 @@ def main():
     import argparse
     
     parser = argparse.ArgumentParser(description="BS支付系统API测试")
-    parser.add_argument("--env", "-e", choices=["test", "production"], 
+    parser.add_argument("--env", "-e", choices=["test", "production", "mock"], 
                        default="test", help="环境配置")
     parser.add_argument("--test", "-t", choices=["all", "collection", "remit", "balance"],
                        default="all", help="测试类型")
+    parser.add_argument("--ledger-db", default="",
+                       help="订单台账路径（如 ./orders.db，默认不记录）")
+    parser.add_argument("--log-level", choices=["DEBUG", "INFO", "WARNING", "ERROR", "OFF"],
+                       default=CONFIG["logging"]["level"], help="请求日志级别")
+    parser.add_argument("--log-sample", type=float, default=CONFIG["logging"]["sample_rate"],
+                       help="请求日志采样率（0-1）")
+    parser.add_argument("--log-jsonl", default=CONFIG["logging"]["jsonl_path"],
+                       help="请求日志JSON Lines文件路径")
     
     args = parser.parse_args()
     
+    CONFIG["logging"].update(
+        level=args.log_level,
+        sample_rate=args.log_sample,
+        jsonl_path=args.log_jsonl
+    )
+    
     # 创建测试实例
-    test_cases = BSTestCases(args.env)
+    ledger = None
+    if args.ledger_db:
+        ledger = OrderLedger(args.ledger_db)
+    test_cases = BSTestCases(args.env, ledger)
     
     # 执行测试
     if args.test == "all":
@@ -813,6 +1149,9 @@ def main():
         test_cases.test_remit_trc20()
     elif args.test == "balance":
         test_cases.test_balance()
+    
+    if ledger is not None:
+        ledger.close()
 
 
 if __name__ == "__main__":
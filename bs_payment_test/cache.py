@@ -0,0 +1,331 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+BS支付系统 - 响应缓存
+
+通道汇率、余额等查询的读穿缓存:
+1. TTL: 每个键可单独指定有效期（如按币种）
+2. 合并请求（single-flight）: 同一键同时只有一个上游请求，其余调用方等待并共享结果
+3. 提前刷新: 条目使用超过 refresh_ahead 比例的有效期后，后台刷新，调用方仍立即拿到旧值
+4. 统计: 命中、未命中、合并、后台刷新、加载失败、命中率
+
+只缓存成功的响应（code=0）；失败响应不缓存，但同一时刻等待中的调用方共享该结果。
+同步（线程）与异步（asyncio）调用方共用同一份缓存数据；异步的进行中请求按事件循环分开记录
+（Future 只能在创建它的事件循环中等待），不同线程中的事件循环各自合并请求。
+
+使用示例:
+    cache = get_cache("channel_rate", ttl=60)
+    result = cache.get_or_load(key, lambda: client._request(endpoint, params))
+
+作者: OpenClaw
+日期: 2026-02-11
+"""
+
+import time
+import asyncio
+import weakref
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+
+def is_success(result: Any) -> bool:
+    """默认缓存条件: 网关响应 code=0"""
+    return isinstance(result, dict) and str(result.get("code")) == "0"
+
+
+class _Entry:
+    __slots__ = ("value", "expires_at", "refresh_at")
+
+    def __init__(self, value: Any, expires_at: float, refresh_at: float):
+        self.value = value
+        self.expires_at = expires_at
+        self.refresh_at = refresh_at
+
+
+class _Flight:
+    """进行中的上游请求（线程调用方等待）"""
+
+    __slots__ = ("event", "result", "error")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error: Optional[BaseException] = None
+
+
+class TTLCache:
+    """带TTL、合并请求和提前刷新的读穿缓存（线程安全）"""
+
+    def __init__(
+        self,
+        name: str,
+        ttl: float = 30,
+        refresh_ahead: float = 0.8,
+        max_entries: int = 10000,
+        cacheable: Callable[[Any], bool] = is_success
+    ):
+        """
+        初始化
+
+        Args:
+            name: 缓存名称（统计用）
+            ttl: 默认有效期（秒）
+            refresh_ahead: 提前刷新比例（0.8 表示使用80%有效期后后台刷新，>=1 关闭）
+            max_entries: 最大条目数（超出时淘汰最早写入的条目）
+            cacheable: 判断结果是否可缓存
+        """
+        self.name = name
+        self.ttl = ttl
+        self.refresh_ahead = refresh_ahead
+        self.max_entries = max_entries
+        self.cacheable = cacheable
+
+        self._entries: "OrderedDict[Any, _Entry]" = OrderedDict()
+        self._flights: Dict[Any, _Flight] = {}
+        # 事件循环 -> {key: Future}（事件循环关闭回收后自动移除）
+        self._async_flights: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+        self._refresh_tasks = set()
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self.stats = {
+            "hits": 0,
+            "misses": 0,
+            "coalesced": 0,
+            "refreshes": 0,
+            "loads": 0,
+            "load_errors": 0
+        }
+
+    # ============== 内部工具 ==============
+    def _store(self, key: Any, value: Any, ttl: Optional[float]):
+        """写入条目（调用方持有锁）"""
+        ttl = self.ttl if ttl is None else ttl
+        now = time.monotonic()
+        self._entries[key] = _Entry(value, now + ttl, now + ttl * self.refresh_ahead)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _lookup(self, key: Any, in_flight: Dict) -> tuple:
+        """
+        查询条目（调用方持有锁）
+
+        Returns:
+            (条目或None, 是否需要后台刷新)
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            return None, False
+        now = time.monotonic()
+        if entry.expires_at <= now:
+            return None, False
+        self.stats["hits"] += 1
+        refresh = now >= entry.refresh_at and key not in in_flight
+        if refresh:
+            self.stats["refreshes"] += 1
+        return entry, refresh
+
+    def _finish(self, key: Any, result: Any, ttl: Optional[float]):
+        """记录一次上游加载结果（调用方持有锁）"""
+        self.stats["loads"] += 1
+        if self.cacheable(result):
+            self._store(key, result, ttl)
+
+    # ============== 同步接口 ==============
+    def get_or_load(self, key: Any, loader: Callable[[], Any], ttl: float = None) -> Any:
+        """
+        读取缓存，未命中时调用loader加载（同一键并发调用只加载一次）
+
+        Args:
+            key: 缓存键
+            loader: 加载函数
+            ttl: 本条目有效期（秒，默认使用缓存的ttl）
+
+        Returns:
+            缓存值或加载结果（请勿修改返回的对象）
+        """
+        with self._lock:
+            entry, refresh = self._lookup(key, self._flights)
+            if entry is not None:
+                if refresh:
+                    flight = self._flights[key] = _Flight()
+            else:
+                flight = self._flights.get(key)
+                leader = flight is None
+                if leader:
+                    flight = self._flights[key] = _Flight()
+                    self.stats["misses"] += 1
+                else:
+                    self.stats["coalesced"] += 1
+
+        if entry is not None:
+            if refresh:
+                self._get_executor().submit(self._refresh, key, loader, ttl, flight)
+            return entry.value
+
+        if leader:
+            return self._load(key, loader, ttl, flight)
+
+        flight.event.wait()
+        if flight.error is not None:
+            raise flight.error
+        return flight.result
+
+    def _load(self, key: Any, loader: Callable[[], Any], ttl: Optional[float], flight: _Flight) -> Any:
+        try:
+            result = loader()
+        except BaseException as e:
+            flight.error = e
+            with self._lock:
+                self.stats["load_errors"] += 1
+            raise
+        else:
+            flight.result = result
+            with self._lock:
+                self._finish(key, result, ttl)
+            return result
+        finally:
+            with self._lock:
+                self._flights.pop(key, None)
+            flight.event.set()
+
+    def _refresh(self, key: Any, loader: Callable[[], Any], ttl: Optional[float], flight: _Flight):
+        """后台刷新（失败时保留旧值直到过期）"""
+        try:
+            self._load(key, loader, ttl, flight)
+        except Exception:
+            pass
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix=f"cache-{self.name}")
+        return self._executor
+
+    # ============== 异步接口 ==============
+    async def get_or_load_async(self, key: Any, loader: Callable[[], Awaitable], ttl: float = None) -> Any:
+        """
+        get_or_load 的协程版本（loader返回可await对象）
+
+        同一事件循环内的并发调用只加载一次；提前刷新在后台任务中执行。
+        """
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            flights = self._async_flights.get(loop)
+            if flights is None:
+                flights = self._async_flights[loop] = {}
+            entry, refresh = self._lookup(key, flights)
+            if entry is None:
+                future = flights.get(key)
+                leader = future is None
+                if leader:
+                    self.stats["misses"] += 1
+                else:
+                    self.stats["coalesced"] += 1
+
+        if entry is not None:
+            if refresh:
+                future = flights[key] = loop.create_future()
+                task = loop.create_task(self._refresh_async(key, loader, ttl, flights, future))
+                self._refresh_tasks.add(task)
+                task.add_done_callback(self._refresh_tasks.discard)
+            return entry.value
+
+        if not leader:
+            return await asyncio.shield(future)
+
+        future = flights[key] = loop.create_future()
+        return await self._load_async(key, loader, ttl, flights, future)
+
+    async def _load_async(self, key: Any, loader: Callable[[], Awaitable], ttl: Optional[float],
+                          flights: Dict[Any, asyncio.Future], future: asyncio.Future) -> Any:
+        try:
+            result = await loader()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            with self._lock:
+                self.stats["load_errors"] += 1
+            future.set_exception(e)
+            # 没有等待方时避免 "exception was never retrieved" 警告
+            future.exception()
+            raise
+        else:
+            with self._lock:
+                self._finish(key, result, ttl)
+            future.set_result(result)
+            return result
+        finally:
+            flights.pop(key, None)
+
+    async def _refresh_async(self, key: Any, loader: Callable[[], Awaitable], ttl: Optional[float],
+                             flights: Dict[Any, asyncio.Future], future: asyncio.Future):
+        try:
+            await self._load_async(key, loader, ttl, flights, future)
+        except Exception:
+            pass
+
+    # ============== 管理 ==============
+    def invalidate(self, key: Any):
+        """删除条目"""
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        """清空缓存"""
+        with self._lock:
+            self._entries.clear()
+
+    def metrics(self) -> Dict:
+        """统计信息（含命中率）"""
+        with self._lock:
+            stats = dict(self.stats)
+            stats["entries"] = len(self._entries)
+        lookups = stats["hits"] + stats["misses"] + stats["coalesced"]
+        stats["hit_rate"] = round(stats["hits"] / lookups, 4) if lookups else 0.0
+        return stats
+
+    def close(self):
+        """停止后台刷新线程"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+
+# ============== 进程级共享实例 ==============
+_caches: Dict[str, TTLCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_cache(name: str, **kwargs) -> TTLCache:
+    """
+    获取进程内共享的缓存（首次调用时按参数创建）
+
+    Args:
+        name: 缓存名称
+        **kwargs: TTLCache初始化参数，仅首次调用生效
+    """
+    cache = _caches.get(name)
+    if cache is None:
+        with _caches_lock:
+            cache = _caches.get(name)
+            if cache is None:
+                cache = _caches[name] = TTLCache(name, **kwargs)
+    return cache
+
+
+def cache_metrics() -> Dict[str, Dict]:
+    """所有共享缓存的统计"""
+    return {name: cache.metrics() for name, cache in list(_caches.items())}
+
+
+def reset_caches():
+    """关闭并丢弃所有共享缓存"""
+    with _caches_lock:
+        for cache in _caches.values():
+            cache.close()
+        _caches.clear()
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+BS支付系统 - 回调去重存储
+
+网关会重推回调，同一通知无需重复验签和处理。
+以 (merchantOrderNo, status, sign) 为键:
+1. 内存LRU（带TTL），重复回调O(1)命中
+2. SQLite追加日志持久化，重启后仍能识别重复回调
+3. 处理前先原子预占键（INSERT OR IGNORE），并发送达的同一回调只有一个会被处理，
+   其余应答"处理中"由网关稍后重推；处理失败时释放预占
+
+作者: OpenClaw
+日期: 2026-02-11
+"""
+
+import json
+import time
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional
+
+
+# 预占中的记录（response为空串，尚未写入应答）
+_PENDING = ""
+
+# 同一回调正在被其他请求处理时的应答（非success，网关会重推）
+IN_PROGRESS = {"code": "fail", "msg": "回调处理中"}
+
+
+class CallbackDedupStore:
+    """回调去重存储（线程安全）"""
+
+    def __init__(
+        self,
+        path: str = "./callback_dedup.db",
+        capacity: int = 100000,
+        ttl: float = 24 * 3600,
+        lease: float = 60
+    ):
+        """
+        初始化
+
+        Args:
+            path: SQLite文件路径（":memory:" 为纯内存）
+            capacity: 内存LRU容量
+            ttl: 记录有效期（秒），超过后视为新回调
+            lease: 预占有效期（秒），处理方崩溃未释放时，超过后允许重新预占
+        """
+        self.path = path
+        self.capacity = capacity
+        self.ttl = ttl
+        self.lease = lease
+        # key -> (过期时间, 应答)
+        self._lru: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "disk_hits": 0, "misses": 0, "stored": 0, "in_progress": 0}
+
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS callback_dedup ("
+            " dedup_key TEXT PRIMARY KEY,"
+            " response TEXT NOT NULL,"
+            " created_at REAL NOT NULL)"
+        )
+        self._db.commit()
+
+    @staticmethod
+    def make_key(data: Dict) -> str:
+        """生成去重键: merchantOrderNo | status | sign"""
+        return f"{data.get('merchantOrderNo', '')}|{data.get('status', '')}|{data.get('sign', '')}"
+
+    def get(self, key: str) -> Optional[Dict]:
+        """
+        查询已处理的回调
+
+        Returns:
+            上次的应答；未处理过或已过期返回None
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._lru.get(key)
+            if entry is not None:
+                expire_at, response = entry
+                if expire_at > now:
+                    self._lru.move_to_end(key)
+                    self.stats["hits"] += 1
+                    return response
+                del self._lru[key]
+
+            # 内存未命中（如重启后），查磁盘日志
+            row = self._db.execute(
+                "SELECT response, created_at FROM callback_dedup WHERE dedup_key = ?",
+                (key,)
+            ).fetchone()
+            if row is not None and row[0] != _PENDING and row[1] + self.ttl > now:
+                response = json.loads(row[0])
+                self._remember(key, row[1] + self.ttl, response)
+                self.stats["disk_hits"] += 1
+                return response
+
+            self.stats["misses"] += 1
+            return None
+
+    def reserve(self, key: str) -> Optional[Dict]:
+        """
+        预占回调（插入预占记录，键已存在时不覆盖），预占成功的调用方负责处理
+        并在结束后调用 put（处理成功）或 release（处理失败）
+
+        Returns:
+            None 表示预占成功；已处理过返回上次应答；正在被处理返回 IN_PROGRESS
+        """
+        response = self.get(key)
+        if response is not None:
+            return response
+
+        now = time.time()
+        with self._lock:
+            with self._db:
+                cursor = self._db.execute(
+                    "INSERT OR IGNORE INTO callback_dedup (dedup_key, response, created_at) VALUES (?, ?, ?)",
+                    (key, _PENDING, now)
+                )
+                if cursor.rowcount == 1:
+                    return None
+
+                # 键已存在: 过期的应答记录或超过预占有效期的预占记录可以接管（比较并交换）
+                cursor = self._db.execute(
+                    "UPDATE callback_dedup SET response = ?, created_at = ?"
+                    " WHERE dedup_key = ? AND ("
+                    "  (response = ? AND created_at <= ?) OR (response != ? AND created_at <= ?))",
+                    (_PENDING, now, key, _PENDING, now - self.lease, _PENDING, now - self.ttl)
+                )
+                if cursor.rowcount == 1:
+                    return None
+
+            row = self._db.execute(
+                "SELECT response FROM callback_dedup WHERE dedup_key = ?", (key,)
+            ).fetchone()
+            if row is not None and row[0] != _PENDING:
+                # 另一个处理方在 get 之后刚完成
+                return json.loads(row[0])
+            self.stats["in_progress"] += 1
+            return IN_PROGRESS
+
+    def release(self, key: str):
+        """释放预占（处理失败，允许重推的回调重新处理）"""
+        with self._lock:
+            self._db.execute(
+                "DELETE FROM callback_dedup WHERE dedup_key = ? AND response = ?", (key, _PENDING)
+            )
+            self._db.commit()
+
+    def put(self, key: str, response: Dict):
+        """记录已处理的回调及其应答"""
+        now = time.time()
+        with self._lock:
+            self._remember(key, now + self.ttl, response)
+            self._db.execute(
+                "INSERT OR REPLACE INTO callback_dedup (dedup_key, response, created_at) VALUES (?, ?, ?)",
+                (key, json.dumps(response, ensure_ascii=False), now)
+            )
+            self._db.commit()
+            self.stats["stored"] += 1
+
+    def _remember(self, key: str, expire_at: float, response: Dict):
+        """写入LRU（调用方持有锁）"""
+        self._lru[key] = (expire_at, response)
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.capacity:
+            self._lru.popitem(last=False)
+
+    def purge_expired(self) -> int:
+        """
+        清理过期记录
+
+        Returns:
+            删除的磁盘记录数
+        """
+        cutoff = time.time() - self.ttl
+        with self._lock:
+            for key in [k for k, (expire_at, _) in self._lru.items() if expire_at <= time.time()]:
+                del self._lru[key]
+            cursor = self._db.execute("DELETE FROM callback_dedup WHERE created_at <= ?", (cutoff,))
+            self._db.commit()
+            return cursor.rowcount
+
+    def close(self):
+        """关闭数据库"""
+        with self._lock:
+            self._db.close()
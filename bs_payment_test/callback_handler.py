@@ -6,31 +6,106 @@ BS支付系统 - 回调处理示例
 包含：
 1. 回调验签
 2. 订单状态处理
-3. 数据库更新
+3. 订单台账更新
 
 作者: OpenClaw
 日期: 2026-02-11
 """
 
 import json
-import hashlib
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 from datetime import datetime
 
+from callback_dedup import CallbackDedupStore
+from order_ledger import OrderLedger
+from order_poller import OrderPoller
+from sign_string import build_sign_string, md5_sign
+
+# 回调等待订单台账落库的最长秒数，超时应答失败由平台重推
+LEDGER_WAIT = 5.0
+
 
 class CallbackHandler:
     """回调处理器"""
     
-    def __init__(self, md5_key: str = "", rsa_public_key: str = ""):
+    def __init__(
+        self,
+        md5_key: str = "",
+        rsa_public_key: str = "",
+        verbose: bool = True,
+        dedup_store: CallbackDedupStore = None,
+        ledger: OrderLedger = None,
+        poller: OrderPoller = None
+    ):
         """
         初始化
         
         Args:
             md5_key: MD5密钥
             rsa_public_key: RSA公钥（平台公钥）
+            verbose: 是否打印回调详情（高并发接收时应关闭）
+            dedup_store: 回调去重存储（可选，重推的回调直接返回上次应答）
+            ledger: 订单台账（可选，回调验签通过后更新订单状态）
+            poller: 订单轮询服务（可选，终态回调到达后停止轮询该订单）
         """
         self.md5_key = md5_key
         self.rsa_public_key = rsa_public_key
+        self.verbose = verbose
+        self.dedup_store = dedup_store
+        self.ledger = ledger
+        self.poller = poller
+    
+    def _log(self, message: str):
+        """打印日志（verbose关闭时不输出）"""
+        if self.verbose:
+            print(message)
+    
+    def _check_duplicate(self, data: Dict) -> Optional[Dict]:
+        """
+        预占回调（并发送达的重复回调只有一个会被处理）
+        
+        Returns:
+            预占成功返回None（处理结束后必须调用 _remember）；
+            已处理过返回上次应答，正在被处理返回"处理中"
+        """
+        if self.dedup_store is None:
+            return None
+        
+        response = self.dedup_store.reserve(self.dedup_store.make_key(data))
+        if response is not None:
+            self._log(f"\n♻️ 重复回调，跳过处理: {data.get('merchantOrderNo')} ({response.get('msg', response.get('code'))})")
+        return response
+    
+    def _update_order(self, data: Dict, order_type: str) -> bool:
+        """
+        更新订单台账（等待该条写入落库），并停止轮询已结束的订单
+
+        Returns:
+            是否已落库（未配置台账时为True）；未落库时不能应答成功，也不能记为已处理
+        """
+        if self.ledger is not None:
+            if not self.ledger.update_status(data.get("merchantOrderNo"), data.get("status"),
+                                             order_type, data, wait=LEDGER_WAIT):
+                self._log(f"   ❌ 订单台账写入超时: {data.get('merchantOrderNo')}")
+                return False
+        if self.poller is not None:
+            self.poller.on_callback(data)
+        return True
+    
+    def _remember(self, data: Dict, response: Dict) -> Dict:
+        """
+        结束预占: 处理成功则记录应答，否则释放（重推的回调可重新处理）
+        
+        Returns:
+            response（原样返回，便于直接作为应答）
+        """
+        if self.dedup_store is not None:
+            key = self.dedup_store.make_key(data)
+            if response.get("code") == "success":
+                self.dedup_store.put(key, response)
+            else:
+                self.dedup_store.release(key)
+        return response
     
     def verify_md5_sign(self, params: Dict, sign: str) -> bool:
         """
@@ -43,18 +118,8 @@ class CallbackHandler:
         Returns:
             验签结果
         """
-        # 过滤sign参数
-        sign_data = {k: v for k, v in params.items() if k != "sign"}
-        
-        # 排序
-        sorted_keys = sorted(sign_data.keys())
-        
-        # 拼接
-        sign_str = "&".join([f"{k}={sign_data[k]}" for k in sorted_keys])
-        sign_str = f"{sign_str}&key={self.md5_key}"
-        
-        # MD5加密
-        calculated = hashlib.md5(sign_str.encode()).hexdigest()
+        # 过滤sign参数和空值 → 排序 → 拼接 → MD5加密
+        calculated = md5_sign(params, self.md5_key)
         
         return calculated == sign
     
@@ -70,25 +135,16 @@ class CallbackHandler:
             验签结果
         """
         try:
-            from cryptography.hazmat.primitives import hashes, serialization
+            from cryptography.hazmat.primitives import hashes
             from cryptography.hazmat.primitives.asymmetric import padding
-            from cryptography.hazmat.backends import default_backend
+            from keystore import KEY_REGISTRY
             import base64
             
-            # 过滤sign参数
-            sign_data = {k: v for k, v in params.items() if k != "sign"}
-            
-            # 排序
-            sorted_keys = sorted(sign_data.keys())
+            # 过滤sign参数和空值 → 排序 → 拼接
+            sign_str = build_sign_string(params)
             
-            # 拼接
-            sign_str = "&".join([f"{k}={sign_data[k]}" for k in sorted_keys])
-            
-            # RSA验签
-            public_key = serialization.load_pem_public_key(
-                self.rsa_public_key.encode(),
-                backend=default_backend()
-            )
+            # RSA验签（公钥对象按指纹缓存）
+            public_key = KEY_REGISTRY.public_key(self.rsa_public_key)
             
             public_key.verify(
                 base64.b64decode(sign),
@@ -100,7 +156,7 @@ class CallbackHandler:
             return True
             
         except Exception as e:
-            print(f"RSA验签失败: {e}")
+            self._log(f"RSA验签失败: {e}")
             return False
     
     def handle_collection_callback(self, data: Dict) -> Dict:
@@ -113,9 +169,13 @@ class CallbackHandler:
         Returns:
             处理结果
         """
-        print("\n" + "="*60)
-        print("📥 收到代收回调")
-        print("="*60)
+        duplicate = self._check_duplicate(data)
+        if duplicate is not None:
+            return duplicate
+        
+        self._log("\n" + "="*60)
+        self._log("📥 收到代收回调")
+        self._log("="*60)
         
         # 解析数据
         merchant_order_no = data.get("merchantOrderNo")
@@ -124,11 +184,11 @@ class CallbackHandler:
         status = data.get("status")
         supplement_state = data.get("supplementOrderState")
         
-        print(f"   商户单号: {merchant_order_no}")
-        print(f"   订单金额: {amount}")
-        print(f"   支付金额: {pay_amount}")
-        print(f"   订单状态: {status} (0=处理中, 1=成功, 2=失败)")
-        print(f"   补单状态: {supplement_state}")
+        self._log(f"   商户单号: {merchant_order_no}")
+        self._log(f"   订单金额: {amount}")
+        self._log(f"   支付金额: {pay_amount}")
+        self._log(f"   订单状态: {status} (0=处理中, 1=成功, 2=失败)")
+        self._log(f"   补单状态: {supplement_state}")
         
         # 验签
         sign = data.get("sign", "")
@@ -139,13 +199,14 @@ class CallbackHandler:
         else:
             is_valid = self.verify_md5_sign(data, sign)
         
-        print(f"   签名验证: {'✅ 通过' if is_valid else '❌ 失败'}")
+        self._log(f"   签名验证: {'✅ 通过' if is_valid else '❌ 失败'}")
         
         if not is_valid:
-            return {"code": "fail", "msg": "签名验证失败"}
+            return self._remember(data, {"code": "fail", "msg": "签名验证失败"})
         
-        # 处理业务逻辑
-        # TODO: 更新数据库订单状态
+        # 处理业务逻辑: 更新订单状态
+        if not self._update_order(data, "collection"):
+            return self._remember(data, {"code": "fail", "msg": "订单台账写入失败"})
         
         status_map = {
             "0": "处理中",
@@ -153,10 +214,10 @@ class CallbackHandler:
             "2": "失败"
         }
         
-        print(f"   业务状态: {status_map.get(str(status), '未知')}")
+        self._log(f"   业务状态: {status_map.get(str(status), '未知')}")
         
         # 返回成功
-        return {"code": "success"}
+        return self._remember(data, {"code": "success"})
     
     def handle_remit_callback(self, data: Dict) -> Dict:
         """
@@ -168,9 +229,13 @@ class CallbackHandler:
         Returns:
             处理结果
         """
-        print("\n" + "="*60)
-        print("📥 收到代付回调")
-        print("="*60)
+        duplicate = self._check_duplicate(data)
+        if duplicate is not None:
+            return duplicate
+        
+        self._log("\n" + "="*60)
+        self._log("📥 收到代付回调")
+        self._log("="*60)
         
         # 解析数据
         merchant_order_no = data.get("merchantOrderNo")
@@ -178,10 +243,10 @@ class CallbackHandler:
         remit_amount = data.get("remitCoinAmount")
         status = data.get("status")
         
-        print(f"   商户单号: {merchant_order_no}")
-        print(f"   订单金额: {amount}")
-        print(f"   出币数量: {remit_amount}")
-        print(f"   订单状态: {status} (0=处理中, 1=成功, 2=失败)")
+        self._log(f"   商户单号: {merchant_order_no}")
+        self._log(f"   订单金额: {amount}")
+        self._log(f"   出币数量: {remit_amount}")
+        self._log(f"   订单状态: {status} (0=处理中, 1=成功, 2=失败)")
         
         # 验签
         sign = data.get("sign", "")
@@ -192,15 +257,16 @@ class CallbackHandler:
         else:
             is_valid = self.verify_md5_sign(data, sign)
         
-        print(f"   签名验证: {'✅ 通过' if is_valid else '❌ 失败'}")
+        self._log(f"   签名验证: {'✅ 通过' if is_valid else '❌ 失败'}")
         
         if not is_valid:
-            return {"code": "fail", "msg": "签名验证失败"}
+            return self._remember(data, {"code": "fail", "msg": "签名验证失败"})
         
-        # 处理业务逻辑
-        # TODO: 更新数据库订单状态
+        # 处理业务逻辑: 更新订单状态
+        if not self._update_order(data, "remit"):
+            return self._remember(data, {"code": "fail", "msg": "订单台账写入失败"})
         
-        return {"code": "success"}
+        return self._remember(data, {"code": "success"})
     
     def handle_quick_pay_callback(self, data: Dict) -> Dict:
         """
@@ -212,9 +278,13 @@ class CallbackHandler:
         Returns:
             处理结果
         """
-        print("\n" + "="*60)
-        print("📥 收到闪付回调")
-        print("="*60)
+        duplicate = self._check_duplicate(data)
+        if duplicate is not None:
+            return duplicate
+        
+        self._log("\n" + "="*60)
+        self._log("📥 收到闪付回调")
+        self._log("="*60)
         
         # 解析数据
         order_no = data.get("orderNo")
@@ -223,21 +293,21 @@ class CallbackHandler:
         status = data.get("status")
         quick_state = data.get("quickState")
         
-        print(f"   平台单号: {order_no}")
-        print(f"   商户单号: {merchant_order_no}")
-        print(f"   支付金额: {pay_amount}")
-        print(f"   订单状态: {status}")
-        print(f"   闪付状态: {quick_state}")
+        self._log(f"   平台单号: {order_no}")
+        self._log(f"   商户单号: {merchant_order_no}")
+        self._log(f"   支付金额: {pay_amount}")
+        self._log(f"   订单状态: {status}")
+        self._log(f"   闪付状态: {quick_state}")
         
         # 验签
         sign = data.get("sign", "")
         is_valid = self.verify_rsa_sign(data, sign)
-        print(f"   签名验证: {'✅ 通过' if is_valid else '❌ 失败'}")
+        self._log(f"   签名验证: {'✅ 通过' if is_valid else '❌ 失败'}")
         
         if not is_valid:
-            return {"code": "fail", "msg": "签名验证失败"}
+            return self._remember(data, {"code": "fail", "msg": "签名验证失败"})
         
-        return {"code": "success"}
+        return self._remember(data, {"code": "success"})
 
 
 # ============== 示例 ==============
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+BS支付系统 - 回调压测工具
+
+模拟网关向回调服务推送MD5签名的代收/代付回调，统计吞吐与应答延迟。
+
+使用示例:
+    # 压测已运行的回调服务
+    python callback_loadgen.py --port 8080 --md5-key xxx --count 20000 --connections 64
+
+    # 在本进程内启动回调服务并压测
+    python callback_loadgen.py --local --count 20000
+
+作者: OpenClaw
+日期: 2026-02-11
+"""
+
+import json
+import time
+import asyncio
+from typing import Dict, List
+
+from aio_http import HTTPConnection
+from sign_string import md5_sign
+
+
+def build_callback(kind: str, index: int, md5_key: str) -> Dict:
+    """
+    构造已签名的回调数据
+
+    Args:
+        kind: collection 或 remit
+        index: 序号（生成唯一商户单号）
+        md5_key: MD5密钥
+    """
+    if kind == "collection":
+        data = {
+            "merchantOrderNo": f"CZ{index:012d}",
+            "merchantId": "10216",
+            "amount": "10",
+            "coinType": "USDT_TRC20",
+            "payCoinAmount": "10",
+            "callbackCurrencyCode": "USDT",
+            "callbackOrderAmount": "10",
+            "supplementOrderState": "0",
+            "status": "1",
+            "signType": "MD5"
+        }
+    else:
+        data = {
+            "merchantOrderNo": f"DF{index:012d}",
+            "merchantId": "10216",
+            "amount": "1",
+            "coinType": "USDT_TRC20",
+            "remitCoinAmount": "1.0000",
+            "callbackCurrencyCode": "USDT",
+            "callbackOrderAmount": "1",
+            "status": "1",
+            "signType": "MD5"
+        }
+    data["sign"] = md5_sign(data, md5_key)
+    return data
+
+
+async def run_load(
+    host: str,
+    port: int,
+    md5_key: str,
+    count: int = 10000,
+    connections: int = 64
+) -> Dict:
+    """
+    执行压测
+
+    Args:
+        host: 回调服务地址
+        port: 回调服务端口
+        md5_key: MD5密钥
+        count: 回调总数
+        connections: 并发连接数
+
+    Returns:
+        统计结果
+    """
+    # 预先构造好请求体，不把签名开销计入服务端吞吐
+    bodies = []
+    for i in range(count):
+        kind = "collection" if i % 2 == 0 else "remit"
+        bodies.append((f"/callback/{kind}", json.dumps(build_callback(kind, i, md5_key)).encode()))
+
+    latencies: List[float] = []
+    results = {"success": 0, "fail": 0, "error": 0}
+    next_index = 0
+
+    async def worker():
+        nonlocal next_index
+        conn = HTTPConnection(host, port)
+        try:
+            while next_index < count:
+                path, body = bodies[next_index]
+                next_index += 1
+                start = time.perf_counter()
+                try:
+                    status, payload = await conn.request("POST", path, body)
+                    code = json.loads(payload).get("code")
+                    results["success" if status == 200 and code == "success" else "fail"] += 1
+                except (OSError, ValueError, asyncio.IncompleteReadError):
+                    results["error"] += 1
+                latencies.append((time.perf_counter() - start) * 1000)
+        finally:
+            await conn.close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(connections)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+
+    def percentile(p: float) -> float:
+        return latencies[min(len(latencies) - 1, int(len(latencies) * p))] if latencies else 0.0
+
+    return {
+        "count": count,
+        "connections": connections,
+        "elapsed_s": elapsed,
+        "rps": count / elapsed if elapsed else 0.0,
+        "p50_ms": percentile(0.50),
+        "p95_ms": percentile(0.95),
+        "p99_ms": percentile(0.99),
+        "max_ms": latencies[-1] if latencies else 0.0,
+        **results
+    }
+
+
+def main():
+    """主程序入口"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="BS支付系统 - 回调压测")
+    parser.add_argument("--host", default="127.0.0.1", help="回调服务地址")
+    parser.add_argument("--port", "-p", type=int, default=8080, help="回调服务端口")
+    parser.add_argument("--md5-key", default="loadtest_md5_key", help="MD5密钥")
+    parser.add_argument("--count", "-n", type=int, default=10000, help="回调总数")
+    parser.add_argument("--connections", "-c", type=int, default=64, help="并发连接数")
+    parser.add_argument("--local", action="store_true", help="在本进程内启动回调服务")
+
+    args = parser.parse_args()
+
+    async def run():
+        server = None
+        host, port = args.host, args.port
+        if args.local:
+            from callback_handler import CallbackHandler
+            from callback_server import CallbackServer
+
+            handler = CallbackHandler(args.md5_key, verbose=False)
+            server = await CallbackServer(handler, "127.0.0.1", 0).start()
+            host, port = "127.0.0.1", server.port
+
+        try:
+            report = await run_load(host, port, args.md5_key, args.count, args.connections)
+        finally:
+            if server is not None:
+                print(f"📊 服务端统计: {server.stats}")
+                await server.stop()
+        return report
+
+    report = asyncio.run(run())
+
+    print("\n" + "=" * 60)
+    print(f"🚀 回调压测: {report['count']} 次，{report['connections']} 个连接")
+    print("=" * 60)
+    print(f"   吞吐: {report['rps']:.0f} 次/秒（{report['elapsed_s']:.2f}s）")
+    print(f"   成功: {report['success']}  失败: {report['fail']}  异常: {report['error']}")
+    print(f"   延迟: p50 {report['p50_ms']:.1f}ms / p95 {report['p95_ms']:.1f}ms / "
+          f"p99 {report['p99_ms']:.1f}ms / max {report['max_ms']:.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+BS支付系统 - 回调接收服务
+
+基于asyncio的HTTP服务，接收网关的异步通知并交给CallbackHandler处理:
+1. 路由: 代收 / 代付 / 闪付 回调
+2. 验签和业务处理在线程池中执行，不阻塞事件循环
+3. 应答延迟有上限（ack_timeout），超时返回fail由网关重推；超时的回调仍在线程池中继续处理，
+   处理完成前到达的重推等待同一个处理结果，不会重复处理
+4. 统计接收量、成功/失败/超时次数
+
+使用示例:
+    python callback_server.py --port 8080 --md5-key xxx
+    # 压测: python callback_loadgen.py --port 8080 --md5-key xxx
+
+作者: OpenClaw
+日期: 2026-02-11
+"""
+
+import os
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Tuple
+
+from callback_dedup import CallbackDedupStore
+from callback_handler import CallbackHandler
+from aio_http import HTTPRequest, HTTPServer
+from order_ledger import OrderLedger
+
+# 回调路径 -> CallbackHandler方法
+ROUTES = {
+    "/callback/collection": "handle_collection_callback",
+    "/callback/remit": "handle_remit_callback",
+    "/callback/quick": "handle_quick_pay_callback"
+}
+
+
+class CallbackServer:
+    """回调接收服务"""
+
+    def __init__(
+        self,
+        handler: CallbackHandler,
+        host: str = "0.0.0.0",
+        port: int = 8080,
+        workers: int = None,
+        ack_timeout: float = 3.0
+    ):
+        """
+        初始化
+
+        Args:
+            handler: 回调处理器（建议 verbose=False）
+            host: 监听地址
+            port: 监听端口
+            workers: 验签线程数（默认CPU核数*4）
+            ack_timeout: 应答超时（秒），超时返回fail
+        """
+        self.handler = handler
+        self.ack_timeout = ack_timeout
+        self.executor = ThreadPoolExecutor(
+            max_workers=workers or (os.cpu_count() or 1) * 4,
+            thread_name_prefix="callback"
+        )
+        self.http = HTTPServer(self.dispatch, host, port)
+        self._inflight: Dict[str, asyncio.Future] = {}     # 处理中的回调（路径|去重键） -> 结果
+        self.stats = {
+            "received": 0,
+            "success": 0,
+            "fail": 0,
+            "timeout": 0,
+            "error": 0
+        }
+
+    @property
+    def port(self) -> int:
+        return self.http.port
+
+    async def dispatch(self, request: HTTPRequest) -> Tuple[int, Dict]:
+        """路由并处理一个回调"""
+        method_name = ROUTES.get(request.path)
+        if method_name is None:
+            return 404, {"code": "fail", "msg": "not found"}
+        if request.method != "POST":
+            return 405, {"code": "fail", "msg": "method not allowed"}
+
+        self.stats["received"] += 1
+
+        try:
+            data = request.json()
+        except ValueError:
+            self.stats["error"] += 1
+            return 400, {"code": "fail", "msg": "invalid body"}
+
+        future = self._submit(request.path, method_name, data)
+
+        try:
+            # shield: 应答超时不取消处理，重推的回调继续等待同一个结果
+            result = await asyncio.wait_for(asyncio.shield(future), self.ack_timeout)
+        except asyncio.TimeoutError:
+            self.stats["timeout"] += 1
+            return 200, {"code": "fail", "msg": "timeout"}
+        except Exception as e:
+            self.stats["error"] += 1
+            return 500, {"code": "fail", "msg": str(e)}
+
+        if result.get("code") == "success":
+            self.stats["success"] += 1
+        else:
+            self.stats["fail"] += 1
+        return 200, result
+
+    def _submit(self, path: str, method_name: str, data: Dict) -> asyncio.Future:
+        """提交回调到线程池；同一回调已在处理中时返回处理中的结果"""
+        key = f"{path}|{CallbackDedupStore.make_key(data)}"
+        future = self._inflight.get(key)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = loop.run_in_executor(self.executor, getattr(self.handler, method_name), data)
+            self._inflight[key] = future
+            future.add_done_callback(lambda done: self._finish(key, done))
+        return future
+
+    def _finish(self, key: str, future: asyncio.Future):
+        """处理结束: 移出处理中列表（结果已记入去重存储）"""
+        self._inflight.pop(key, None)
+        if not future.cancelled():
+            # 应答已超时、无人等待时，取出异常避免“未读取异常”警告
+            future.exception()
+
+    async def start(self) -> "CallbackServer":
+        """启动监听"""
+        await self.http.start()
+        return self
+
+    async def serve_forever(self):
+        """持续运行"""
+        await self.http.serve_forever()
+
+    async def stop(self):
+        """停止服务"""
+        await self.http.stop()
+        self.executor.shutdown(wait=False)
+
+
+# ============== 主程序 ==============
+def main():
+    """主程序入口"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="BS支付系统 - 回调接收服务")
+    parser.add_argument("--host", default="0.0.0.0", help="监听地址")
+    parser.add_argument("--port", "-p", type=int, default=8080, help="监听端口")
+    parser.add_argument("--md5-key", default="", help="MD5密钥")
+    parser.add_argument("--rsa-public-key-file", default="", help="平台RSA公钥文件")
+    parser.add_argument("--workers", type=int, default=None, help="验签线程数")
+    parser.add_argument("--ack-timeout", type=float, default=3.0, help="应答超时（秒）")
+    parser.add_argument("--verbose", action="store_true", help="打印每个回调详情")
+    parser.add_argument("--dedup-db", default="./callback_dedup.db",
+                        help="回调去重存储路径（空字符串为关闭去重）")
+    parser.add_argument("--ledger-db", default="./orders.db",
+                        help="订单台账路径（空字符串为不记录）")
+
+    args = parser.parse_args()
+
+    rsa_public_key = ""
+    if args.rsa_public_key_file:
+        with open(args.rsa_public_key_file, "r", encoding="utf-8") as f:
+            rsa_public_key = f.read()
+
+    dedup_store = CallbackDedupStore(args.dedup_db) if args.dedup_db else None
+    ledger = OrderLedger(args.ledger_db) if args.ledger_db else None
+    handler = CallbackHandler(
+        args.md5_key, rsa_public_key,
+        verbose=args.verbose, dedup_store=dedup_store, ledger=ledger
+    )
+    server = CallbackServer(handler, args.host, args.port, args.workers, args.ack_timeout)
+
+    async def run():
+        await server.start()
+        print(f"🚀 回调服务已启动: http://{args.host}:{server.port}")
+        for path in ROUTES:
+            print(f"   POST {path}")
+        try:
+            await server.serve_forever()
+        finally:
+            print(f"\n📊 统计: {server.stats}")
+            if ledger is not None:
+                ledger.close()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
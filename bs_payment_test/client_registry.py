@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+BS支付系统 - 多商户客户端注册表
+
+一个进程内运行多个商户号时，按商户ID获取各自的客户端:
+1. 每个商户独立: 商户ID、MD5密钥、RSA密钥（注册时解析一次，按名称 "<商户ID>:private" 登记）
+2. 所有商户共享: 连接池（transport.py）、端点限流熔断（resilience.py）、重试预算（retry.py）、
+   汇率/余额缓存（cache.py，缓存键含商户ID，互不串数据）
+3. 客户端在注册时创建，get() 只是一次字典查找；不打印初始化信息
+4. 重新注册同一商户（如密钥轮换）会替换客户端，并淘汰不再使用的旧密钥
+
+使用示例:
+    registry = get_registry()
+    registry.register({"id": "10216", "md5_key": "...", "rsa_private_key": "..."})
+    registry.register(API_CONFIG["merchant"], env="test")     # cfb_bs_unified/api/config.py
+    client = registry.get("10228")
+    client.query_balance("USDT")
+
+作者: OpenClaw
+日期: 2026-02-11
+"""
+
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from bs_api_client import CONFIG, BSClient
+
+# 商户配置字段
+MERCHANT_FIELDS = ("id", "md5_key", "rsa_private_key", "rsa_public_key")
+
+
+class ClientRegistry:
+    """商户客户端注册表（线程安全，读取无锁）"""
+
+    def __init__(self, env: str = "test", client_class: type = BSClient):
+        """
+        初始化
+
+        Args:
+            env: 默认环境（test/production/mock）
+            client_class: 客户端类（BSClient 或其子类，如压测用的 MeteredBSClient）
+        """
+        self.env = env
+        self.client_class = client_class
+        self._clients: Dict[Tuple[str, str], BSClient] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _load_keys(merchant: Dict):
+        """解析并登记商户RSA密钥（同一PEM只解析一次，轮换时淘汰旧密钥）"""
+        if not (merchant.get("rsa_private_key") or merchant.get("rsa_public_key")):
+            return
+        try:
+            from keystore import KEY_REGISTRY
+        except ImportError:
+            print("❌ 需要安装cryptography库: pip install cryptography")
+            return
+        if merchant.get("rsa_private_key"):
+            KEY_REGISTRY.rotate(f"{merchant['id']}:private", merchant["rsa_private_key"], private=True)
+        if merchant.get("rsa_public_key"):
+            KEY_REGISTRY.rotate(f"{merchant['id']}:public", merchant["rsa_public_key"], private=False)
+
+    def register(self, merchant: Dict, env: str = None) -> BSClient:
+        """
+        注册商户（已注册时替换）
+
+        Args:
+            merchant: 商户配置（id 必填，md5_key/rsa_private_key/rsa_public_key 可选）
+            env: 环境（默认注册表的默认环境）
+
+        Returns:
+            该商户的客户端
+        """
+        if not merchant.get("id"):
+            raise ValueError("商户配置缺少 id")
+        env = env or self.env
+        if env not in CONFIG or "base_url" not in CONFIG[env]:
+            raise ValueError(f"未知环境: {env}")
+
+        config = {field: merchant.get(field) or "" for field in MERCHANT_FIELDS}
+        config["id"] = str(config["id"])
+        self._load_keys(config)
+        client = self.client_class(env, merchant=config, verbose=False)
+        with self._lock:
+            self._clients[(env, config["id"])] = client
+        return client
+
+    def register_many(self, merchants: Iterable[Dict], env: str = None) -> int:
+        """批量注册，返回注册数量"""
+        count = 0
+        for merchant in merchants:
+            self.register(merchant, env)
+            count += 1
+        return count
+
+    def get(self, merchant_id: str, env: str = None) -> BSClient:
+        """
+        获取商户客户端
+
+        Raises:
+            KeyError: 商户未注册
+        """
+        client = self._clients.get((env or self.env, str(merchant_id)))
+        if client is None:
+            raise KeyError(f"商户未注册: {merchant_id}（{env or self.env}）")
+        return client
+
+    def find(self, merchant_id: str, env: str = None) -> Optional[BSClient]:
+        """获取商户客户端，未注册返回None"""
+        return self._clients.get((env or self.env, str(merchant_id)))
+
+    def unregister(self, merchant_id: str, env: str = None) -> bool:
+        """注销商户（密钥仍保留在密钥注册表中，直到被轮换或淘汰）"""
+        with self._lock:
+            return self._clients.pop((env or self.env, str(merchant_id)), None) is not None
+
+    def merchants(self, env: str = None) -> List[str]:
+        """已注册的商户ID"""
+        env = env or self.env
+        return sorted(merchant_id for client_env, merchant_id in list(self._clients) if client_env == env)
+
+    def __contains__(self, merchant_id: str) -> bool:
+        return (self.env, str(merchant_id)) in self._clients
+
+    def __len__(self) -> int:
+        return len(self._clients)
+
+    def clear(self):
+        with self._lock:
+            self._clients.clear()
+
+
+# ============== 进程级共享实例 ==============
+_registries: Dict[str, ClientRegistry] = {}
+_registries_lock = threading.Lock()
+
+
+def get_registry(key: str = "default", **kwargs) -> ClientRegistry:
+    """
+    获取共享注册表（首次调用时按参数创建）
+
+    Args:
+        key: 共享键
+        **kwargs: ClientRegistry初始化参数，仅首次调用生效
+    """
+    registry = _registries.get(key)
+    if registry is None:
+        with _registries_lock:
+            registry = _registries.get(key)
+            if registry is None:
+                registry = _registries[key] = ClientRegistry(**kwargs)
+    return registry
+
+
+def get_client(merchant_id: str, env: str = None) -> BSClient:
+    """从默认注册表获取商户客户端"""
+    return get_registry().get(merchant_id, env)
+
+
+def reset_registries():
+    """丢弃所有共享注册表"""
+    with _registries_lock:
+        _registries.clear()
+
+
+# ============== 主程序 ==============
+def main():
+    """主程序入口: 为多个商户查询余额"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="BS支付系统 - 多商户余额查询")
+    parser.add_argument("--env", "-e", choices=["test", "production", "mock"], default="test", help="环境")
+    parser.add_argument("--merchant", "-m", action="append", default=[],
+                        help="商户ID:MD5密钥（可重复）；未指定时使用 CONFIG['merchant']")
+    parser.add_argument("--coin-type", default="USDT", help="币种")
+    args = parser.parse_args()
+
+    CONFIG["logging"]["level"] = "WARNING"
+    registry = get_registry(env=args.env)
+    if args.merchant:
+        for item in args.merchant:
+            merchant_id, _, md5_key = item.partition(":")
+            registry.register({"id": merchant_id, "md5_key": md5_key})
+    else:
+        registry.register(CONFIG["merchant"])
+
+    print(f"\n🏪 {len(registry)} 个商户（{args.env}）")
+    for merchant_id in registry.merchants():
+        result = registry.get(merchant_id).query_balance(args.coin_type, use_cache=False)
+        if str(result.get("code")) == "0":
+            print(f"   ✅ {merchant_id}: {result.get('data')}")
+        else:
+            print(f"   ❌ {merchant_id}: {result.get('msg')}")
+
+    stats = registry.get(registry.merchants()[0]).pool_stats()
+    print(f"\n🔌 连接池: {stats}")
+
+
+if __name__ == "__main__":
+    main()
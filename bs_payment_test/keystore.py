@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+BS支付系统 - RSA密钥注册表
+
+PEM解析的开销远大于一次SHA1/SHA256签名，因此每个PEM只解析一次，
+解析后的密钥对象按指纹（PEM内容的SHA256）缓存，签名/验签直接复用。
+
+功能:
+1. 按指纹缓存私钥/公钥对象
+2. 命名密钥的轮换（rotate）
+3. 按指纹或PEM淘汰（evict）
+
+作者: OpenClaw
+日期: 2026-02-11
+"""
+
+import hashlib
+import threading
+from typing import Any, Dict, Optional
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.backends import default_backend
+
+
+class KeyRegistry:
+    """RSA密钥注册表（线程安全）"""
+
+    def __init__(self):
+        self._keys: Dict[str, Any] = {}          # 指纹 -> 密钥对象
+        self._fingerprints: Dict[str, str] = {}  # PEM -> 指纹
+        self._names: Dict[str, str] = {}         # 名称 -> 指纹
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def fingerprint(pem: str) -> str:
+        """计算PEM指纹"""
+        return hashlib.sha256(pem.strip().encode("utf-8")).hexdigest()
+
+    def _load(self, pem: str, private: bool) -> Any:
+        """查缓存，未命中则解析PEM"""
+        fp = self._fingerprints.get(pem)
+        if fp is not None:
+            key = self._keys.get(fp)
+            if key is not None:
+                return key
+
+        fp = self.fingerprint(pem)
+        with self._lock:
+            key = self._keys.get(fp)
+            if key is None:
+                if private:
+                    key = serialization.load_pem_private_key(
+                        pem.encode("utf-8"),
+                        password=None,
+                        backend=default_backend()
+                    )
+                else:
+                    key = serialization.load_pem_public_key(
+                        pem.encode("utf-8"),
+                        backend=default_backend()
+                    )
+                self._keys[fp] = key
+            self._fingerprints[pem] = fp
+        return key
+
+    def private_key(self, pem: str) -> Any:
+        """获取私钥对象（首次调用时解析）"""
+        return self._load(pem, private=True)
+
+    def public_key(self, pem: str) -> Any:
+        """获取公钥对象（首次调用时解析）"""
+        return self._load(pem, private=False)
+
+    # ============== 命名密钥 ==============
+    def register(self, name: str, pem: str, private: bool = True) -> str:
+        """
+        注册命名密钥
+
+        Args:
+            name: 密钥名称（如 "10216:private"）
+            pem: PEM内容
+            private: 是否为私钥
+
+        Returns:
+            密钥指纹
+        """
+        self._load(pem, private)
+        fp = self.fingerprint(pem)
+        with self._lock:
+            self._names[name] = fp
+        return fp
+
+    def get(self, name: str) -> Optional[Any]:
+        """按名称获取密钥对象"""
+        fp = self._names.get(name)
+        return self._keys.get(fp) if fp else None
+
+    def rotate(self, name: str, new_pem: str, private: bool = True) -> str:
+        """
+        轮换命名密钥: 注册新密钥，并淘汰旧密钥（若无其他名称引用）
+
+        Returns:
+            新密钥指纹
+        """
+        old_fp = self._names.get(name)
+        new_fp = self.register(name, new_pem, private)
+        if old_fp and old_fp != new_fp and old_fp not in self._names.values():
+            self.evict(old_fp)
+        return new_fp
+
+    def evict(self, key: str):
+        """
+        淘汰密钥
+
+        Args:
+            key: 指纹或PEM内容
+        """
+        with self._lock:
+            fp = self._fingerprints.get(key, key)
+            self._keys.pop(fp, None)
+            for pem in [p for p, f in self._fingerprints.items() if f == fp]:
+                del self._fingerprints[pem]
+            for name in [n for n, f in self._names.items() if f == fp]:
+                del self._names[name]
+
+    def clear(self):
+        """清空全部缓存"""
+        with self._lock:
+            self._keys.clear()
+            self._fingerprints.clear()
+            self._names.clear()
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __contains__(self, key: str) -> bool:
+        return self._fingerprints.get(key, key) in self._keys
+
+
+# 进程内共享的默认注册表
+KEY_REGISTRY = KeyRegistry()
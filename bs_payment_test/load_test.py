@@ -0,0 +1,474 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+BS支付系统 - 压测工具
+
+按目标RPS或并发数，在指定时长内重复执行 BSTestCases 的测试场景:
+1. 并发模式（--concurrency）: N个线程连续执行场景（闭环）
+2. RPS模式（--rps）: 按固定间隔发起场景（开环），场景延迟从计划发起时间算起，
+   并发已满时跳过并计入 dropped，避免协调遗漏（coordinated omission）
+3. 按端点、按场景统计延迟直方图（p50/p95/p99/max）和错误率
+4. 输出JSON报告，便于对比不同版本/配置
+5. 汇率/余额查询默认绕过客户端缓存，每个场景都请求网关（--cache 测量带缓存的客户端）
+
+使用示例:
+    python load_test.py --env test --test collection --rps 20 --duration 60 --report report.json
+    python load_test.py --mock --test all --concurrency 32 --duration 30
+    python quick_test.py --env test --test collection --duration 60 --rps 20
+
+作者: OpenClaw
+日期: 2026-02-11
+"""
+
+import json
+import math
+import time
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from bs_api_client import BSClient, BSTestCases, CONFIG
+from resilience import guard_metrics
+from retry import retry_metrics
+
+
+# ============== 延迟统计 ==============
+class LatencyHistogram:
+    """对数分桶延迟直方图（相对误差约1%，内存与样本数无关）"""
+
+    GROWTH = 1.02
+    MIN_MS = 0.001
+
+    _LOG_GROWTH = math.log(GROWTH)
+
+    def __init__(self):
+        self.buckets: Dict[int, int] = {}
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, latency_ms: float):
+        """记录一个样本（毫秒）"""
+        bucket = int(math.log(max(latency_ms, self.MIN_MS) / self.MIN_MS) / self._LOG_GROWTH)
+        self.buckets[bucket] = self.buckets.get(bucket, 0) + 1
+        self.count += 1
+        self.total += latency_ms
+        if latency_ms > self.max:
+            self.max = latency_ms
+
+    def percentile(self, p: float) -> float:
+        """
+        百分位延迟（毫秒）
+
+        Args:
+            p: 百分位（0-100）
+        """
+        if not self.count:
+            return 0.0
+        rank = max(1, math.ceil(p / 100 * self.count))
+        seen = 0
+        for bucket in sorted(self.buckets):
+            seen += self.buckets[bucket]
+            if seen >= rank:
+                # 取桶的几何中点，不超过实测最大值
+                return min(self.MIN_MS * self.GROWTH ** (bucket + 0.5), self.max)
+        return self.max
+
+    def summary(self) -> Dict:
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total / self.count, 2) if self.count else 0.0,
+            "p50_ms": round(self.percentile(50), 2),
+            "p95_ms": round(self.percentile(95), 2),
+            "p99_ms": round(self.percentile(99), 2),
+            "max_ms": round(self.max, 2)
+        }
+
+
+class LoadRecorder:
+    """压测结果收集（线程安全）"""
+
+    # 每个端点/场景保留的错误信息种类数
+    MAX_ERROR_SAMPLES = 5
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.endpoints: Dict[str, Dict] = {}
+        self.scenarios: Dict[str, Dict] = {}
+        self.dropped = 0
+
+    @staticmethod
+    def _new_entry() -> Dict:
+        return {"histogram": LatencyHistogram(), "errors": 0, "error_samples": Counter()}
+
+    def _record(self, table: Dict, name: str, latency_ms: float, error: Optional[str]):
+        with self._lock:
+            entry = table.get(name)
+            if entry is None:
+                entry = table[name] = self._new_entry()
+            entry["histogram"].record(latency_ms)
+            if error is not None:
+                entry["errors"] += 1
+                samples = entry["error_samples"]
+                if error in samples or len(samples) < self.MAX_ERROR_SAMPLES:
+                    samples[error] += 1
+
+    def record_request(self, endpoint: str, latency_ms: float, error: Optional[str] = None):
+        self._record(self.endpoints, endpoint, latency_ms, error)
+
+    def record_scenario(self, name: str, latency_ms: float, error: Optional[str] = None):
+        self._record(self.scenarios, name, latency_ms, error)
+
+    def record_dropped(self):
+        with self._lock:
+            self.dropped += 1
+
+    @staticmethod
+    def _summarize(table: Dict) -> Dict:
+        result = {}
+        for name, entry in sorted(table.items()):
+            summary = entry["histogram"].summary()
+            summary["errors"] = entry["errors"]
+            summary["error_rate"] = round(entry["errors"] / summary["count"], 4) if summary["count"] else 0.0
+            summary["error_samples"] = dict(entry["error_samples"])
+            result[name] = summary
+        return result
+
+    def summary(self) -> Dict:
+        with self._lock:
+            return {
+                "endpoints": self._summarize(self.endpoints),
+                "scenarios": self._summarize(self.scenarios),
+                "dropped": self.dropped
+            }
+
+
+class MeteredBSClient(BSClient):
+    """记录每个端点延迟和错误的BSClient"""
+
+    def __init__(self, env: str = "test", recorder: LoadRecorder = None, **kwargs):
+        super().__init__(env, **kwargs)
+        self.recorder = recorder or LoadRecorder()
+
+    def _request(self, endpoint: str, params: Dict, sign_type: str = "RSA") -> Dict:
+        start = time.perf_counter()
+        result = super()._request(endpoint, params, sign_type)
+        latency_ms = (time.perf_counter() - start) * 1000
+        error = None if result.get("code") == "0" else f"{result.get('code')}: {result.get('msg')}"
+        self.recorder.record_request(endpoint, latency_ms, error)
+        return result
+
+
+# ============== 场景（BSTestCases的测试方法） ==============
+# 场景名 -> BSTestCases方法（代付只查询一次，压测不等待终态）
+SCENARIOS: Dict[str, str] = {
+    "channel_rate": "test_channel_rate",
+    "balance": "test_balance",
+    "collection_trc20": "test_collection_trc20",
+    "collection_cny": "test_collection_cny",
+    "remit_trc20": "test_remit_trc20"
+}
+
+# 测试类型（与 bs_api_client.py / quick_test.py 的 --test 一致） -> 场景
+TEST_SCENARIOS = {
+    "all": ["channel_rate", "balance", "collection_trc20", "collection_cny", "remit_trc20"],
+    "collection": ["collection_trc20", "collection_cny"],
+    "remit": ["remit_trc20"],
+    "balance": ["balance"]
+}
+
+
+# ============== 压测执行 ==============
+class LoadTest:
+    """压测执行器"""
+
+    def __init__(
+        self,
+        client: MeteredBSClient,
+        scenarios: List[str],
+        duration: float = 60,
+        rps: float = None,
+        concurrency: int = 16,
+        use_cache: bool = False
+    ):
+        """
+        初始化
+
+        Args:
+            client: 带统计的客户端
+            scenarios: 场景名列表（轮流执行）
+            duration: 压测时长（秒）
+            rps: 目标场景发起速率（每秒）；为空时使用并发模式
+            concurrency: 并发数（RPS模式下为最大在途场景数）
+            use_cache: 汇率/余额查询是否使用缓存（默认不使用，测量网关而不是缓存）
+        """
+        unknown = [name for name in scenarios if name not in SCENARIOS]
+        if unknown:
+            raise ValueError(f"未知场景: {unknown}")
+        self.client = client
+        self.recorder = client.recorder
+        self.scenarios = scenarios
+        self.duration = duration
+        self.rps = rps
+        self.concurrency = concurrency
+        self.use_cache = use_cache
+        self._index = 0
+        self._index_lock = threading.Lock()
+        self._local = threading.local()
+
+    def _next_scenario(self) -> str:
+        with self._index_lock:
+            name = self.scenarios[self._index % len(self.scenarios)]
+            self._index += 1
+        return name
+
+    def _test_cases(self) -> BSTestCases:
+        """本线程的测试用例实例（共用带统计的客户端，结果列表各线程独立）"""
+        cases = getattr(self._local, "cases", None)
+        if cases is None:
+            cases = self._local.cases = BSTestCases(client=self.client, poll_timeout=0, verbose=False,
+                                                    use_cache=self.use_cache)
+        return cases
+
+    def _run_scenario(self, name: str, started: float = None):
+        """执行一次场景；started 为计划发起时间（RPS模式）"""
+        if started is None:
+            started = time.perf_counter()
+        cases = self._test_cases()
+        cases.results.clear()
+        try:
+            getattr(cases, SCENARIOS[name])()
+            # 场景错误为第一个失败的测试步骤
+            error = next((r["name"] for r in cases.results if not r["success"]), None)
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+        self.recorder.record_scenario(name, (time.perf_counter() - started) * 1000, error)
+
+    def _run_closed_loop(self, deadline: float):
+        def worker():
+            while time.perf_counter() < deadline:
+                self._run_scenario(self._next_scenario())
+
+        threads = [
+            threading.Thread(target=worker, name=f"load-{i}", daemon=True)
+            for i in range(self.concurrency)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    def _run_open_loop(self, start: float, deadline: float):
+        interval = 1.0 / self.rps
+        slots = threading.Semaphore(self.concurrency)
+
+        def run(name: str, intended: float):
+            try:
+                self._run_scenario(name, intended)
+            finally:
+                slots.release()
+
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="load") as executor:
+            tick = 0
+            while True:
+                intended = start + tick * interval
+                if intended >= deadline:
+                    break
+                tick += 1
+                delay = intended - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                if not slots.acquire(blocking=False):
+                    self.recorder.record_dropped()
+                    continue
+                executor.submit(run, self._next_scenario(), intended)
+
+    def run(self) -> Dict:
+        """
+        执行压测
+
+        Returns:
+            报告（见 build_report）
+        """
+        started_at = datetime.now()
+        start = time.perf_counter()
+        deadline = start + self.duration
+        if self.rps:
+            self._run_open_loop(start, deadline)
+        else:
+            self._run_closed_loop(deadline)
+        return self.build_report(started_at, time.perf_counter() - start)
+
+    def build_report(self, started_at: datetime, elapsed: float) -> Dict:
+        """生成报告"""
+        summary = self.recorder.summary()
+        requests = sum(e["count"] for e in summary["endpoints"].values())
+        request_errors = sum(e["errors"] for e in summary["endpoints"].values())
+        scenarios = sum(s["count"] for s in summary["scenarios"].values())
+        scenario_errors = sum(s["errors"] for s in summary["scenarios"].values())
+        return {
+            "started_at": started_at.strftime("%Y-%m-%d %H:%M:%S"),
+            "base_url": self.client.base_url,
+            "mode": "rps" if self.rps else "concurrency",
+            "target_rps": self.rps,
+            "concurrency": self.concurrency,
+            "use_cache": self.use_cache,
+            "duration_s": self.duration,
+            "elapsed_s": round(elapsed, 2),
+            "totals": {
+                "scenarios": scenarios,
+                "scenario_errors": scenario_errors,
+                "scenario_error_rate": round(scenario_errors / scenarios, 4) if scenarios else 0.0,
+                "scenarios_per_sec": round(scenarios / elapsed, 2) if elapsed else 0.0,
+                "requests": requests,
+                "request_errors": request_errors,
+                "request_error_rate": round(request_errors / requests, 4) if requests else 0.0,
+                "requests_per_sec": round(requests / elapsed, 2) if elapsed else 0.0,
+                "dropped": summary["dropped"]
+            },
+            "scenarios": summary["scenarios"],
+            "endpoints": summary["endpoints"],
+            "resilience": guard_metrics(),
+            "retry": retry_metrics()
+        }
+
+
+def print_report(report: Dict):
+    """打印报告摘要"""
+    totals = report["totals"]
+    print("\n" + "=" * 100)
+    print(f"📊 压测结果（{report['mode']}，{report['elapsed_s']}s，{report['base_url']}）")
+    print("=" * 100)
+    print(f"   场景: {totals['scenarios']}（{totals['scenarios_per_sec']}/s），"
+          f"失败率 {totals['scenario_error_rate'] * 100:.2f}%")
+    print(f"   请求: {totals['requests']}（{totals['requests_per_sec']}/s），"
+          f"失败率 {totals['request_error_rate'] * 100:.2f}%")
+    if totals["dropped"]:
+        print(f"   ⚠️ 并发已满跳过: {totals['dropped']}")
+
+    for title, table in (("场景", report["scenarios"]), ("端点", report["endpoints"])):
+        print(f"\n   {title:<40}{'次数':>8}{'失败率':>9}{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}")
+        for name, s in table.items():
+            print(f"   {name:<40}{s['count']:>8}{s['error_rate'] * 100:>8.2f}%"
+                  f"{s['p50_ms']:>9.1f}{s['p95_ms']:>9.1f}{s['p99_ms']:>9.1f}{s['max_ms']:>9.1f}")
+            for error, count in s["error_samples"].items():
+                print(f"      ❌ {error}（{count}次）")
+
+
+def run_load_test(
+    env: str = "test",
+    test_type: str = "all",
+    duration: float = 60,
+    rps: float = None,
+    concurrency: int = 16,
+    report_path: str = "",
+    base_url: str = None,
+    use_cache: bool = False
+) -> Dict:
+    """
+    执行压测并输出报告
+
+    Args:
+        env: 环境（test/production/mock）
+        test_type: 测试类型（all/collection/remit/balance）
+        duration: 时长（秒）
+        rps: 目标场景速率（为空时使用并发模式）
+        concurrency: 并发数
+        report_path: JSON报告路径（空为不写文件）
+        base_url: 覆盖环境的基础URL（如本进程启动的模拟网关）
+        use_cache: 汇率/余额查询是否使用缓存
+
+    Returns:
+        报告
+    """
+    client = MeteredBSClient(env)
+    if base_url:
+        client.base_url = base_url
+
+    mode = f"目标 {rps} 场景/秒，最大并发 {concurrency}" if rps else f"并发 {concurrency}"
+    print(f"\n🚀 压测: {test_type}（{', '.join(TEST_SCENARIOS[test_type])}），{mode}，时长 {duration}s")
+
+    report = LoadTest(client, TEST_SCENARIOS[test_type], duration, rps, concurrency, use_cache).run()
+    report["env"] = env
+    report["test"] = test_type
+    print_report(report)
+
+    if report_path:
+        with open(report_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"\n📝 报告已写入: {report_path}")
+    return report
+
+
+# ============== 主程序 ==============
+def add_load_arguments(parser):
+    """添加压测参数（quick_test.py 共用）"""
+    parser.add_argument("--duration", type=float, default=0, help="压测时长（秒，0为不压测）")
+    parser.add_argument("--rps", type=float, default=None, help="目标场景速率（每秒，不指定则为并发模式）")
+    parser.add_argument("--concurrency", "-c", type=int, default=16, help="并发数")
+    parser.add_argument("--report", default="", help="JSON报告路径")
+    parser.add_argument("--log-level", choices=["DEBUG", "INFO", "WARNING", "ERROR", "OFF"],
+                        default="OFF", help="压测期间的请求日志级别")
+    parser.add_argument("--no-rate-limit", action="store_true",
+                        help="关闭客户端限流（测量网关容量时使用，熔断仍生效）")
+    parser.add_argument("--cache", action="store_true",
+                        help="汇率/余额查询使用客户端缓存（默认绕过缓存，每次都请求网关）")
+
+
+def apply_load_arguments(args):
+    """应用压测参数中的全局配置"""
+    CONFIG["logging"]["level"] = args.log_level
+    if args.no_rate_limit:
+        for limit in CONFIG["resilience"]["rate_limits"].values():
+            limit["rate"] = 0
+
+
+def main():
+    """主程序入口"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="BS支付系统 - 压测工具")
+    parser.add_argument("--env", "-e", choices=["test", "production", "mock"],
+                        default="test", help="环境配置")
+    parser.add_argument("--test", "-t", choices=list(TEST_SCENARIOS), default="all", help="测试类型")
+    add_load_arguments(parser)
+    parser.add_argument("--mock", action="store_true", help="在本进程启动模拟网关并压测")
+    parser.add_argument("--mock-latency-ms", type=float, default=0, help="模拟网关延迟（毫秒）")
+    parser.add_argument("--mock-error-rate", type=float, default=0, help="模拟网关业务错误率")
+
+    args = parser.parse_args()
+    apply_load_arguments(args)
+
+    gateway = None
+    base_url = None
+    if args.mock:
+        from mock_gateway import MockGateway
+        gateway = MockGateway(
+            port=0,
+            md5_key=CONFIG["merchant"]["md5_key"],
+            latency_ms=args.mock_latency_ms,
+            error_rate=args.mock_error_rate,
+            callback_delay=-1
+        ).start_background()
+        base_url = gateway.base_url
+        print(f"🧪 模拟网关: {base_url}")
+
+    try:
+        run_load_test(
+            "mock" if args.mock else args.env, args.test,
+            duration=args.duration or 30,
+            rps=args.rps,
+            concurrency=args.concurrency,
+            report_path=args.report,
+            base_url=base_url,
+            use_cache=args.cache
+        )
+    finally:
+        if gateway is not None:
+            gateway.stop_background()
+
+
+if __name__ == "__main__":
+    main()
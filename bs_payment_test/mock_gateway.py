@@ -0,0 +1,552 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+BS支付系统 - 本地模拟网关
+
+离线替代 test-gateway.cfbaopay.com，用于可复现的吞吐/延迟测试:
+1. 接口: 代收（payOrder）、代付（remitOrder）、CNY代付（remitMatchOrder）、
+   余额、通道汇率、闪付地址，请求/响应格式与正式网关一致
+2. 验签: 按 signType 校验MD5/RSA签名（未配置对应密钥时跳过）
+3. 故障注入: 固定延迟 + 抖动、业务错误率、HTTP 503错误率
+4. 回调: 下单后延迟推送已签名的回调到 notifyUrl（http/https），未应答success时按退避重推；
+   notifyUrl 指向外部主机时默认不推送并告警（--callback-base 改写到本地服务，
+   或 --allow-remote-callbacks 允许推送）
+
+使用示例:
+    python mock_gateway.py --port 8090 --md5-key xxx --latency-ms 20 --error-rate 0.01
+    python bs_api_client.py --env mock
+
+    # 在测试进程内启动（后台线程）
+    gateway = MockGateway(md5_key="xxx", latency_ms=5).start_background()
+    ...
+    gateway.stop_background()
+
+作者: OpenClaw
+日期: 2026-02-11
+"""
+
+import base64
+import random
+import asyncio
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlsplit, urlunsplit
+
+from aio_http import HTTPRequest, HTTPServer, post_json
+from sign_string import build_sign_string, md5_sign
+
+# 响应码（与正式网关一致）
+CODE_SUCCESS = "0"
+CODE_SIGN_ERROR = "1"
+CODE_PARAM_ERROR = "2"
+CODE_NOT_FOUND = "5"
+CODE_DUPLICATE = "7"
+CODE_SYSTEM_BUSY = "500"
+
+# 默认允许推送回调的本地主机
+LOCAL_HOSTS = ("127.0.0.1", "localhost", "::1")
+
+# 端点 -> (处理方法, 必填参数)
+ROUTES = {
+    "/api/coin/payOrder/create": (
+        "_create_collection", ("merchantOrderNo", "amount", "coinType", "callbackCurrencyCode", "notifyUrl")
+    ),
+    "/api/coin/payOrder/createCashier": (
+        "_create_collection", ("merchantOrderNo", "amount", "coinType", "callbackCurrencyCode", "notifyUrl")
+    ),
+    "/api/coin/payOrder/query": ("_query_order", ("merchantOrderNo",)),
+    "/api/coin/remitOrder/create": (
+        "_create_remit",
+        ("merchantOrderNo", "amount", "coinType", "bookingAddress", "callbackCurrencyCode", "notifyUrl")
+    ),
+    "/api/coin/remitOrder/query": ("_query_order", ("merchantOrderNo",)),
+    "/api/remitMatchOrder/create": (
+        "_create_cny_remit",
+        ("merchantOrderNo", "amount", "bankCode", "bankcardAccountNo", "bankcardAccountName", "notifyUrl")
+    ),
+    "/api/remitMatchOrder/query": ("_query_order", ("merchantOrderNo",)),
+    "/api/coin/balance/query": ("_query_balance", ("coinType",)),
+    "/api/merchant/queryChannelRate": ("_query_channel_rate", ("coinType",)),
+    "/api/coin/quick/queryAddress": ("_query_address", ("memberNo", "coinType"))
+}
+
+# 查询端点只能查到对应类型的订单
+QUERY_ORDER_TYPES = {
+    "/api/coin/payOrder/query": "collection",
+    "/api/coin/remitOrder/query": "remit",
+    "/api/remitMatchOrder/query": "cny_remit"
+}
+
+# 通道汇率（模拟值）
+CHANNEL_RATES = {
+    "USDT_TRC20": {"collectionExchangeRate": "7.20", "paymentExchangeRate": "7.25"},
+    "USDT_BEP20": {"collectionExchangeRate": "7.20", "paymentExchangeRate": "7.25"},
+    "USDT_ERC20": {"collectionExchangeRate": "7.20", "paymentExchangeRate": "7.25"},
+    "CNY": {"collectionExchangeRate": "7.20", "paymentExchangeRate": "7.25"}
+}
+
+
+class MockGateway:
+    """本地模拟网关"""
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 8090,
+        md5_key: str = "",
+        rsa_public_key: str = "",
+        platform_private_key: str = "",
+        latency_ms: float = 0,
+        jitter_ms: float = 0,
+        error_rate: float = 0,
+        http_error_rate: float = 0,
+        callback_delay: float = 1.0,
+        callback_fail_rate: float = 0,
+        callback_retries: int = 3,
+        callback_base: str = "",
+        allow_remote_callbacks: bool = False,
+        seed: int = None
+    ):
+        """
+        初始化
+
+        Args:
+            host: 监听地址
+            port: 监听端口（0为随机端口）
+            md5_key: 商户MD5密钥（验签、回调签名）
+            rsa_public_key: 商户RSA公钥（验签）
+            platform_private_key: 平台RSA私钥（未配置md5_key时用于回调签名）
+            latency_ms: 每个请求的固定延迟（毫秒）
+            jitter_ms: 延迟抖动（毫秒，均匀分布 ±jitter_ms）
+            error_rate: 业务错误率（返回 code=500 系统繁忙）
+            http_error_rate: HTTP错误率（返回 503）
+            callback_delay: 下单后推送回调的延迟（秒，负数为不推送）
+            callback_fail_rate: 订单最终失败（status=2）的比例
+            callback_retries: 回调未应答success时的重推次数
+            callback_base: 回调地址改写（如 http://127.0.0.1:8080，保留 notifyUrl 的路径和参数）
+            allow_remote_callbacks: 是否允许向外部主机推送回调（默认只推送到本地主机）
+            seed: 随机种子（固定后故障注入可复现）
+        """
+        self.md5_key = md5_key
+        self.rsa_public_key = rsa_public_key
+        self.platform_private_key = platform_private_key
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.http_error_rate = http_error_rate
+        self.callback_delay = callback_delay
+        self.callback_fail_rate = callback_fail_rate
+        self.callback_retries = callback_retries
+        self.callback_base = urlsplit(callback_base) if callback_base else None
+        self.allow_remote_callbacks = allow_remote_callbacks
+        self._warned_hosts = set()
+
+        self.random = random.Random(seed)
+        self.http = HTTPServer(self.dispatch, host, port)
+        self.orders: Dict[str, Dict] = {}
+        self.balances: Dict[str, Dict] = {
+            "USDT": {"availableAmount": "100000.00", "frozenAmount": "0.00", "unsettledAmount": "0.00"}
+        }
+        self.stats = {
+            "requests": 0,
+            "sign_errors": 0,
+            "injected_errors": 0,
+            "injected_http_errors": 0,
+            "callbacks_sent": 0,
+            "callbacks_acked": 0,
+            "callbacks_failed": 0,
+            "callbacks_skipped": 0,
+            "by_endpoint": {}
+        }
+
+        self._tasks = set()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def port(self) -> int:
+        return self.http.port
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.http.host}:{self.http.port}"
+
+    # ============== 请求分发 ==============
+    async def dispatch(self, request: HTTPRequest) -> Tuple[int, Dict]:
+        """路由、故障注入、验签"""
+        route = ROUTES.get(request.path)
+        if route is None:
+            return 404, {"code": "404", "msg": "not found"}
+        if request.method != "POST":
+            return 405, {"code": "405", "msg": "method not allowed"}
+
+        self.stats["requests"] += 1
+        by_endpoint = self.stats["by_endpoint"]
+        by_endpoint[request.path] = by_endpoint.get(request.path, 0) + 1
+
+        if self.latency_ms or self.jitter_ms:
+            delay = self.latency_ms + self.random.uniform(-self.jitter_ms, self.jitter_ms)
+            if delay > 0:
+                await asyncio.sleep(delay / 1000)
+
+        if self.http_error_rate and self.random.random() < self.http_error_rate:
+            self.stats["injected_http_errors"] += 1
+            return 503, {"code": "503", "msg": "Service Unavailable"}
+
+        try:
+            params = request.json()
+        except ValueError:
+            return 400, {"code": CODE_PARAM_ERROR, "msg": "请求体格式错误"}
+
+        if not self.verify_sign(params):
+            self.stats["sign_errors"] += 1
+            return 200, {"code": CODE_SIGN_ERROR, "msg": "签名错误"}
+
+        method_name, required = route
+        missing = [field for field in required if not params.get(field)]
+        if missing:
+            return 200, {"code": CODE_PARAM_ERROR, "msg": f"缺少参数: {', '.join(missing)}"}
+
+        if self.error_rate and self.random.random() < self.error_rate:
+            self.stats["injected_errors"] += 1
+            return 200, {"code": CODE_SYSTEM_BUSY, "msg": "系统繁忙"}
+
+        return 200, getattr(self, method_name)(request.path, params)
+
+    def verify_sign(self, params: Dict) -> bool:
+        """
+        按 signType 验签
+
+        Returns:
+            验签结果；网关未配置对应密钥时视为通过
+        """
+        sign = params.get("sign", "")
+        if params.get("signType") == "RSA":
+            if not self.rsa_public_key:
+                return True
+            try:
+                from cryptography.hazmat.primitives import hashes
+                from cryptography.hazmat.primitives.asymmetric import padding
+                from keystore import KEY_REGISTRY
+
+                KEY_REGISTRY.public_key(self.rsa_public_key).verify(
+                    base64.b64decode(sign),
+                    build_sign_string(params).encode(),
+                    padding.PKCS1v15(),
+                    hashes.SHA1()
+                )
+                return True
+            except Exception:
+                return False
+
+        if not self.md5_key:
+            return True
+        return bool(sign) and md5_sign(params, self.md5_key) == sign
+
+    @staticmethod
+    def _ok(data: Dict) -> Dict:
+        return {"code": CODE_SUCCESS, "msg": "操作成功", "data": data}
+
+    # ============== 订单接口 ==============
+    def _new_order(self, order_type: str, params: Dict, prefix: str) -> Optional[Dict]:
+        """登记订单；商户单号已存在返回None"""
+        merchant_order_no = params["merchantOrderNo"]
+        if merchant_order_no in self.orders:
+            return None
+        order = {
+            "order_type": order_type,
+            "orderNo": f"{prefix}{datetime.now().strftime('%Y%m%d%H%M%S')}{len(self.orders):07d}",
+            "merchantOrderNo": merchant_order_no,
+            "merchantId": params.get("merchantId", ""),
+            "amount": params["amount"],
+            "coinType": params.get("coinType", "CNY"),
+            "callbackCurrencyCode": params.get("callbackCurrencyCode", ""),
+            "notifyUrl": params["notifyUrl"],
+            "signType": params.get("signType", "MD5"),
+            "status": "0",
+            "submitTime": datetime.now().strftime("%Y%m%d%H%M%S")
+        }
+        self.orders[merchant_order_no] = order
+        self._schedule_callback(order)
+        return order
+
+    def _create_collection(self, path: str, params: Dict) -> Dict:
+        order = self._new_order("collection", params, "CZ")
+        if order is None:
+            return {"code": CODE_DUPLICATE, "msg": "订单号已存在"}
+        expire = datetime.now() + timedelta(minutes=15)
+        data = {
+            "orderNo": order["orderNo"],
+            "merchantOrderNo": order["merchantOrderNo"],
+            "bookingAddress": "TMockAddress" + order["orderNo"][-22:],
+            "payCoinAmount": order["amount"],
+            "orderExpireDate": expire.strftime("%Y-%m-%d %H:%M:%S")
+        }
+        if path.endswith("createCashier"):
+            data["payUrl"] = f"{self.base_url}/cashier/{order['orderNo']}"
+        return self._ok(data)
+
+    def _create_remit(self, path: str, params: Dict) -> Dict:
+        order = self._new_order("remit", params, "DF")
+        if order is None:
+            return {"code": CODE_DUPLICATE, "msg": "订单号已存在"}
+        order["bookingAddress"] = params["bookingAddress"]
+        return self._ok({
+            "orderNo": order["orderNo"],
+            "merchantOrderNo": order["merchantOrderNo"],
+            "status": order["status"]
+        })
+
+    def _create_cny_remit(self, path: str, params: Dict) -> Dict:
+        order = self._new_order("cny_remit", params, "DF")
+        if order is None:
+            return {"code": CODE_DUPLICATE, "msg": "订单号已存在"}
+        return self._ok({
+            "orderNo": order["orderNo"],
+            "merchantOrderNo": order["merchantOrderNo"],
+            "status": order["status"]
+        })
+
+    def _query_order(self, path: str, params: Dict) -> Dict:
+        order = self.orders.get(params["merchantOrderNo"])
+        if order is None or order["order_type"] != QUERY_ORDER_TYPES[path]:
+            return {"code": CODE_NOT_FOUND, "msg": "订单不存在"}
+        data = {
+            "orderNo": order["orderNo"],
+            "merchantOrderNo": order["merchantOrderNo"],
+            "amount": order["amount"],
+            "coinType": order["coinType"],
+            "status": order["status"],
+            "submitTime": order["submitTime"]
+        }
+        if order["order_type"] == "collection":
+            data["payCoinAmount"] = order["amount"]
+            data["supplementOrderState"] = "0"
+        else:
+            data["remitCoinAmount"] = order["amount"]
+        return self._ok(data)
+
+    def set_order_status(self, merchant_order_no: str, status: str):
+        """手动设置订单状态（测试用）"""
+        self.orders[merchant_order_no]["status"] = status
+
+    # ============== 其他接口 ==============
+    def _query_balance(self, path: str, params: Dict) -> Dict:
+        balance = self.balances.get(params["coinType"])
+        if balance is None:
+            return {"code": CODE_PARAM_ERROR, "msg": "不支持的币种"}
+        return self._ok(dict(balance, coinType=params["coinType"]))
+
+    def _query_channel_rate(self, path: str, params: Dict) -> Dict:
+        rate = CHANNEL_RATES.get(params["coinType"])
+        if rate is None:
+            return {"code": CODE_PARAM_ERROR, "msg": "不支持的币种"}
+        return self._ok(dict(rate, coinType=params["coinType"]))
+
+    def _query_address(self, path: str, params: Dict) -> Dict:
+        return self._ok({
+            "memberNo": params["memberNo"],
+            "coinType": params["coinType"],
+            "address": f"TMockQuick{abs(hash(params['memberNo'])) % 10 ** 24:024d}"
+        })
+
+    # ============== 回调推送 ==============
+    def _callback_url(self, notify_url: str) -> Optional[str]:
+        """
+        回调推送地址
+
+        Returns:
+            改写后的地址；指向外部主机且未允许时返回None（不推送）
+        """
+        parts = urlsplit(notify_url)
+        if self.callback_base is not None:
+            parts = parts._replace(scheme=self.callback_base.scheme, netloc=self.callback_base.netloc)
+            return urlunsplit(parts)
+        if parts.hostname in LOCAL_HOSTS or self.allow_remote_callbacks:
+            return notify_url
+        if parts.hostname not in self._warned_hosts:
+            self._warned_hosts.add(parts.hostname)
+            print(f"⚠️ notifyUrl 指向外部主机 {parts.hostname}，模拟网关不推送回调"
+                  f"（--callback-base 改写到本地回调服务，或 --allow-remote-callbacks）")
+        return None
+
+    def _schedule_callback(self, order: Dict):
+        if self.callback_delay < 0:
+            return
+        url = self._callback_url(order["notifyUrl"])
+        if url is None:
+            self.stats["callbacks_skipped"] += 1
+            return
+        task = asyncio.get_running_loop().create_task(self._fire_callback(order, url))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def build_callback(self, order: Dict) -> Dict:
+        """构造已签名的回调数据"""
+        data = {
+            "merchantOrderNo": order["merchantOrderNo"],
+            "orderNo": order["orderNo"],
+            "merchantId": order["merchantId"],
+            "amount": order["amount"],
+            "coinType": order["coinType"],
+            "callbackCurrencyCode": order["callbackCurrencyCode"],
+            "callbackOrderAmount": order["amount"],
+            "status": order["status"]
+        }
+        if order["order_type"] == "collection":
+            data["payCoinAmount"] = order["amount"]
+            data["supplementOrderState"] = "0"
+        else:
+            data["remitCoinAmount"] = order["amount"]
+
+        if self.md5_key:
+            data["signType"] = "MD5"
+            data["sign"] = md5_sign(data, self.md5_key)
+        elif self.platform_private_key:
+            from batch_sign import rsa_sign_params
+            data["signType"] = "RSA"
+            data["sign"] = rsa_sign_params(data, self.platform_private_key, "SHA1")
+        return data
+
+    async def _fire_callback(self, order: Dict, url: str):
+        """延迟后推送终态回调，未应答success则按退避重推"""
+        await asyncio.sleep(self.callback_delay)
+        if order["status"] == "0":
+            order["status"] = "2" if self.random.random() < self.callback_fail_rate else "1"
+        data = self.build_callback(order)
+
+        delay = 1.0
+        for attempt in range(self.callback_retries + 1):
+            if attempt:
+                await asyncio.sleep(delay)
+                delay *= 2
+            self.stats["callbacks_sent"] += 1
+            try:
+                status, result = await post_json(url, data, timeout=5)
+            except (OSError, asyncio.TimeoutError, ValueError):
+                continue
+            if status == 200 and result.get("code") == "success":
+                self.stats["callbacks_acked"] += 1
+                return
+        self.stats["callbacks_failed"] += 1
+
+    # ============== 启停 ==============
+    async def start(self) -> "MockGateway":
+        """启动监听"""
+        await self.http.start()
+        return self
+
+    async def serve_forever(self):
+        """持续运行"""
+        await self.http.serve_forever()
+
+    async def stop(self):
+        """停止服务并取消未完成的回调"""
+        for task in list(self._tasks):
+            task.cancel()
+        await self.http.stop()
+
+    def start_background(self) -> "MockGateway":
+        """在后台线程的事件循环中启动（供同步客户端使用），返回时已可接受请求"""
+        ready = threading.Event()
+        errors = []
+
+        def run():
+            self._loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(self._loop)
+            try:
+                self._loop.run_until_complete(self.start())
+            except Exception as e:
+                errors.append(e)
+                ready.set()
+                return
+            ready.set()
+            self._loop.run_forever()
+            self._loop.run_until_complete(self.stop())
+            # 等待连接处理协程退出
+            pending = asyncio.all_tasks(self._loop)
+            self._loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
+            self._loop.close()
+
+        self._thread = threading.Thread(target=run, name="mock-gateway", daemon=True)
+        self._thread.start()
+        ready.wait()
+        if errors:
+            raise errors[0]
+        return self
+
+    def stop_background(self):
+        """停止后台线程"""
+        if self._thread is None:
+            return
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._thread = None
+
+
+# ============== 主程序 ==============
+def main():
+    """主程序入口"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="BS支付系统 - 本地模拟网关")
+    parser.add_argument("--host", default="127.0.0.1", help="监听地址")
+    parser.add_argument("--port", "-p", type=int, default=8090, help="监听端口")
+    parser.add_argument("--md5-key", default="", help="商户MD5密钥（验签、回调签名）")
+    parser.add_argument("--rsa-public-key-file", default="", help="商户RSA公钥文件（验签）")
+    parser.add_argument("--platform-private-key-file", default="", help="平台RSA私钥文件（回调签名）")
+    parser.add_argument("--latency-ms", type=float, default=0, help="固定延迟（毫秒）")
+    parser.add_argument("--jitter-ms", type=float, default=0, help="延迟抖动（毫秒）")
+    parser.add_argument("--error-rate", type=float, default=0, help="业务错误率（0-1）")
+    parser.add_argument("--http-error-rate", type=float, default=0, help="HTTP 503错误率（0-1）")
+    parser.add_argument("--callback-delay", type=float, default=1.0, help="回调延迟（秒，负数为不推送）")
+    parser.add_argument("--callback-fail-rate", type=float, default=0, help="订单失败比例（0-1）")
+    parser.add_argument("--callback-base", default="",
+                        help="回调地址改写（如 http://127.0.0.1:8080，保留notifyUrl路径）")
+    parser.add_argument("--allow-remote-callbacks", action="store_true",
+                        help="允许向外部主机推送回调（默认只推送到本地主机）")
+    parser.add_argument("--seed", type=int, default=None, help="随机种子")
+
+    args = parser.parse_args()
+
+    def read_file(path: str) -> str:
+        if not path:
+            return ""
+        with open(path, "r", encoding="utf-8") as f:
+            return f.read()
+
+    gateway = MockGateway(
+        args.host, args.port,
+        md5_key=args.md5_key,
+        rsa_public_key=read_file(args.rsa_public_key_file),
+        platform_private_key=read_file(args.platform_private_key_file),
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate,
+        http_error_rate=args.http_error_rate,
+        callback_delay=args.callback_delay,
+        callback_fail_rate=args.callback_fail_rate,
+        callback_base=args.callback_base,
+        allow_remote_callbacks=args.allow_remote_callbacks,
+        seed=args.seed
+    )
+
+    async def run():
+        await gateway.start()
+        print(f"🚀 模拟网关已启动: {gateway.base_url}")
+        for path in ROUTES:
+            print(f"   POST {path}")
+        try:
+            await gateway.serve_forever()
+        finally:
+            print(f"\n📊 统计: {gateway.stats}")
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
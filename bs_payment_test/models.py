@@ -0,0 +1,290 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+BS支付系统 - 响应与订单模型
+
+网关响应、订单和回调的类型化表示，用于在内存中持有大量订单（如对账）:
+1. __slots__，不带实例字典；每个字段（含可选字段）一个slot，缺失为None
+2. 状态、币种等取值有限的字段驻留（sys.intern），所有订单共用同一个字符串
+3. 字段值保持网关返回的字符串，金额需要计算时用 decimal(...) 转换
+
+模型:
+- Result: code / msg / data，ok 表示 code=0
+- CollectionOrder / RemitOrder / CnyRemitOrder: 下单/查询订单
+- Balance / ChannelRate: 余额、通道汇率
+- CollectionCallback / RemitCallback / QuickPayCallback: 回调数据
+
+data 在响应体的 "data" 字段中；文档中部分示例为平铺结构，两种都能解析。
+
+使用示例:
+    result = parse_result("/api/coin/payOrder/create", client.create_collection_order(...))
+    if result.ok:
+        print(result.data.merchant_order_no, result.data.booking_address)
+
+    order = CollectionOrder.from_dict(ledger_row["data"])
+
+作者: OpenClaw
+日期: 2026-02-11
+"""
+
+import sys
+from decimal import Decimal
+from typing import Any, Dict, Optional, Tuple
+
+from order_ledger import TERMINAL_STATUSES
+
+# 取值有限、适合驻留的字段
+INTERNED_FIELDS = frozenset({
+    "status", "coin_type", "callback_currency_code", "supplement_order_state",
+    "merchant_id", "quick_state", "bank_code"
+})
+
+
+def _intern(value: Any) -> Any:
+    return sys.intern(value) if type(value) is str else value
+
+
+class Model:
+    """
+    模型基类
+
+    FIELDS: 字段 (JSON字段, 属性名)，每个字段一个slot
+    """
+
+    __slots__ = ()
+    FIELDS: Tuple[Tuple[str, str], ...] = ()
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "Model":
+        """从响应data/回调数据构建（缺失字段为None）"""
+        obj = cls.__new__(cls)
+        get = data.get
+        for key, attr in cls.FIELDS:
+            value = get(key)
+            setattr(obj, attr, _intern(value) if attr in INTERNED_FIELDS else value)
+        return obj
+
+    def _all_fields(self):
+        for key, attr in self.FIELDS:
+            yield key, attr, getattr(self, attr)
+
+    def to_dict(self) -> Dict:
+        """转回网关字段名（省略None）"""
+        return {key: value for key, _, value in self._all_fields() if value is not None}
+
+    def __eq__(self, other: Any) -> bool:
+        if type(other) is not type(self):
+            return NotImplemented
+        return self.to_dict() == other.to_dict()
+
+    def __repr__(self) -> str:
+        fields = ", ".join(f"{attr}={value!r}" for _, attr, value in self._all_fields() if value is not None)
+        return f"{type(self).__name__}({fields})"
+
+
+def _model(
+    name: str,
+    fields: Tuple[Tuple[str, str], ...],
+    optional: Tuple[Tuple[str, str], ...] = (),
+    doc: str = "",
+    base: type = Model
+) -> type:
+    """
+    按字段表生成模型类
+
+    Args:
+        name: 类名
+        fields: 必有字段
+        optional: 可选字段（同样各占一个slot，缺失为None）
+        doc: 类文档
+        base: 基类（继承其FIELDS，不重复声明slot）
+    """
+    own = tuple(f for f in fields + optional if f not in base.FIELDS)
+    return type(name, (base,), {
+        "__slots__": tuple(attr for _, attr in own),
+        "__doc__": doc,
+        "FIELDS": base.FIELDS + own
+    })
+
+
+def decimal(value: Optional[str]) -> Optional[Decimal]:
+    """金额字符串转Decimal（None保持None）"""
+    return None if value is None else Decimal(value)
+
+
+# ============== 订单 ==============
+ORDER_FIELDS = (
+    ("merchantOrderNo", "merchant_order_no"),
+    ("orderNo", "order_no"),
+    ("status", "status"),
+    ("amount", "amount"),
+    ("coinType", "coin_type")
+)
+
+
+class Order(Model):
+    """订单（公共字段）"""
+
+    __slots__ = tuple(attr for _, attr in ORDER_FIELDS)
+    FIELDS = ORDER_FIELDS
+
+    @property
+    def is_final(self) -> bool:
+        """是否终态（1=成功, 2=失败）"""
+        return self.status in TERMINAL_STATUSES
+
+
+CollectionOrder = _model("CollectionOrder", ORDER_FIELDS, (
+    ("bookingAddress", "booking_address"),
+    ("payCoinAmount", "pay_coin_amount"),
+    ("supplementOrderState", "supplement_order_state"),
+    ("orderExpireDate", "order_expire_date"),
+    ("payUrl", "pay_url"),
+    ("callbackCurrencyCode", "callback_currency_code"),
+    ("submitTime", "submit_time")
+), "USDT代收订单", Order)
+
+RemitOrder = _model("RemitOrder", ORDER_FIELDS, (
+    ("bookingAddress", "booking_address"),
+    ("remitCoinAmount", "remit_coin_amount"),
+    ("callbackCurrencyCode", "callback_currency_code"),
+    ("remark", "remark"),
+    ("submitTime", "submit_time")
+), "USDT代付订单", Order)
+
+CnyRemitOrder = _model("CnyRemitOrder", ORDER_FIELDS, (
+    ("bankCode", "bank_code"),
+    ("bankcardAccountNo", "bankcard_account_no"),
+    ("bankcardAccountName", "bankcard_account_name"),
+    ("memberNo", "member_no"),
+    ("remitCoinAmount", "remit_coin_amount"),
+    ("submitTime", "submit_time")
+), "CNY代付订单", Order)
+
+# ============== 余额/汇率 ==============
+Balance = _model("Balance", (
+    ("coinType", "coin_type"),
+    ("availableAmount", "available_amount"),
+    ("frozenAmount", "frozen_amount"),
+    ("unsettledAmount", "unsettled_amount")
+), doc="余额")
+
+ChannelRate = _model("ChannelRate", (
+    ("coinType", "coin_type"),
+    ("collectionExchangeRate", "collection_exchange_rate"),
+    ("paymentExchangeRate", "payment_exchange_rate")
+), doc="通道汇率")
+
+# ============== 回调 ==============
+CALLBACK_FIELDS = (
+    ("merchantOrderNo", "merchant_order_no"),
+    ("orderNo", "order_no"),
+    ("merchantId", "merchant_id"),
+    ("status", "status")
+)
+
+CollectionCallback = _model("CollectionCallback", CALLBACK_FIELDS + (
+    ("amount", "amount"),
+    ("payCoinAmount", "pay_coin_amount")
+), (
+    ("coinType", "coin_type"),
+    ("callbackCurrencyCode", "callback_currency_code"),
+    ("callbackOrderAmount", "callback_order_amount"),
+    ("supplementOrderState", "supplement_order_state")
+), "代收回调")
+
+RemitCallback = _model("RemitCallback", CALLBACK_FIELDS + (
+    ("amount", "amount"),
+    ("remitCoinAmount", "remit_coin_amount")
+), (
+    ("coinType", "coin_type"),
+    ("callbackCurrencyCode", "callback_currency_code"),
+    ("callbackOrderAmount", "callback_order_amount")
+), "代付回调")
+
+QuickPayCallback = _model("QuickPayCallback", CALLBACK_FIELDS + (
+    ("payCoinAmount", "pay_coin_amount"),
+    ("quickState", "quick_state")
+), (
+    ("memberNo", "member_no"),
+    ("coinType", "coin_type")
+), "闪付回调")
+
+
+class Result:
+    """网关响应"""
+
+    __slots__ = ("code", "msg", "data")
+
+    def __init__(self, code: str, msg: str = None, data: Any = None):
+        self.code = code
+        self.msg = msg
+        self.data = data
+
+    @property
+    def ok(self) -> bool:
+        return self.code == "0"
+
+    @classmethod
+    def from_dict(cls, result: Dict, model: type = None) -> "Result":
+        """
+        从响应dict构建
+
+        Args:
+            result: 响应体
+            model: data的模型类（None 保留原始data）
+        """
+        code = _intern(str(result.get("code")))
+        data = result.get("data")
+        if model is not None and code == "0":
+            if not isinstance(data, dict):
+                # 平铺结构: 订单字段与code/msg同级
+                data = result
+            data = model.from_dict(data)
+        return cls(code, result.get("msg"), data)
+
+    def __repr__(self) -> str:
+        return f"Result(code={self.code!r}, msg={self.msg!r}, data={self.data!r})"
+
+
+# 订单类型 -> 模型（与 order_poller.QUERY_METHODS 的键一致）
+ORDER_MODELS: Dict[str, type] = {
+    "collection": CollectionOrder,
+    "remit": RemitOrder,
+    "cny_remit": CnyRemitOrder
+}
+
+CALLBACK_MODELS: Dict[str, type] = {
+    "collection": CollectionCallback,
+    "remit": RemitCallback,
+    "quick_pay": QuickPayCallback
+}
+
+# 端点 -> data模型
+RESPONSE_MODELS: Dict[str, type] = {
+    "/api/coin/payOrder/create": CollectionOrder,
+    "/api/coin/payOrder/createCashier": CollectionOrder,
+    "/api/coin/payOrder/query": CollectionOrder,
+    "/api/coin/remitOrder/create": RemitOrder,
+    "/api/coin/remitOrder/query": RemitOrder,
+    "/api/remitMatchOrder/create": CnyRemitOrder,
+    "/api/remitMatchOrder/query": CnyRemitOrder,
+    "/api/coin/balance/query": Balance,
+    "/api/merchant/queryChannelRate": ChannelRate
+}
+
+
+def parse_result(endpoint: str, result: Dict) -> Result:
+    """
+    按端点把响应dict转为 Result（data为对应模型，未登记的端点保留原始data）
+
+    Args:
+        endpoint: API端点
+        result: 响应体
+    """
+    return Result.from_dict(result, RESPONSE_MODELS.get(endpoint))
+
+
+def model_for(endpoint: str) -> Optional[type]:
+    """端点对应的data模型"""
+    return RESPONSE_MODELS.get(endpoint)
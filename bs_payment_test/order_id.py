@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+BS支付系统 - 商户订单号生成器
+
+雪花算法（时间 + 机器号 + 序列号）:
+    | 41位 毫秒时间（自2024-01-01起） | 10位 机器号 | 12位 序列号 |
+    订单号 = 前缀 + 19位十进制数字（如 CZ0123456789012345678，共21位）
+
+1. 线程安全且无锁: 每个线程在锁内预占同一毫秒内的一段连续序列号（最多BLOCK_SIZE个），
+   之后在本线程内直接递增；时钟进入新的毫秒时重新预占，时间部分即生成时的毫秒（parse() 可还原）
+2. 跨进程唯一: 每个生成器使用不同的机器号（BS_WORKER_ID 环境变量；未设置时在本机
+   租用一个机器号: 对锁目录中的 worker-<id>.lock 加独占文件锁，进程退出后自动释放）
+3. 长度 <= 30，仅数字和前缀字母，满足网关的商户单号约束（8-30位）
+
+计数值 = (毫秒时间 << 12) | 序列号，全局递增分配: 时钟进入新的毫秒时从该毫秒的0号开始，
+单毫秒内超过4096个时借用下一毫秒；时钟回拨时沿用上一个计数值继续递增，不会重复。
+同一线程生成的订单号单调递增，不同线程之间不保证先后顺序。
+
+文件锁只在同一台主机（同一锁目录）内互斥；多主机或多容器部署时，请为每个进程设置
+互不相同的 BS_WORKER_ID，或将 BS_WORKER_LOCK_DIR 指向共享的本地目录。
+
+作者: OpenClaw
+日期: 2026-02-11
+"""
+
+import os
+import tempfile
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+# 自定义纪元: 2024-01-01 00:00:00 UTC（毫秒）
+EPOCH_MS = 1704067200000
+
+WORKER_BITS = 10
+SEQUENCE_BITS = 12
+MAX_WORKER_ID = (1 << WORKER_BITS) - 1
+SEQUENCE_MASK = (1 << SEQUENCE_BITS) - 1
+
+# 订单号数字部分宽度（63位整数最多19位十进制）
+DIGITS = 19
+
+# 每个线程一次预占的计数值个数
+BLOCK_SIZE = 256
+
+# 机器号租约的锁文件目录
+LOCK_DIR = os.path.join(tempfile.gettempdir(), "bs_order_id_workers")
+
+
+_time = time.time
+
+
+def _now_ticks() -> int:
+    """当前时间对应的计数值: (自纪元毫秒数) << 序列位数"""
+    return (int(time.time() * 1000) - EPOCH_MS) << SEQUENCE_BITS
+
+
+# 本进程持有的机器号租约: 机器号 -> 锁文件描述符（进程退出时由系统关闭并释放锁）
+_leases = {}
+_leases_lock = threading.Lock()
+
+
+def lease_worker_id(lock_dir: str = None) -> int:
+    """
+    在本机租用一个未被占用的机器号（从 进程号 % 1024 开始依次尝试加独占文件锁）
+
+    同一锁目录下，同时存活的生成器拿到的机器号互不相同；每次调用租用一个新的机器号。
+
+    Args:
+        lock_dir: 锁文件目录（默认 BS_WORKER_LOCK_DIR 环境变量或系统临时目录）
+
+    Returns:
+        机器号
+
+    Raises:
+        RuntimeError: 平台不支持文件锁，或1024个机器号均已被占用
+    """
+    if fcntl is None:
+        raise RuntimeError("当前平台不支持文件锁，无法自动分配机器号，请设置 BS_WORKER_ID 环境变量")
+
+    lock_dir = lock_dir or os.environ.get("BS_WORKER_LOCK_DIR") or LOCK_DIR
+    os.makedirs(lock_dir, exist_ok=True)
+    start = os.getpid() & MAX_WORKER_ID
+    with _leases_lock:
+        for offset in range(MAX_WORKER_ID + 1):
+            worker_id = (start + offset) & MAX_WORKER_ID
+            if worker_id in _leases:
+                continue
+            fd = os.open(os.path.join(lock_dir, f"worker-{worker_id}.lock"), os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                os.close(fd)
+                continue
+            _leases[worker_id] = fd
+            return worker_id
+    raise RuntimeError(f"机器号已全部被占用（{lock_dir}），请设置 BS_WORKER_ID 环境变量")
+
+
+def default_worker_id() -> int:
+    """
+    默认机器号: BS_WORKER_ID 环境变量；未设置时在本机租用（见 lease_worker_id）
+    """
+    value = os.environ.get("BS_WORKER_ID")
+    if value:
+        return int(value)
+    return lease_worker_id()
+
+
+class _Block(threading.local):
+    """线程预占的ID区间 [next, end)（同一毫秒内），expires 为该毫秒结束的时间（秒）"""
+
+    def __init__(self):
+        self.next = 0
+        self.end = 0
+        self.expires = 0.0
+
+
+class OrderNoGenerator:
+    """雪花算法订单号生成器"""
+
+    def __init__(self, worker_id: int = None):
+        """
+        初始化
+
+        Args:
+            worker_id: 机器号（0-1023），同时运行的生成器必须互不相同；
+                       默认见 default_worker_id()
+        """
+        if worker_id is None:
+            worker_id = default_worker_id()
+        if not 0 <= worker_id <= MAX_WORKER_ID:
+            raise ValueError(f"机器号超出范围: {worker_id}（0-{MAX_WORKER_ID}）")
+
+        self.worker_id = worker_id
+        self._worker_bits = worker_id << SEQUENCE_BITS
+        self._last_tick = -1
+        self._lock = threading.Lock()
+        self._block = _Block()
+
+    def _reserve(self, block: _Block) -> int:
+        """为当前线程预占一段ID（不跨毫秒），返回其中第一个"""
+        with self._lock:
+            # 时钟已进入新的毫秒则从该毫秒的0号开始，否则接在上一段之后
+            start = max(_now_ticks(), self._last_tick + 1)
+            end = min(start + BLOCK_SIZE, (start | SEQUENCE_MASK) + 1)
+            self._last_tick = end - 1
+        # tick = 毫秒 << 12 | 序列；插入机器号: 毫秒 << 22 | 机器号 << 12 | 序列
+        ms = start >> SEQUENCE_BITS
+        prefix = (ms << (WORKER_BITS + SEQUENCE_BITS)) | self._worker_bits
+        block.end = prefix + (start & SEQUENCE_MASK) + (end - start)
+        block.expires = (EPOCH_MS + ms + 1) / 1000
+        return prefix | (start & SEQUENCE_MASK)
+
+    def next_id(self) -> int:
+        """生成下一个整数ID"""
+        block = self._block
+        value = block.next
+        # 本段用完，或时钟已进入更新的毫秒（保持时间部分为生成时的毫秒）时重新预占
+        if value >= block.end or _time() >= block.expires:
+            value = self._reserve(block)
+        block.next = value + 1
+        return value
+
+    def next_order_no(self, prefix: str = "") -> str:
+        """
+        生成订单号
+
+        Args:
+            prefix: 前缀（如 CZ 代收、DF 代付）
+
+        Returns:
+            前缀 + 19位数字
+        """
+        return f"{prefix}{self.next_id():019d}"
+
+    @staticmethod
+    def parse(order_no: str) -> dict:
+        """
+        解析订单号
+
+        Returns:
+            {"timestamp_ms", "worker_id", "sequence"}
+        """
+        value = int(order_no[-DIGITS:])
+        return {
+            "timestamp_ms": (value >> (WORKER_BITS + SEQUENCE_BITS)) + EPOCH_MS,
+            "worker_id": (value >> SEQUENCE_BITS) & MAX_WORKER_ID,
+            "sequence": value & SEQUENCE_MASK
+        }
+
+
+# ============== 进程级共享实例 ==============
+_generator = None
+_generator_lock = threading.Lock()
+
+
+def get_generator() -> OrderNoGenerator:
+    """获取本进程共享的生成器"""
+    global _generator
+    if _generator is None:
+        with _generator_lock:
+            if _generator is None:
+                _generator = OrderNoGenerator()
+    return _generator
+
+
+def _reset_after_fork():
+    """fork出的子进程重新创建生成器（使用子进程自己的机器号）"""
+    global _generator, _generator_lock
+    _generator = None
+    _generator_lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def next_order_no(prefix: str = "") -> str:
+    """生成订单号（使用共享生成器）"""
+    return get_generator().next_order_no(prefix)
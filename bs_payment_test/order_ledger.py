@@ -0,0 +1,347 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+BS支付系统 - 订单台账
+
+嵌入式SQLite（WAL模式）订单库，保存代收、代付、CNY代付订单:
+1. 写操作进入队列，由后台线程批量合并为一个事务提交，
+   不会每个回调一次fsync（WAL + synchronous=NORMAL）
+2. 索引: merchant_order_no（主键）、status、submit_time
+3. 终态（1=成功, 2=失败）不会被迟到的“处理中”回调覆盖
+4. 写入失败（磁盘满、数据库被锁等）时保留该批数据，退避后重试，不会丢弃
+5. update_status(wait=...) 可等待该条写入提交（回调处理需落库后才能应答成功）
+
+使用示例:
+    ledger = OrderLedger("./orders.db")
+    ledger.record_order("collection", "CZ123", amount="10", coin_type="USDT_TRC20")
+    ledger.update_status("CZ123", "1")
+    ledger.flush()
+
+    # 回调: 等待落库后再应答
+    if ledger.update_status("CZ123", "1", wait=5):
+        ...
+
+作者: OpenClaw
+日期: 2026-02-11
+"""
+
+import json
+import queue
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Iterator, Optional
+
+# 订单类型
+ORDER_TYPES = ("collection", "remit", "cny_remit")
+
+# 终态
+TERMINAL_STATUSES = ("1", "2")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS orders (
+    merchant_order_no TEXT PRIMARY KEY,
+    order_type TEXT,
+    merchant_id TEXT,
+    amount TEXT,
+    coin_type TEXT,
+    status TEXT,
+    submit_time TEXT,
+    updated_at REAL NOT NULL,
+    data TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_orders_status ON orders(status);
+CREATE INDEX IF NOT EXISTS idx_orders_submit_time ON orders(submit_time);
+"""
+
+_UPSERT = """
+INSERT INTO orders (
+    merchant_order_no, order_type, merchant_id, amount, coin_type,
+    status, submit_time, updated_at, data
+) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT(merchant_order_no) DO UPDATE SET
+    order_type = COALESCE(orders.order_type, excluded.order_type),
+    merchant_id = COALESCE(excluded.merchant_id, orders.merchant_id),
+    amount = COALESCE(excluded.amount, orders.amount),
+    coin_type = COALESCE(excluded.coin_type, orders.coin_type),
+    status = CASE
+        WHEN orders.status IN ('1', '2') AND excluded.status NOT IN ('1', '2') THEN orders.status
+        ELSE COALESCE(excluded.status, orders.status)
+    END,
+    submit_time = COALESCE(orders.submit_time, excluded.submit_time),
+    updated_at = excluded.updated_at,
+    data = COALESCE(excluded.data, orders.data)
+"""
+
+_COLUMNS = (
+    "merchant_order_no", "order_type", "merchant_id", "amount", "coin_type",
+    "status", "submit_time", "updated_at", "data"
+)
+
+_STOP = object()
+
+# 写入失败后的重试退避（秒）: 从 RETRY_DELAY 起翻倍，最长 MAX_RETRY_DELAY
+RETRY_DELAY = 0.1
+MAX_RETRY_DELAY = 5.0
+
+# 关闭时数据库仍写入失败，最多再重试的次数（之后放弃并报告丢失条数）
+CLOSE_RETRIES = 3
+
+
+class _Ack:
+    """写入确认: 所在批次提交后置位"""
+
+    __slots__ = ("event",)
+
+    def __init__(self):
+        self.event = threading.Event()
+
+
+class OrderLedger:
+    """订单台账（写入批量异步，读取直接查询）"""
+
+    def __init__(
+        self,
+        path: str = "./orders.db",
+        batch_size: int = 5000,
+        queue_size: int = 100000
+    ):
+        """
+        初始化
+
+        Args:
+            path: SQLite文件路径
+            batch_size: 每个事务最多合并的写操作数
+            queue_size: 写队列容量（满时写入方阻塞，形成背压）
+        """
+        self.path = path
+        self.batch_size = batch_size
+        self.stats = {"writes": 0, "transactions": 0, "errors": 0, "dropped": 0}
+
+        self._write_db = self._connect()
+        self._write_db.executescript(_SCHEMA)
+        self._write_db.commit()
+
+        self._read_db = self._connect()
+        self._read_lock = threading.Lock()
+
+        self._queue: "queue.Queue" = queue.Queue(maxsize=queue_size)
+        self._closing = threading.Event()
+        self._writer = threading.Thread(target=self._writer_loop, name="order-ledger", daemon=True)
+        self._writer.start()
+
+    def _connect(self) -> sqlite3.Connection:
+        db = sqlite3.connect(self.path, check_same_thread=False)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")
+        return db
+
+    # ============== 写入（异步批量） ==============
+    def record_order(
+        self,
+        order_type: str,
+        merchant_order_no: str,
+        amount: str = None,
+        coin_type: str = None,
+        status: str = "0",
+        submit_time: str = None,
+        merchant_id: str = None,
+        data: Dict = None
+    ):
+        """
+        登记订单（下单后调用）
+
+        Args:
+            order_type: 订单类型（collection/remit/cny_remit）
+            merchant_order_no: 商户订单号
+            amount: 订单金额
+            coin_type: 币种
+            status: 订单状态（默认0=处理中）
+            submit_time: 提交时间（yyyyMMddHHmmss，默认当前时间）
+            merchant_id: 商户ID
+            data: 下单响应等原始数据
+        """
+        if order_type not in ORDER_TYPES:
+            raise ValueError(f"未知订单类型: {order_type}")
+        self._queue.put((
+            merchant_order_no, order_type, merchant_id, amount, coin_type,
+            status, submit_time or datetime.now().strftime("%Y%m%d%H%M%S"),
+            time.time(), json.dumps(data, ensure_ascii=False) if data is not None else None
+        ))
+
+    def update_status(
+        self,
+        merchant_order_no: str,
+        status: str,
+        order_type: str = None,
+        data: Dict = None,
+        wait: float = None
+    ) -> bool:
+        """
+        更新订单状态（回调、查询结果调用）
+
+        Args:
+            merchant_order_no: 商户订单号
+            status: 新状态
+            order_type: 订单类型（订单不存在时用于新建）
+            data: 回调/查询原始数据
+            wait: 等待该条写入提交的最长秒数（默认不等待）
+
+        Returns:
+            不等待时返回True；等待时返回是否已在超时前落库
+        """
+        row = (
+            merchant_order_no, order_type, None, None, None,
+            None if status is None else str(status), None,
+            time.time(), json.dumps(data, ensure_ascii=False) if data is not None else None
+        )
+        if wait is None:
+            self._queue.put(row)
+            return True
+
+        ack = _Ack()
+        self._queue.put(row)
+        self._queue.put(ack)
+        return ack.event.wait(wait)
+
+    def flush(self):
+        """阻塞直到已提交的写操作全部落库"""
+        self._queue.join()
+
+    def _writer_loop(self):
+        """后台写线程: 取出队列中积压的写操作，合并为一个事务"""
+        while True:
+            item = self._queue.get()
+            batch, acks = [], []
+            stop = item is _STOP
+            if not stop:
+                (acks if isinstance(item, _Ack) else batch).append(item)
+
+            while not stop and len(batch) < self.batch_size:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stop = True
+                elif isinstance(item, _Ack):
+                    acks.append(item)
+                else:
+                    batch.append(item)
+
+            # 本批（含之前的批次）落库后才确认；关闭时放弃的批次不确认，等待方超时返回False
+            if not batch or self._commit(batch):
+                for ack in acks:
+                    ack.event.set()
+
+            for _ in range(len(batch) + len(acks) + (1 if stop else 0)):
+                self._queue.task_done()
+
+            if stop:
+                break
+
+    def _commit(self, batch: list) -> bool:
+        """
+        提交一批写操作，失败时保留该批数据退避重试
+
+        数据库持续不可写时写线程停在这里，队列写满后写入方阻塞（背压），
+        等待落库的回调超时后应答失败，由平台重推。关闭时最多再重试 CLOSE_RETRIES 次。
+
+        Returns:
+            是否已提交
+        """
+        delay = RETRY_DELAY
+        attempt = 0
+        while True:
+            try:
+                with self._write_db:
+                    self._write_db.executemany(_UPSERT, batch)
+                self.stats["writes"] += len(batch)
+                self.stats["transactions"] += 1
+                return True
+            except sqlite3.Error as e:
+                self.stats["errors"] += 1
+                attempt += 1
+                if self._closing.is_set() and attempt > CLOSE_RETRIES:
+                    self.stats["dropped"] += len(batch)
+                    print(f"❌ 订单台账关闭时仍写入失败，丢弃 {len(batch)} 条: {e}")
+                    return False
+                print(f"⚠️ 订单台账写入失败（{len(batch)} 条），{delay:.1f}s 后重试: {e}")
+                time.sleep(delay)
+                delay = min(delay * 2, MAX_RETRY_DELAY)
+
+    # ============== 查询 ==============
+    def get(self, merchant_order_no: str) -> Optional[Dict]:
+        """查询单个订单"""
+        with self._read_lock:
+            row = self._read_db.execute(
+                f"SELECT {', '.join(_COLUMNS)} FROM orders WHERE merchant_order_no = ?",
+                (merchant_order_no,)
+            ).fetchone()
+        return self._to_dict(row) if row else None
+
+    def count(self, status: str = None) -> int:
+        """统计订单数"""
+        with self._read_lock:
+            if status is None:
+                return self._read_db.execute("SELECT COUNT(*) FROM orders").fetchone()[0]
+            return self._read_db.execute(
+                "SELECT COUNT(*) FROM orders WHERE status = ?", (status,)
+            ).fetchone()[0]
+
+    def iter_orders(
+        self,
+        order_type: str = None,
+        status: str = None,
+        batch_size: int = 1000,
+        include_data: bool = True
+    ) -> Iterator[Dict]:
+        """
+        按商户订单号顺序流式遍历订单（按主键分页，内存占用与总量无关）
+
+        Args:
+            order_type: 按类型过滤
+            status: 按状态过滤
+            batch_size: 每页行数
+            include_data: 是否读取并解析原始数据（对账等只需订单字段时关闭）
+        """
+        conditions, args = ["merchant_order_no > ?"], []
+        if order_type is not None:
+            conditions.append("order_type = ?")
+            args.append(order_type)
+        if status is not None:
+            conditions.append("status = ?")
+            args.append(status)
+        columns = _COLUMNS if include_data else _COLUMNS[:-1]
+        sql = (
+            f"SELECT {', '.join(columns)} FROM orders WHERE {' AND '.join(conditions)} "
+            f"ORDER BY merchant_order_no LIMIT ?"
+        )
+
+        last = ""
+        while True:
+            with self._read_lock:
+                rows = self._read_db.execute(sql, (last, *args, batch_size)).fetchall()
+            for row in rows:
+                yield self._to_dict(row) if include_data else dict(zip(columns, row))
+            if len(rows) < batch_size:
+                return
+            last = rows[-1][0]
+
+    @staticmethod
+    def _to_dict(row) -> Dict:
+        order = dict(zip(_COLUMNS, row))
+        if order["data"]:
+            order["data"] = json.loads(order["data"])
+        return order
+
+    def close(self):
+        """写完队列中的数据并关闭"""
+        self._closing.set()
+        if self._writer.is_alive():
+            self._queue.put(_STOP)
+            self._writer.join()
+        self._write_db.close()
+        with self._read_lock:
+            self._read_db.close()
@@ -0,0 +1,352 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+BS支付系统 - 订单状态轮询
+
+跟踪所有在途订单，按订单独立的指数退避（带抖动）调度查询:
+1. query_collection_order / query_remit_order / query_cny_remit_order
+2. 全局QPS上限，不会压垮网关
+3. 收到回调或查询到终态（1=成功, 2=失败）后立即停止轮询
+4. 可选: 查询前检查订单台账，其他进程写入的回调同样生效
+
+使用示例:
+    poller = OrderPoller(client, max_qps=20, ledger=ledger)
+    poller.start()
+    poller.track("DF202602111230451234", "remit", "20260211123045")
+    status = poller.wait("DF202602111230451234", timeout=300)
+    poller.stop()
+
+作者: OpenClaw
+日期: 2026-02-11
+"""
+
+import heapq
+import random
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from order_ledger import OrderLedger, TERMINAL_STATUSES
+from request_log import get_request_logger
+
+# 订单类型 -> BSClient查询方法
+QUERY_METHODS = {
+    "collection": "query_collection_order",
+    "remit": "query_remit_order",
+    "cny_remit": "query_cny_remit_order"
+}
+
+
+class OrderPoller:
+    """订单状态轮询服务"""
+
+    # 保留最近完成订单的数量（供wait查询结果）
+    FINISHED_CAPACITY = 10000
+
+    def __init__(
+        self,
+        client,
+        max_qps: float = 10,
+        initial_delay: float = 1.0,
+        max_delay: float = 60.0,
+        multiplier: float = 2.0,
+        jitter: float = 0.2,
+        max_age: float = 3600,
+        workers: int = 4,
+        ledger: OrderLedger = None
+    ):
+        """
+        初始化
+
+        Args:
+            client: BSClient实例
+            max_qps: 全局查询QPS上限
+            initial_delay: 首次查询延迟（秒）
+            max_delay: 单个订单的最大查询间隔（秒）
+            multiplier: 退避倍数
+            jitter: 抖动比例（0.2 表示间隔随机浮动±20%）
+            max_age: 订单最长跟踪时间（秒），超过后放弃
+            workers: 查询线程数
+            ledger: 订单台账（可选，查询前检查状态、查询后写回）
+        """
+        self.client = client
+        self.min_interval = 1.0 / max_qps if max_qps > 0 else 0.0
+        self.initial_delay = initial_delay
+        self.max_delay = max_delay
+        self.multiplier = multiplier
+        self.jitter = jitter
+        self.max_age = max_age
+        self.workers = workers
+        self.ledger = ledger
+        self.request_log = get_request_logger()
+
+        self._orders: Dict[str, Dict] = {}
+        self._finished: "OrderedDict[str, Dict]" = OrderedDict()
+        self._heap: List = []
+        self._seq = 0
+        self._cond = threading.Condition()
+        self._next_slot = 0.0
+        self._slot_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._running = False
+        self.stats = {"queries": 0, "completed": 0, "by_callback": 0, "expired": 0}
+
+    # ============== 订单跟踪 ==============
+    def _new_order(self, merchant_order_no: str, order_type: str, submit_time: str = None) -> Dict:
+        if order_type not in QUERY_METHODS:
+            raise ValueError(f"未知订单类型: {order_type}")
+        if submit_time is None and self.ledger is not None:
+            # 未指定时取台账登记的下单时间（查询接口按 submitTime 定位订单）
+            record = self.ledger.get(merchant_order_no)
+            submit_time = record["submit_time"] if record else None
+        if not submit_time:
+            raise ValueError(f"缺少订单提交时间: {merchant_order_no}")
+        return {
+            "order_type": order_type,
+            "submit_time": submit_time,
+            "added_at": time.monotonic(),
+            "delay": self.initial_delay,
+            "attempts": 0,
+            "status": None,
+            "result": None,
+            "done": threading.Event()
+        }
+
+    def track(self, merchant_order_no: str, order_type: str, submit_time: str = None):
+        """
+        开始跟踪订单（由后台服务按退避调度查询）
+
+        Args:
+            merchant_order_no: 商户订单号
+            order_type: 订单类型（collection/remit/cny_remit）
+            submit_time: 订单提交时间（yyyyMMddHHmmss，默认取台账记录的提交时间）
+
+        Raises:
+            ValueError: 订单类型未知，或未指定提交时间且台账中没有该订单
+        """
+        order = self._new_order(merchant_order_no, order_type, submit_time)
+        with self._cond:
+            self._orders[merchant_order_no] = order
+            self._schedule(merchant_order_no, order["added_at"] + self.initial_delay)
+
+    def complete(self, merchant_order_no: str, status: str = None, by_callback: bool = True):
+        """
+        停止轮询订单（收到回调或查询到终态时调用）
+
+        Args:
+            merchant_order_no: 商户订单号
+            status: 最终状态
+            by_callback: 是否由回调触发
+        """
+        with self._cond:
+            order = self._orders.pop(merchant_order_no, None)
+            if order is None:
+                return
+            order["status"] = status
+            self.stats["completed"] += 1
+            if by_callback:
+                self.stats["by_callback"] += 1
+            self._finished[merchant_order_no] = order
+            while len(self._finished) > self.FINISHED_CAPACITY:
+                self._finished.popitem(last=False)
+        order["done"].set()
+
+    def on_callback(self, data: Dict):
+        """回调到达时调用（终态回调停止轮询）"""
+        status = str(data.get("status"))
+        if status in TERMINAL_STATUSES:
+            self.complete(data.get("merchantOrderNo"), status)
+
+    def pending(self) -> int:
+        """在途订单数"""
+        return len(self._orders)
+
+    def wait(self, merchant_order_no: str, timeout: float = None) -> Optional[str]:
+        """
+        等待订单完成
+
+        Returns:
+            最终状态；超时、放弃或未跟踪返回None
+        """
+        order = self._orders.get(merchant_order_no) or self._finished.get(merchant_order_no)
+        if order is None:
+            return None
+        order["done"].wait(timeout)
+        return order["status"]
+
+    # ============== 查询 ==============
+    def _schedule(self, merchant_order_no: str, due: float):
+        """加入调度堆（调用方持有锁）"""
+        self._seq += 1
+        heapq.heappush(self._heap, (due, self._seq, merchant_order_no))
+        self._cond.notify()
+
+    def _next_delay(self, delay: float) -> float:
+        """指数退避 + 抖动"""
+        delay = min(delay * self.multiplier, self.max_delay)
+        return delay * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    def _acquire_slot(self):
+        """全局QPS限制: 相邻两次查询至少间隔 min_interval"""
+        with self._slot_lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.min_interval
+        if slot > now:
+            time.sleep(slot - now)
+
+    def _query(self, merchant_order_no: str, order: Dict) -> bool:
+        """
+        查询一次订单
+
+        Returns:
+            订单是否已结束（终态或已由回调完成）
+        """
+        # 回调可能已由其他进程写入台账
+        if self.ledger is not None:
+            record = self.ledger.get(merchant_order_no)
+            if record and record["status"] in TERMINAL_STATUSES:
+                self.complete(merchant_order_no, record["status"])
+                return True
+
+        self._acquire_slot()
+        if merchant_order_no not in self._orders:
+            return True
+
+        method = getattr(self.client, QUERY_METHODS[order["order_type"]])
+        result = method(merchant_order_no, order["submit_time"])
+        self.stats["queries"] += 1
+        order["attempts"] += 1
+        order["result"] = result
+
+        if result.get("code") != "0":
+            return False
+
+        status = str((result.get("data") or {}).get("status"))
+        if self.ledger is not None:
+            self.ledger.update_status(merchant_order_no, status, order["order_type"], result.get("data"))
+        if status in TERMINAL_STATUSES:
+            self.complete(merchant_order_no, status, by_callback=False)
+            return True
+        return False
+
+    def _expire(self, merchant_order_no: str, order: Dict):
+        """放弃跟踪超龄订单"""
+        with self._cond:
+            if self._orders.pop(merchant_order_no, None) is not None:
+                self.stats["expired"] += 1
+        order["done"].set()
+
+    def poll_until_complete(
+        self,
+        merchant_order_no: str,
+        order_type: str,
+        submit_time: str = None,
+        timeout: float = 30
+    ) -> Dict:
+        """
+        在当前线程轮询单个订单，直到终态或超时（无需启动后台服务）
+
+        Args:
+            merchant_order_no: 商户订单号
+            order_type: 订单类型（collection/remit/cny_remit）
+            submit_time: 订单提交时间（yyyyMMddHHmmss，默认取台账记录的提交时间）
+            timeout: 最长轮询时间（秒）
+
+        Returns:
+            最后一次查询结果；由回调（或台账）完成时，data.status 为回调给出的终态
+
+        Raises:
+            ValueError: 订单类型未知，或未指定提交时间且台账中没有该订单
+        """
+        order = self._new_order(merchant_order_no, order_type, submit_time)
+        with self._cond:
+            self._orders[merchant_order_no] = order
+        deadline = order["added_at"] + timeout
+        due = order["added_at"] + self.initial_delay
+
+        while due <= deadline:
+            # 等待期间回调到达（complete）时立即返回
+            if order["done"].wait(max(due - time.monotonic(), 0)):
+                break
+            if self._query(merchant_order_no, order):
+                break
+            order["delay"] = self._next_delay(order["delay"])
+            due = time.monotonic() + order["delay"]
+
+        if merchant_order_no in self._orders:
+            self._expire(merchant_order_no, order)
+
+        result = order["result"]
+        status = order["status"]
+        if status is not None and (result is None or str((result.get("data") or {}).get("status")) != status):
+            # 由回调完成: 查询结果缺失或仍是旧状态，以回调的终态为准
+            data = dict((result or {}).get("data") or {})
+            data.update(merchantOrderNo=merchant_order_no, status=status)
+            return {"code": "0", "msg": "回调已完成", "data": data}
+        return result or {"code": -1, "msg": "轮询超时"}
+
+    # ============== 后台服务 ==============
+    def start(self):
+        """启动后台调度线程"""
+        if self._running:
+            return
+        self._running = True
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="poller")
+        self._thread = threading.Thread(target=self._run, name="order-poller", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """停止后台调度"""
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._running:
+                    # 丢弃已完成订单的调度项
+                    while self._heap and self._heap[0][2] not in self._orders:
+                        heapq.heappop(self._heap)
+                    if not self._heap:
+                        self._cond.wait()
+                        continue
+                    wait = self._heap[0][0] - time.monotonic()
+                    if wait <= 0:
+                        break
+                    self._cond.wait(wait)
+                if not self._running:
+                    return
+                _, _, merchant_order_no = heapq.heappop(self._heap)
+            self._executor.submit(self._poll, merchant_order_no)
+
+    def _poll(self, merchant_order_no: str):
+        """后台查询一次；未结束则按退避重新调度"""
+        order = self._orders.get(merchant_order_no)
+        if order is None:
+            return
+
+        try:
+            if self._query(merchant_order_no, order):
+                return
+        except Exception as e:
+            self.request_log.log_poll_error(merchant_order_no, order["order_type"], e)
+
+        if time.monotonic() - order["added_at"] > self.max_age:
+            self._expire(merchant_order_no, order)
+            return
+
+        with self._cond:
+            if merchant_order_no in self._orders:
+                order["delay"] = self._next_delay(order["delay"])
+                self._schedule(merchant_order_no, time.monotonic() + order["delay"])
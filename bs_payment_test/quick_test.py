@@ -7,6 +7,9 @@ BS支付系统 - 快速测试脚本
     python quick_test.py
     python quick_test.py --env test --test collection
     python quick_test.py --env production --test remit
+
+    # 压测模式: 按目标RPS/并发重复执行场景，输出延迟分位数和错误率
+    python quick_test.py --env test --test collection --duration 60 --rps 20 --report report.json
 """
 
 import sys
@@ -15,6 +18,7 @@ from datetime import datetime
 
 # 导入API客户端
 from bs_api_client import BSClient, BSTestCases
+from load_test import add_load_arguments, apply_load_arguments, run_load_test
 
 # ============== 测试配置 ==============
 QUICK_CONFIG = {
@@ -233,15 +237,27 @@ def main():
     import argparse
     
     parser = argparse.ArgumentParser(description="BS支付系统 - API快速测试")
-    parser.add_argument("--env", "-e", choices=["test", "production"],
+    parser.add_argument("--env", "-e", choices=["test", "production", "mock"],
                        default="test", help="环境")
     parser.add_argument("--test", "-t", 
                        choices=["all", "collection", "remit", "balance"],
                        default="all", help="测试类型")
+    add_load_arguments(parser)
     
     args = parser.parse_args()
     
-    run_tests(args.env, args.test)
+    if args.duration > 0:
+        apply_load_arguments(args)
+        run_load_test(
+            args.env, args.test,
+            duration=args.duration,
+            rps=args.rps,
+            concurrency=args.concurrency,
+            report_path=args.report,
+            use_cache=args.cache
+        )
+    else:
+        run_tests(args.env, args.test)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,528 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+BS支付系统 - 订单对账
+
+流式比对本地订单台账与网关数据，内存占用与订单总量无关:
+1. 对账单模式（--statement）: 网关导出的对账单（CSV/JSON Lines）与台账按商户订单号排序归并；
+   对账单未排序时先外部排序（分块排序写临时文件，再多路归并）
+2. 查询模式（--query）: 按台账顺序逐单调用查询接口，滑动窗口并发，结果按原顺序比对
+3. 差异类型: 网关缺失、本地缺失、金额不一致、状态不一致、对账单重复、查询失败
+4. 差异逐条写入JSON Lines文件，报告只保留计数和少量样例
+
+使用示例:
+    python reconcile.py --ledger-db ./orders.db --statement gateway_20260211.csv --output diff.jsonl
+    python reconcile.py --ledger-db ./orders.db --query --env test --order-type remit --concurrency 8
+
+对账单字段: merchantOrderNo, amount, status，可选 orderType, submitTime（yyyyMMddHHmmss）。
+
+作者: OpenClaw
+日期: 2026-02-11
+"""
+
+import csv
+import heapq
+import os
+import tempfile
+import time
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal, InvalidOperation
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import serializer
+from models import ORDER_MODELS, Result
+from order_ledger import OrderLedger
+from order_poller import QUERY_METHODS
+
+# 差异类型
+MISSING_REMOTE = "missing_remote"       # 本地有、网关无
+MISSING_LOCAL = "missing_local"         # 网关有、本地无
+AMOUNT_MISMATCH = "amount_mismatch"     # 金额不一致
+STATUS_DIVERGED = "status_diverged"     # 状态不一致
+DUPLICATE_REMOTE = "duplicate_remote"   # 对账单中同一单号出现多次
+QUERY_FAILED = "query_failed"           # 查询模式: 网关查询失败，无法判断
+
+KINDS = (MISSING_REMOTE, MISSING_LOCAL, AMOUNT_MISMATCH, STATUS_DIVERGED, DUPLICATE_REMOTE, QUERY_FAILED)
+
+
+class OrderRecord:
+    """对账用的订单字段"""
+
+    __slots__ = ("merchant_order_no", "amount", "status", "order_type", "submit_time")
+
+    def __init__(self, merchant_order_no: str, amount: str = None, status: str = None,
+                 order_type: str = None, submit_time: str = None):
+        self.merchant_order_no = merchant_order_no
+        self.amount = amount
+        self.status = status
+        self.order_type = order_type
+        self.submit_time = submit_time
+
+    def to_list(self) -> list:
+        return [self.merchant_order_no, self.amount, self.status, self.order_type, self.submit_time]
+
+    def to_dict(self) -> Dict:
+        return {
+            "merchantOrderNo": self.merchant_order_no,
+            "amount": self.amount,
+            "status": self.status,
+            "orderType": self.order_type,
+            "submitTime": self.submit_time
+        }
+
+
+# ============== 数据源 ==============
+def local_records(
+    ledger: OrderLedger,
+    order_type: str = None,
+    start: str = None,
+    end: str = None,
+    batch_size: int = 5000
+) -> Iterator[OrderRecord]:
+    """
+    台账订单（按商户订单号排序）
+
+    Args:
+        ledger: 订单台账
+        order_type: 订单类型过滤
+        start: 提交时间下限（含，yyyyMMddHHmmss）
+        end: 提交时间上限（不含）
+        batch_size: 每页行数
+
+    指定时间窗口时跳过没有提交时间的订单（仅由回调/查询建立的行），无法判断是否在窗口内
+    """
+    windowed = bool(start or end)
+    for row in ledger.iter_orders(order_type=order_type, batch_size=batch_size, include_data=False):
+        submit_time = row["submit_time"]
+        if submit_time is None:
+            if windowed:
+                continue
+        elif (start and submit_time < start) or (end and submit_time >= end):
+            continue
+        yield OrderRecord(row["merchant_order_no"], row["amount"], row["status"],
+                          row["order_type"], submit_time)
+
+
+def read_statement(path: str, start: str = None, end: str = None) -> Iterator[OrderRecord]:
+    """
+    读取网关对账单（.csv 或 JSON Lines），逐行产出
+
+    Args:
+        path: 文件路径
+        start: 提交时间下限（对账单带 submitTime 时过滤）
+        end: 提交时间上限
+    """
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        if path.lower().endswith(".csv"):
+            rows = csv.DictReader(f)
+        else:
+            rows = (serializer.loads(line) for line in f if line.strip())
+        for row in rows:
+            submit_time = row.get("submitTime") or None
+            if submit_time and ((start and submit_time < start) or (end and submit_time >= end)):
+                continue
+            yield OrderRecord(row["merchantOrderNo"], row.get("amount"), row.get("status"),
+                              row.get("orderType") or None, submit_time)
+
+
+def _merge_key(record: OrderRecord) -> str:
+    return record.merchant_order_no
+
+
+def _read_run(path: str) -> Iterator[OrderRecord]:
+    with open(path, "rb") as f:
+        for line in f:
+            yield OrderRecord(*serializer.loads(line))
+
+
+def _write_run(records: List[OrderRecord], tmp_dir: str) -> str:
+    records.sort(key=_merge_key)
+    fd, path = tempfile.mkstemp(prefix="reconcile-run-", suffix=".jsonl", dir=tmp_dir)
+    with os.fdopen(fd, "wb") as f:
+        for record in records:
+            f.write(serializer.dumps(record.to_list()))
+            f.write(b"\n")
+    return path
+
+
+def external_sort(
+    records: Iterable[OrderRecord],
+    chunk_size: int = 200000,
+    tmp_dir: str = None
+) -> Iterator[OrderRecord]:
+    """
+    按商户订单号外部排序
+
+    每 chunk_size 条排序后写一个临时文件，最后多路归并；总量不超过一块时直接在内存中排序。
+
+    Args:
+        records: 未排序的记录
+        chunk_size: 内存中同时持有的最大记录数
+        tmp_dir: 临时文件目录（默认系统临时目录）
+    """
+    runs: List[str] = []
+    chunk: List[OrderRecord] = []
+    try:
+        for record in records:
+            chunk.append(record)
+            if len(chunk) >= chunk_size:
+                runs.append(_write_run(chunk, tmp_dir))
+                chunk = []
+
+        if not runs:
+            chunk.sort(key=_merge_key)
+            yield from chunk
+            return
+
+        if chunk:
+            runs.append(_write_run(chunk, tmp_dir))
+            chunk = []
+        yield from heapq.merge(*(_read_run(path) for path in runs), key=_merge_key)
+    finally:
+        for path in runs:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+def ensure_sorted(records: Iterable[OrderRecord], source: str) -> Iterator[OrderRecord]:
+    """检查记录按商户订单号升序（声明已排序的输入），乱序时抛 ValueError"""
+    last = None
+    for record in records:
+        key = record.merchant_order_no
+        if last is not None and key < last:
+            raise ValueError(f"{source} 未按商户订单号排序: {last} 之后出现 {key}（去掉 --sorted 使用外部排序）")
+        last = key
+        yield record
+
+
+# ============== 比对 ==============
+def _same_amount(local: Optional[str], remote: Optional[str]) -> bool:
+    if local == remote:
+        return True
+    if local is None or remote is None:
+        return False
+    try:
+        return Decimal(local) == Decimal(remote)
+    except InvalidOperation:
+        return False
+
+
+class ReconcileReport:
+    """对账结果（计数 + 样例，差异明细写文件）"""
+
+    # 每种差异保留的样例数
+    MAX_SAMPLES = 10
+
+    def __init__(self, output_path: str = ""):
+        """
+        初始化
+
+        Args:
+            output_path: 差异明细JSON Lines文件（空为不写）
+        """
+        self.counts: Counter = Counter()
+        self.samples: Dict[str, List[Dict]] = {}
+        self.local_total = 0
+        self.remote_total = 0
+        self.matched = 0
+        self.started_at = time.monotonic()
+        self.output_path = output_path
+        self._output = open(output_path, "wb") if output_path else None
+
+    def add(self, kind: str, merchant_order_no: str, local: OrderRecord = None,
+            remote: OrderRecord = None, detail: str = None):
+        """记录一条差异"""
+        self.counts[kind] += 1
+        if self._output is None and len(self.samples.get(kind, ())) >= self.MAX_SAMPLES:
+            return
+        entry = {"kind": kind, "merchantOrderNo": merchant_order_no}
+        if local is not None:
+            entry["local"] = local.to_dict()
+        if remote is not None:
+            entry["remote"] = remote.to_dict()
+        if detail:
+            entry["detail"] = detail
+        samples = self.samples.setdefault(kind, [])
+        if len(samples) < self.MAX_SAMPLES:
+            samples.append(entry)
+        if self._output is not None:
+            self._output.write(serializer.dumps(entry))
+            self._output.write(b"\n")
+
+    def compare(self, local: OrderRecord, remote: OrderRecord):
+        """比对同一商户订单号的本地与网关记录"""
+        ok = True
+        if not _same_amount(local.amount, remote.amount):
+            self.add(AMOUNT_MISMATCH, local.merchant_order_no, local, remote)
+            ok = False
+        if (local.status or "0") != (remote.status or "0"):
+            self.add(STATUS_DIVERGED, local.merchant_order_no, local, remote)
+            ok = False
+        if ok:
+            self.matched += 1
+
+    def close(self):
+        if self._output is not None:
+            self._output.close()
+            self._output = None
+
+    @property
+    def discrepancies(self) -> int:
+        return sum(self.counts.values())
+
+    def summary(self) -> Dict:
+        return {
+            "local_total": self.local_total,
+            "remote_total": self.remote_total,
+            "matched": self.matched,
+            "discrepancies": self.discrepancies,
+            "counts": {kind: self.counts[kind] for kind in KINDS if self.counts[kind]},
+            "samples": self.samples,
+            "output": self.output_path,
+            "elapsed_s": round(time.monotonic() - self.started_at, 2)
+        }
+
+
+def merge_join(
+    local: Iterable[OrderRecord],
+    remote: Iterable[OrderRecord],
+    report: ReconcileReport
+) -> ReconcileReport:
+    """
+    排序归并比对（两侧都按商户订单号升序）
+
+    Args:
+        local: 本地记录
+        remote: 网关记录
+        report: 结果
+    """
+    local_iter, remote_iter = iter(local), iter(remote)
+    l = next(local_iter, None)
+    r = next(remote_iter, None)
+    if l is not None:
+        report.local_total += 1
+    if r is not None:
+        report.remote_total += 1
+
+    def next_remote(previous: OrderRecord) -> Optional[OrderRecord]:
+        """取下一条网关记录，跳过（并记录）重复单号"""
+        while True:
+            record = next(remote_iter, None)
+            if record is None:
+                return None
+            report.remote_total += 1
+            if record.merchant_order_no != previous.merchant_order_no:
+                return record
+            report.add(DUPLICATE_REMOTE, record.merchant_order_no, remote=record)
+
+    while l is not None or r is not None:
+        if r is None or (l is not None and l.merchant_order_no < r.merchant_order_no):
+            report.add(MISSING_REMOTE, l.merchant_order_no, local=l)
+            l = next(local_iter, None)
+            if l is not None:
+                report.local_total += 1
+        elif l is None or r.merchant_order_no < l.merchant_order_no:
+            report.add(MISSING_LOCAL, r.merchant_order_no, remote=r)
+            r = next_remote(r)
+        else:
+            report.compare(l, r)
+            l = next(local_iter, None)
+            if l is not None:
+                report.local_total += 1
+            r = next_remote(r)
+    return report
+
+
+# ============== 查询模式 ==============
+def _query_order(client, record: OrderRecord) -> Tuple[Optional[OrderRecord], Optional[str]]:
+    """
+    查询单个订单
+
+    Returns:
+        (网关记录, 失败信息)；订单不存在时两者都为None
+    """
+    method = getattr(client, QUERY_METHODS[record.order_type or "collection"])
+    response = method(record.merchant_order_no, record.submit_time)
+    result = Result.from_dict(response, ORDER_MODELS[record.order_type or "collection"])
+    if result.ok:
+        order = result.data
+        return OrderRecord(order.merchant_order_no or record.merchant_order_no, order.amount,
+                           order.status, record.order_type, order.submit_time), None
+    if result.code in client.retry_policy.not_found_codes:
+        return None, None
+    return None, f"{result.code}: {result.msg}"
+
+
+def query_join(
+    client,
+    local: Iterable[OrderRecord],
+    report: ReconcileReport,
+    concurrency: int = 8,
+    window: int = None
+) -> ReconcileReport:
+    """
+    逐单查询比对（滑动窗口: 最多 window 个在途查询，结果按台账顺序处理）
+
+    Args:
+        client: BSClient实例（限流、熔断、重试照常生效）
+        local: 本地记录
+        report: 结果
+        concurrency: 查询线程数
+        window: 在途查询上限（默认 concurrency 的4倍）
+    """
+    window = window or concurrency * 4
+    pending: deque = deque()
+
+    def settle():
+        record, future = pending.popleft()
+        remote, error = future.result()
+        if error is not None:
+            report.add(QUERY_FAILED, record.merchant_order_no, local=record, detail=error)
+        elif remote is None:
+            report.add(MISSING_REMOTE, record.merchant_order_no, local=record)
+        else:
+            report.remote_total += 1
+            report.compare(record, remote)
+
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="reconcile") as executor:
+        for record in local:
+            report.local_total += 1
+            pending.append((record, executor.submit(_query_order, client, record)))
+            if len(pending) >= window:
+                settle()
+        while pending:
+            settle()
+    return report
+
+
+# ============== 入口 ==============
+def reconcile_statement(
+    ledger: OrderLedger,
+    statement_path: str,
+    sorted_input: bool = False,
+    start: str = None,
+    end: str = None,
+    output_path: str = "",
+    chunk_size: int = 200000
+) -> Dict:
+    """
+    台账与网关对账单比对
+
+    Args:
+        ledger: 订单台账
+        statement_path: 对账单路径（.csv 或 JSON Lines）
+        sorted_input: 对账单已按商户订单号排序（跳过外部排序，乱序时报错）
+        start: 提交时间下限（yyyyMMddHHmmss，含）
+        end: 提交时间上限（不含）
+        output_path: 差异明细文件
+        chunk_size: 外部排序每块记录数
+
+    Returns:
+        对账摘要
+    """
+    remote = read_statement(statement_path, start, end)
+    if sorted_input:
+        remote = ensure_sorted(remote, statement_path)
+    else:
+        remote = external_sort(remote, chunk_size)
+
+    report = ReconcileReport(output_path)
+    try:
+        merge_join(local_records(ledger, start=start, end=end), remote, report)
+    finally:
+        report.close()
+    return report.summary()
+
+
+def reconcile_query(
+    ledger: OrderLedger,
+    client,
+    order_type: str = None,
+    start: str = None,
+    end: str = None,
+    output_path: str = "",
+    concurrency: int = 8
+) -> Dict:
+    """
+    台账逐单查询网关比对（网关无对账单时使用，只能发现本地已有的订单的差异）
+
+    Returns:
+        对账摘要
+    """
+    report = ReconcileReport(output_path)
+    try:
+        query_join(client, local_records(ledger, order_type, start, end), report, concurrency)
+    finally:
+        report.close()
+    return report.summary()
+
+
+def print_summary(summary: Dict):
+    """打印对账摘要"""
+    print("\n" + "=" * 80)
+    print(f"📊 对账结果（{summary['elapsed_s']}s）")
+    print("=" * 80)
+    print(f"   本地订单: {summary['local_total']:,}")
+    print(f"   网关订单: {summary['remote_total']:,}")
+    print(f"   一致: {summary['matched']:,}")
+    print(f"   差异: {summary['discrepancies']:,}")
+    for kind, count in summary["counts"].items():
+        print(f"\n   ❌ {kind}: {count:,}")
+        for sample in summary["samples"].get(kind, [])[:3]:
+            print(f"      {serializer.dumps(sample).decode('utf-8')}")
+    if summary["output"]:
+        print(f"\n📝 差异明细: {summary['output']}")
+
+
+# ============== 主程序 ==============
+def main():
+    """主程序入口"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="BS支付系统 - 订单对账")
+    parser.add_argument("--ledger-db", required=True, help="订单台账路径")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--statement", help="网关对账单（.csv 或 JSON Lines）")
+    source.add_argument("--query", action="store_true", help="逐单调用查询接口比对")
+    parser.add_argument("--sorted", action="store_true", help="对账单已按商户订单号排序")
+    parser.add_argument("--start", help="提交时间下限（yyyyMMddHHmmss，含）")
+    parser.add_argument("--end", help="提交时间上限（yyyyMMddHHmmss，不含）")
+    parser.add_argument("--output", "-o", default="", help="差异明细JSON Lines文件")
+    parser.add_argument("--chunk-size", type=int, default=200000, help="外部排序每块记录数")
+    parser.add_argument("--env", "-e", choices=["test", "production", "mock"], default="test",
+                        help="查询模式的环境")
+    parser.add_argument("--order-type", choices=list(QUERY_METHODS), help="查询模式只对账该类型")
+    parser.add_argument("--concurrency", "-c", type=int, default=8, help="查询模式并发数")
+    args = parser.parse_args()
+
+    ledger = OrderLedger(args.ledger_db)
+    try:
+        if args.statement:
+            summary = reconcile_statement(
+                ledger, args.statement,
+                sorted_input=args.sorted,
+                start=args.start, end=args.end,
+                output_path=args.output,
+                chunk_size=args.chunk_size
+            )
+        else:
+            from bs_api_client import BSClient, CONFIG
+            CONFIG["logging"]["level"] = "WARNING"
+            summary = reconcile_query(
+                ledger, BSClient(args.env),
+                order_type=args.order_type,
+                start=args.start, end=args.end,
+                output_path=args.output,
+                concurrency=args.concurrency
+            )
+    finally:
+        ledger.close()
+
+    print_summary(summary)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,311 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+BS支付系统 - 请求日志
+
+基于标准库logging的结构化请求日志，替代每次调用的print + json.dumps:
+1. 级别: INFO 记录请求/响应，WARNING 只记录业务失败和请求异常，OFF 全部关闭
+2. 采样: INFO日志按比例采样（请求与响应同进同出），失败和异常不采样
+3. 后台写线程: 调用方只把记录放入队列，格式化、序列化、输出都在后台完成
+4. 脱敏: sign、密钥、token等字段输出为 ***
+5. 可选JSON Lines文件，每行一条记录，便于事后分析
+
+关闭或未采样时，请求路径上不做任何序列化，也不拷贝参数。
+
+使用示例:
+    log = get_request_logger(level="INFO", sample_rate=0.01, jsonl_path="./requests.jsonl")
+    if log.sampled():
+        log.log_request(endpoint, url, data)
+
+作者: OpenClaw
+日期: 2026-02-11
+"""
+
+import sys
+import json
+import atexit
+import queue
+import random
+import logging
+import threading
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Iterable, Optional
+
+# 关闭日志的级别
+OFF = logging.CRITICAL + 10
+
+LEVELS = {
+    "DEBUG": logging.DEBUG,
+    "INFO": logging.INFO,
+    "WARNING": logging.WARNING,
+    "ERROR": logging.ERROR,
+    "OFF": OFF
+}
+
+# 需要脱敏的字段（不区分大小写）
+REDACT_KEYS = frozenset({
+    "sign", "md5_key", "rsa_private_key", "rsa_public_key", "private_key",
+    "privatekey", "secretkey", "secret_key", "password", "token", "authorization"
+})
+
+REDACTED = "***"
+
+
+def redact(value, keys: Iterable[str] = REDACT_KEYS):
+    """
+    脱敏（返回新对象，不修改原数据）
+
+    Args:
+        value: 待脱敏的dict/list/标量
+        keys: 需要脱敏的字段名（小写）
+
+    Returns:
+        脱敏后的副本
+    """
+    if isinstance(value, dict):
+        return {
+            k: REDACTED if str(k).lower() in keys else redact(v, keys)
+            for k, v in value.items()
+        }
+    if isinstance(value, list):
+        return [redact(v, keys) for v in value]
+    return value
+
+
+# ============== 格式化（在后台线程执行） ==============
+class ConsoleFormatter(logging.Formatter):
+    """控制台格式（与原print输出一致）"""
+
+    def __init__(self, redact_keys: Iterable[str] = REDACT_KEYS):
+        super().__init__()
+        self.redact_keys = redact_keys
+
+    def format(self, record: logging.LogRecord) -> str:
+        event = getattr(record, "event", None)
+        if event == "request":
+            return (
+                f"\n📤 请求: {record.endpoint}\n"
+                f"   URL: {record.url}\n"
+                f"   参数: {json.dumps(redact(record.payload, self.redact_keys), ensure_ascii=False)}"
+            )
+        if event == "response":
+            return (
+                f"\n📥 响应: {record.endpoint}（{record.latency_ms:.1f}ms）\n"
+                f"   状态码: {record.status_code}\n"
+                f"   响应体: {json.dumps(redact(record.payload, self.redact_keys), ensure_ascii=False)}"
+            )
+        if event == "error":
+            return f"\n❌ 请求失败: {record.endpoint}（{record.latency_ms:.1f}ms）: {record.error}"
+        if event == "poll_error":
+            return f"❌ 订单轮询异常 {record.merchant_order_no}（{record.order_type}）: {record.error}"
+        return record.getMessage()
+
+
+class JSONLinesFormatter(logging.Formatter):
+    """JSON Lines格式（每条记录一行）"""
+
+    FIELDS = ("endpoint", "url", "status_code", "latency_ms", "error", "merchant_order_no", "order_type")
+
+    def __init__(self, redact_keys: Iterable[str] = REDACT_KEYS):
+        super().__init__()
+        self.redact_keys = redact_keys
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": record.created,
+            "level": record.levelname,
+            "event": getattr(record, "event", None),
+            "thread": record.threadName
+        }
+        for field in self.FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                entry[field] = value
+        payload = getattr(record, "payload", None)
+        if payload is not None:
+            entry["payload"] = redact(payload, self.redact_keys)
+        if entry["event"] is None:
+            entry["msg"] = record.getMessage()
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class _DeferredQueueHandler(QueueHandler):
+    """
+    入队时不格式化
+
+    标准QueueHandler.prepare会在调用方线程执行format，
+    这里直接入队原始记录，格式化全部交给后台线程。
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+# ============== 请求日志 ==============
+class RequestLogger:
+    """请求日志"""
+
+    def __init__(
+        self,
+        name: str = "bs_payment.request",
+        level: str = "INFO",
+        sample_rate: float = 1.0,
+        jsonl_path: str = "",
+        console: bool = True,
+        redact_keys: Iterable[str] = REDACT_KEYS
+    ):
+        """
+        初始化
+
+        Args:
+            name: logger名称
+            level: 日志级别（DEBUG/INFO/WARNING/ERROR/OFF）
+            sample_rate: INFO日志采样率（0-1）
+            jsonl_path: JSON Lines文件路径（空字符串为不写文件）
+            console: 是否输出到控制台
+            redact_keys: 需要脱敏的字段名
+        """
+        self.sample_rate = sample_rate
+        self.redact_keys = frozenset(k.lower() for k in redact_keys)
+
+        self.logger = logging.getLogger(name)
+        self.logger.propagate = False
+        for handler in list(self.logger.handlers):
+            self.logger.removeHandler(handler)
+
+        handlers = []
+        if console:
+            stream = logging.StreamHandler(sys.stdout)
+            stream.setFormatter(ConsoleFormatter(self.redact_keys))
+            handlers.append(stream)
+        if jsonl_path:
+            jsonl = logging.FileHandler(jsonl_path, encoding="utf-8")
+            jsonl.setFormatter(JSONLinesFormatter(self.redact_keys))
+            handlers.append(jsonl)
+
+        self._handlers = handlers
+        self._listener: Optional[QueueListener] = None
+        if handlers:
+            log_queue: "queue.Queue" = queue.Queue(-1)
+            self.logger.addHandler(_DeferredQueueHandler(log_queue))
+            self._listener = QueueListener(log_queue, *handlers)
+            self._listener.start()
+        self.set_level(level if handlers else "OFF")
+
+    def set_level(self, level: str):
+        """调整日志级别"""
+        self.logger.setLevel(LEVELS[level.upper()] if isinstance(level, str) else level)
+        # 热路径只读这两个布尔值
+        self._info = self.logger.isEnabledFor(logging.INFO)
+        self._warning = self.logger.isEnabledFor(logging.WARNING)
+
+    def sampled(self) -> bool:
+        """本次请求是否记录INFO日志（请求前调用一次，请求和响应共用结果）"""
+        if not self._info:
+            return False
+        return self.sample_rate >= 1 or random.random() < self.sample_rate
+
+    def log_request(self, endpoint: str, url: str, data: Dict):
+        """记录请求（调用方已通过 sampled() 判断）"""
+        self.logger.info(
+            "request %s", endpoint,
+            extra={"event": "request", "endpoint": endpoint, "url": url, "payload": dict(data)}
+        )
+
+    def log_response(
+        self,
+        endpoint: str,
+        status_code: int,
+        result: Dict,
+        latency_ms: float,
+        sampled: bool = True
+    ):
+        """
+        记录响应
+
+        Args:
+            endpoint: API端点
+            status_code: HTTP状态码
+            result: 响应体
+            latency_ms: 耗时（毫秒）
+            sampled: 本次请求是否被采样；业务失败（code非0）不受采样限制
+        """
+        if not sampled and not self._warning:
+            return
+        ok = isinstance(result, dict) and str(result.get("code")) == "0"
+        if ok:
+            if not sampled:
+                return
+            level = logging.INFO
+        elif self._warning:
+            level = logging.WARNING
+        else:
+            return
+        self.logger.log(
+            level, "response %s", endpoint,
+            extra={
+                "event": "response", "endpoint": endpoint, "status_code": status_code,
+                "latency_ms": latency_ms, "payload": dict(result) if isinstance(result, dict) else result
+            }
+        )
+
+    def log_error(self, endpoint: str, error: Exception, latency_ms: float):
+        """记录请求异常（不采样）"""
+        if self.logger.isEnabledFor(logging.ERROR):
+            self.logger.error(
+                "error %s", endpoint,
+                extra={"event": "error", "endpoint": endpoint, "latency_ms": latency_ms, "error": repr(error)}
+            )
+
+    def log_poll_error(self, merchant_order_no: str, order_type: str, error: Exception):
+        """记录订单轮询异常（不采样）"""
+        if self.logger.isEnabledFor(logging.ERROR):
+            self.logger.error(
+                "poll_error %s", merchant_order_no,
+                extra={"event": "poll_error", "merchant_order_no": merchant_order_no,
+                       "order_type": order_type, "error": repr(error)}
+            )
+
+    def close(self):
+        """输出队列中剩余的日志并关闭"""
+        if self._listener is not None:
+            self._listener.stop()
+            self._listener = None
+        for handler in self._handlers:
+            handler.close()
+        for handler in list(self.logger.handlers):
+            self.logger.removeHandler(handler)
+        self.set_level("OFF")
+
+
+# ============== 进程级共享实例 ==============
+_shared_logger: Optional[RequestLogger] = None
+_shared_lock = threading.Lock()
+
+
+def get_request_logger(**kwargs) -> RequestLogger:
+    """
+    获取进程内共享的请求日志（首次调用时按参数创建）
+
+    Args:
+        **kwargs: RequestLogger初始化参数，仅首次调用生效
+
+    Returns:
+        共享的RequestLogger实例
+    """
+    global _shared_logger
+    if _shared_logger is None:
+        with _shared_lock:
+            if _shared_logger is None:
+                _shared_logger = RequestLogger(**kwargs)
+                atexit.register(reset_request_logger)
+    return _shared_logger
+
+
+def reset_request_logger():
+    """关闭并丢弃共享请求日志（下次get_request_logger时按新参数重建）"""
+    global _shared_logger
+    with _shared_lock:
+        if _shared_logger is not None:
+            _shared_logger.close()
+        _shared_logger = None
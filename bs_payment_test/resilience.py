@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+BS支付系统 - 限流与熔断
+
+按端点保护网关调用:
+1. 令牌桶限流: 超出速率的请求排队等待，预计等待超过 max_wait 时直接拒绝
+2. 熔断器: 连续失败（网络异常、超时、HTTP 5xx）达到阈值后打开，期间快速失败；
+   冷却后进入半开状态，放行少量探测请求，成功则关闭，失败则重新打开
+3. 统计: 熔断状态、打开次数、被拒绝/被限流的请求数、累计等待时间
+
+业务错误（code非0）说明网关正常响应，不计为熔断失败。
+
+使用示例:
+    guard = get_guard("/api/coin/balance/query", rate=20, burst=40)
+    rejected, wait = guard.admit()
+    if rejected:
+        return {"code": -1, "msg": rejected}
+    time.sleep(wait)
+    ...
+    guard.record(success)
+
+作者: OpenClaw
+日期: 2026-02-11
+"""
+
+import time
+import threading
+from typing import Dict, Optional, Tuple
+
+# 熔断器状态
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class TokenBucket:
+    """令牌桶（线程安全，按预约方式计算等待时间，不在锁内睡眠）"""
+
+    def __init__(self, rate: float, burst: float = None):
+        """
+        初始化
+
+        Args:
+            rate: 每秒补充的令牌数
+            burst: 桶容量（允许的突发量，默认等于rate）
+        """
+        self.rate = rate
+        self.burst = burst if burst is not None else max(rate, 1)
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, max_wait: float = None) -> Optional[float]:
+        """
+        预约一个令牌
+
+        Args:
+            max_wait: 最长可接受的等待时间（秒，None为不限）
+
+        Returns:
+            需要等待的秒数；超过max_wait时返回None（不消耗令牌）
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+
+            wait = 0.0 if self._tokens >= 1 else (1 - self._tokens) / self.rate
+            if max_wait is not None and wait > max_wait:
+                return None
+            # 令牌可以为负，表示已被后续请求预约
+            self._tokens -= 1
+            return wait
+
+
+class CircuitBreaker:
+    """熔断器（连续失败计数，线程安全）"""
+
+    def __init__(
+        self,
+        failure_threshold: int = 5,
+        recovery_timeout: float = 30,
+        half_open_max: int = 1
+    ):
+        """
+        初始化
+
+        Args:
+            failure_threshold: 连续失败多少次后打开
+            recovery_timeout: 打开后多久进入半开状态（秒）
+            half_open_max: 半开状态同时放行的探测请求数
+        """
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.half_open_max = half_open_max
+
+        self.state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probes = 0
+        self._lock = threading.Lock()
+        self.stats = {"opened": 0, "rejected": 0, "successes": 0, "failures": 0}
+
+    def allow(self) -> bool:
+        """是否放行请求"""
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN:
+                if time.monotonic() - self._opened_at < self.recovery_timeout:
+                    self.stats["rejected"] += 1
+                    return False
+                self.state = HALF_OPEN
+                self._opened_at = time.monotonic()
+                self._probes = 0
+            elif time.monotonic() - self._opened_at >= self.recovery_timeout:
+                # 探测请求未回报结果（如被取消），开始新一轮探测
+                self._opened_at = time.monotonic()
+                self._probes = 0
+            if self._probes < self.half_open_max:
+                self._probes += 1
+                return True
+            self.stats["rejected"] += 1
+            return False
+
+    def release(self):
+        """放行后请求未发出（如被限流拒绝），归还半开状态的探测名额"""
+        with self._lock:
+            if self.state == HALF_OPEN and self._probes > 0:
+                self._probes -= 1
+
+    def record(self, success: bool):
+        """记录请求结果"""
+        with self._lock:
+            if success:
+                self.stats["successes"] += 1
+                self._failures = 0
+                if self.state == HALF_OPEN:
+                    self.state = CLOSED
+                return
+
+            self.stats["failures"] += 1
+            self._failures += 1
+            if self.state == HALF_OPEN or self._failures >= self.failure_threshold:
+                if self.state != OPEN:
+                    self.stats["opened"] += 1
+                self.state = OPEN
+                self._opened_at = time.monotonic()
+
+    def metrics(self) -> Dict:
+        with self._lock:
+            return dict(self.stats, state=self.state, consecutive_failures=self._failures)
+
+
+class EndpointGuard:
+    """单个端点的限流器 + 熔断器"""
+
+    def __init__(
+        self,
+        endpoint: str,
+        rate: float = 0,
+        burst: float = None,
+        max_wait: float = 5.0,
+        failure_threshold: int = 5,
+        recovery_timeout: float = 30,
+        half_open_max: int = 1
+    ):
+        """
+        初始化
+
+        Args:
+            endpoint: API端点
+            rate: 每秒请求数上限（0为不限流）
+            burst: 突发容量
+            max_wait: 限流排队的最长等待（秒），超过则拒绝
+            failure_threshold: 熔断阈值（连续失败次数）
+            recovery_timeout: 熔断冷却时间（秒）
+            half_open_max: 半开状态探测请求数
+        """
+        self.endpoint = endpoint
+        self.max_wait = max_wait
+        self.limiter = TokenBucket(rate, burst) if rate > 0 else None
+        self.breaker = CircuitBreaker(failure_threshold, recovery_timeout, half_open_max)
+        self._lock = threading.Lock()
+        self.stats = {"throttled": 0, "rate_rejected": 0, "wait_seconds": 0.0}
+
+    def admit(self) -> Tuple[Optional[str], float]:
+        """
+        请求准入（先检查熔断再预约令牌，熔断期间被拒绝的请求不消耗令牌、不排队等待）
+
+        Returns:
+            (拒绝原因或None, 需要等待的秒数)
+        """
+        if not self.breaker.allow():
+            return f"熔断中: {self.endpoint} 暂停请求", 0.0
+
+        wait = 0.0
+        if self.limiter is not None:
+            wait = self.limiter.reserve(self.max_wait)
+            if wait is None:
+                self.breaker.release()
+                with self._lock:
+                    self.stats["rate_rejected"] += 1
+                return f"限流: {self.endpoint} 超过 {self.limiter.rate}/s", 0.0
+
+        if wait > 0:
+            with self._lock:
+                self.stats["throttled"] += 1
+                self.stats["wait_seconds"] += wait
+        return None, wait
+
+    def record(self, success: bool):
+        """记录请求结果（网络异常、超时、HTTP 5xx为失败）"""
+        self.breaker.record(success)
+
+    def metrics(self) -> Dict:
+        with self._lock:
+            stats = dict(self.stats)
+        stats["wait_seconds"] = round(stats["wait_seconds"], 3)
+        stats["rate_limit"] = self.limiter.rate if self.limiter is not None else None
+        stats.update(self.breaker.metrics())
+        return stats
+
+
+# ============== 进程级共享实例 ==============
+_guards: Dict[str, EndpointGuard] = {}
+_guards_lock = threading.Lock()
+
+
+def get_guard(endpoint: str, **kwargs) -> EndpointGuard:
+    """
+    获取端点的共享限流熔断器（首次调用时按参数创建）
+
+    Args:
+        endpoint: API端点（也可带主机前缀区分不同网关）
+        **kwargs: EndpointGuard初始化参数，仅首次调用生效
+    """
+    guard = _guards.get(endpoint)
+    if guard is None:
+        with _guards_lock:
+            guard = _guards.get(endpoint)
+            if guard is None:
+                guard = _guards[endpoint] = EndpointGuard(endpoint, **kwargs)
+    return guard
+
+
+def guard_metrics() -> Dict[str, Dict]:
+    """所有端点的限流熔断统计"""
+    return {endpoint: guard.metrics() for endpoint, guard in sorted(_guards.items())}
+
+
+def reset_guards():
+    """丢弃所有共享限流熔断器"""
+    with _guards_lock:
+        _guards.clear()
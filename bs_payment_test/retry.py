@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+BS支付系统 - 重试策略
+
+按端点的幂等性决定如何重试:
+1. 幂等端点（订单查询、余额、汇率、闪付地址）: 网络异常、超时、HTTP 5xx 后直接重试
+2. 下单端点: 失败（含响应体无法解析）时订单可能已在网关创建，先用同一 merchantOrderNo 查询确认:
+   - 查询到订单: 返回查询结果，不再提交
+   - 确认订单不存在: 用同一 merchantOrderNo 重新提交（网关按单号去重，仍是安全的）
+   - 查询也失败或返回未知错误: 停止，返回"状态未知"，交给轮询/人工确认
+   - 不再重试（次数/预算用尽）时同样返回"状态未知"
+3. 指数退避 + 全抖动（full jitter），避免多个客户端同步重试
+4. 重试预算: 重试次数不超过 请求数×ratio + 每秒保底次数，网关故障时不会放大流量
+
+熔断中、限流拒绝、业务错误（code非0）都不重试。
+
+使用示例:
+    policy = get_retry_policy("https://test-gateway.cfbaopay.com", max_attempts=3)
+    if policy.should_retry(endpoint, attempt, failure):
+        time.sleep(policy.backoff(attempt))
+
+作者: OpenClaw
+日期: 2026-02-11
+"""
+
+import time
+import random
+import threading
+from typing import Dict, Iterable, Optional
+
+# 单次请求的失败类型（None 表示网关已正常应答）
+REJECTED = "rejected"   # 熔断/限流拒绝，未发出请求
+NETWORK = "network"     # 连接失败、连接中断
+TIMEOUT = "timeout"     # 超时
+HTTP_5XX = "http_5xx"   # 网关/代理返回 5xx
+INVALID = "invalid"     # 2xx/4xx 但响应体无法解析
+
+RETRYABLE_FAILURES = frozenset({NETWORK, TIMEOUT, HTTP_5XX})
+
+# 下单结果未知的失败: 请求可能已被网关处理（代理/WAF页面、读取响应体中断也算）
+AMBIGUOUS_FAILURES = RETRYABLE_FAILURES | {INVALID}
+
+# 幂等端点（可直接重试）
+IDEMPOTENT_ENDPOINTS = frozenset({
+    "/api/coin/payOrder/query",
+    "/api/coin/remitOrder/query",
+    "/api/remitMatchOrder/query",
+    "/api/coin/balance/query",
+    "/api/merchant/queryChannelRate",
+    "/api/coin/quick/queryAddress"
+})
+
+# 下单端点 -> 确认用的查询端点
+CONFIRM_ENDPOINTS = {
+    "/api/coin/payOrder/create": "/api/coin/payOrder/query",
+    "/api/coin/payOrder/createCashier": "/api/coin/payOrder/query",
+    "/api/coin/remitOrder/create": "/api/coin/remitOrder/query",
+    "/api/remitMatchOrder/create": "/api/remitMatchOrder/query"
+}
+
+# 确认查询的结论
+EXISTS = "exists"
+MISSING = "missing"
+UNKNOWN = "unknown"
+
+
+class RetryBudget:
+    """重试预算（令牌制，线程安全）"""
+
+    def __init__(self, ratio: float = 0.1, min_per_sec: float = 5, max_tokens: float = None):
+        """
+        初始化
+
+        Args:
+            ratio: 每个请求存入的令牌（0.1 表示重试最多占请求数的10%）
+            min_per_sec: 每秒保底令牌（低流量时也允许少量重试）
+            max_tokens: 令牌上限（默认 10秒的保底令牌，至少10）
+        """
+        self.ratio = ratio
+        self.min_per_sec = min_per_sec
+        self.max_tokens = max_tokens if max_tokens is not None else max(min_per_sec * 10, 10)
+        self._tokens = min(self.max_tokens, max(min_per_sec, 1))
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def deposit(self):
+        """记录一次新请求"""
+        with self._lock:
+            self._tokens = min(self.max_tokens, self._tokens + self.ratio)
+
+    def withdraw(self) -> bool:
+        """申请一次重试，预算不足时返回False"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.max_tokens, self._tokens + (now - self._updated) * self.min_per_sec)
+            self._updated = now
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            return True
+
+
+class RetryPolicy:
+    """重试策略（同一网关的所有客户端共享预算和统计）"""
+
+    def __init__(
+        self,
+        max_attempts: int = 3,
+        base_delay: float = 0.2,
+        max_delay: float = 5.0,
+        budget_ratio: float = 0.1,
+        budget_min_per_sec: float = 5,
+        not_found_codes: Iterable[str] = ("5",),
+        duplicate_codes: Iterable[str] = ("7",)
+    ):
+        """
+        初始化
+
+        Args:
+            max_attempts: 每次调用的最多请求次数（含首次）
+            base_delay: 首次重试的退避上限（秒），之后每次翻倍
+            max_delay: 退避上限（秒）
+            budget_ratio: 重试预算比例
+            budget_min_per_sec: 每秒保底重试次数
+            not_found_codes: 订单查询"订单不存在"的返回码
+            duplicate_codes: 下单"订单号已存在"的返回码
+        """
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.not_found_codes = frozenset(str(c) for c in not_found_codes)
+        self.duplicate_codes = frozenset(str(c) for c in duplicate_codes)
+        self.budget = RetryBudget(budget_ratio, budget_min_per_sec)
+
+        self._lock = threading.Lock()
+        self.stats = {
+            "calls": 0,
+            "retries": 0,
+            "budget_exhausted": 0,
+            "confirmations": 0,
+            "confirmed_existing": 0,
+            "resubmitted": 0,
+            "unknown": 0
+        }
+
+    def _count(self, name: str):
+        with self._lock:
+            self.stats[name] += 1
+
+    # ============== 端点分类 ==============
+    @staticmethod
+    def is_idempotent(endpoint: str) -> bool:
+        return endpoint in IDEMPOTENT_ENDPOINTS
+
+    @staticmethod
+    def confirm_endpoint(endpoint: str) -> Optional[str]:
+        """下单端点对应的确认查询端点（非下单端点返回None）"""
+        return CONFIRM_ENDPOINTS.get(endpoint)
+
+    # ============== 重试决策 ==============
+    def start(self):
+        """记录一次新调用（存入重试预算）"""
+        self.budget.deposit()
+        self._count("calls")
+
+    def should_retry(self, endpoint: str, attempt: int, failure: Optional[str]) -> bool:
+        """
+        失败后是否重试
+
+        Args:
+            endpoint: API端点
+            attempt: 已完成的请求次数
+            failure: 本次失败类型（None 为网关已应答）
+        """
+        if attempt >= self.max_attempts:
+            return False
+        if self.confirm_endpoint(endpoint) is not None:
+            # 下单: 结果未知时先查询确认，再决定是否重提
+            if failure not in AMBIGUOUS_FAILURES:
+                return False
+        elif failure not in RETRYABLE_FAILURES or not self.is_idempotent(endpoint):
+            return False
+        if not self.budget.withdraw():
+            self._count("budget_exhausted")
+            return False
+        self._count("retries")
+        return True
+
+    def backoff(self, attempt: int) -> float:
+        """第attempt次请求失败后的等待时间（秒，指数退避 + 全抖动）"""
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** (attempt - 1))))
+
+    # ============== 下单确认 ==============
+    def confirmation(self, result: Dict) -> str:
+        """
+        解读确认查询的结果（查询本身已按幂等端点重试）
+
+        Returns:
+            EXISTS / MISSING / UNKNOWN
+        """
+        self._count("confirmations")
+        code = str(result.get("code"))
+        if code == "0":
+            self._count("confirmed_existing")
+            return EXISTS
+        if code in self.not_found_codes:
+            self._count("resubmitted")
+            return MISSING
+        return UNKNOWN
+
+    def is_duplicate(self, result: Dict) -> bool:
+        """重新提交时网关返回"订单号已存在"（说明首次提交已成功）"""
+        return str(result.get("code")) in self.duplicate_codes
+
+    @staticmethod
+    def is_ambiguous(failure: Optional[str]) -> bool:
+        """请求可能已到达网关但结果未知（下单时不能当作失败直接换单号重提）"""
+        return failure in AMBIGUOUS_FAILURES
+
+    def unknown_result(self, result: Dict, merchant_order_no: str) -> Dict:
+        """订单状态未知时的返回（保留原失败信息，提示不要换单号重提）"""
+        self._count("unknown")
+        return {
+            "code": -1,
+            "msg": f"{result.get('msg')}; 订单 {merchant_order_no} 状态未知，请稍后用同一单号查询确认，勿换单号重提"
+        }
+
+    def metrics(self) -> Dict:
+        with self._lock:
+            return dict(self.stats)
+
+
+# ============== 进程级共享实例 ==============
+_policies: Dict[str, RetryPolicy] = {}
+_policies_lock = threading.Lock()
+
+
+def get_retry_policy(key: str, **kwargs) -> RetryPolicy:
+    """
+    获取共享重试策略（首次调用时按参数创建）
+
+    Args:
+        key: 共享键（通常为网关地址，同一网关共用重试预算）
+        **kwargs: RetryPolicy初始化参数，仅首次调用生效
+    """
+    policy = _policies.get(key)
+    if policy is None:
+        with _policies_lock:
+            policy = _policies.get(key)
+            if policy is None:
+                policy = _policies[key] = RetryPolicy(**kwargs)
+    return policy
+
+
+def retry_metrics() -> Dict[str, Dict]:
+    """所有网关的重试统计"""
+    return {key: policy.metrics() for key, policy in sorted(_policies.items())}
+
+
+def reset_retry_policies():
+    """丢弃所有共享重试策略"""
+    with _policies_lock:
+        _policies.clear()
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+BS支付系统 - JSON序列化
+
+网关请求/响应的JSON编解码，按可用性选择后端:
+1. orjson（最快，pip install orjson）
+2. msgspec（pip install msgspec）
+3. 标准库json（兜底，无需额外依赖）
+
+所有后端输出一致: UTF-8字节、紧凑分隔符、中文不转义。
+签名基于签名串而非请求体，切换后端不影响验签。
+
+使用示例:
+    body = dumps(params)                          # bytes
+    result = loads(response.content)              # dict
+    typed = decode_result(response.content, "/api/coin/balance/query")
+    print(BACKEND, typed.data.available_amount)
+
+作者: OpenClaw
+日期: 2026-02-11
+"""
+
+import json
+from typing import Any, Callable, Dict, Tuple, Union
+
+from models import Result, model_for
+
+BACKENDS = ("orjson", "msgspec", "json")
+
+
+def _json_backend() -> Tuple[Callable[[Any], bytes], Callable[[Union[bytes, str]], Any]]:
+    encoder = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"), default=str)
+
+    def dumps(obj: Any) -> bytes:
+        return encoder.encode(obj).encode("utf-8")
+
+    return dumps, json.loads
+
+
+def _orjson_backend():
+    import orjson
+
+    def dumps(obj: Any) -> bytes:
+        return orjson.dumps(obj, default=str)
+
+    return dumps, orjson.loads
+
+
+def _msgspec_backend():
+    import msgspec
+
+    encoder = msgspec.json.Encoder(enc_hook=str)
+    decoder = msgspec.json.Decoder()
+
+    def loads(data: Union[bytes, str]) -> Any:
+        try:
+            return decoder.decode(data)
+        except msgspec.DecodeError as e:
+            # 与其他后端一致，解码失败抛 ValueError
+            raise ValueError(str(e)) from e
+
+    return encoder.encode, loads
+
+
+_LOADERS: Dict[str, Callable] = {
+    "orjson": _orjson_backend,
+    "msgspec": _msgspec_backend,
+    "json": _json_backend
+}
+
+
+def available_backends() -> Tuple[str, ...]:
+    """当前环境可用的后端"""
+    names = []
+    for name in BACKENDS:
+        try:
+            _LOADERS[name]()
+        except ImportError:
+            continue
+        names.append(name)
+    return tuple(names)
+
+
+def set_backend(name: str = None) -> str:
+    """
+    切换后端（基准测试或排查问题时使用）
+
+    Args:
+        name: orjson / msgspec / json；None 为自动选择可用的最快后端
+
+    Returns:
+        实际使用的后端名称
+    """
+    global BACKEND, dumps, loads
+    for candidate in ((name,) if name else BACKENDS):
+        try:
+            dumps, loads = _LOADERS[candidate]()
+        except ImportError:
+            if name:
+                raise
+            continue
+        BACKEND = candidate
+        return BACKEND
+    raise RuntimeError("没有可用的JSON后端")
+
+
+BACKEND: str = ""
+dumps: Callable[[Any], bytes]
+loads: Callable[[Union[bytes, str]], Any]
+set_backend()
+
+
+def decode_result(payload: Union[bytes, str], endpoint: str) -> Result:
+    """
+    解码响应并转为类型化结果
+
+    Args:
+        payload: 响应体
+        endpoint: API端点（决定data的模型）
+
+    Returns:
+        Result（data为 Order / Balance / ChannelRate，未登记的端点保留原始data）
+    """
+    return Result.from_dict(loads(payload), model_for(endpoint))
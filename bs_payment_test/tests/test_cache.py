@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+BS支付系统 - 响应缓存测试
+验证合并请求（single-flight）、提前刷新与过期，同步与异步调用方各一组
+"""
+
+import sys
+import time
+import asyncio
+import threading
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import cache as cache_module
+from cache import TTLCache
+
+KEY = ("http://gateway", "merchant", "USDT_TRC20")
+
+
+class FakeClock:
+    """可手动推进的 time.monotonic"""
+
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class CountingLoader:
+    """记录调用次数，按顺序返回 rate=1, rate=2 ..."""
+
+    def __init__(self, code: str = "0"):
+        self.code = code
+        self.calls = 0
+        self.release = threading.Event()
+        self.release.set()
+
+    def __call__(self):
+        self.calls += 1
+        self.release.wait(5)
+        return {"code": self.code, "data": {"rate": str(self.calls)}}
+
+    async def load_async(self):
+        self.calls += 1
+        await asyncio.sleep(0.01)
+        return {"code": self.code, "data": {"rate": str(self.calls)}}
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    # 只替换缓存模块看到的时钟，线程与事件循环不受影响
+    monkeypatch.setattr(cache_module, "time", SimpleNamespace(monotonic=clock))
+    return clock
+
+
+@pytest.fixture
+def cache():
+    cache = TTLCache("test", ttl=60, refresh_ahead=0.8)
+    yield cache
+    cache.close()
+
+
+def rate(result) -> str:
+    return result["data"]["rate"]
+
+
+# ============== 合并请求 ==============
+def test_concurrent_misses_share_one_load(cache):
+    loader = CountingLoader()
+    loader.release.clear()
+    results = []
+
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_load(KEY, loader)))
+               for _ in range(16)]
+    for thread in threads:
+        thread.start()
+    # 等到其余调用方都在等待同一个上游请求
+    while cache.stats["misses"] + cache.stats["coalesced"] < 16:
+        time.sleep(0.001)
+    loader.release.set()
+    for thread in threads:
+        thread.join()
+
+    assert loader.calls == 1
+    assert [rate(r) for r in results] == ["1"] * 16
+    assert cache.metrics()["coalesced"] == 15
+    assert cache.metrics()["entries"] == 1
+
+
+def test_failed_response_is_shared_but_not_cached(cache):
+    loader = CountingLoader(code="1")
+
+    assert rate(cache.get_or_load(KEY, loader)) == "1"
+    assert rate(cache.get_or_load(KEY, loader)) == "2"
+    assert loader.calls == 2
+    assert cache.metrics()["entries"] == 0
+
+
+def test_loader_error_reaches_waiting_callers(cache):
+    started = threading.Event()
+    release = threading.Event()
+
+    def failing_loader():
+        started.set()
+        release.wait(5)
+        raise ConnectionError("gateway down")
+
+    errors = []
+
+    def call():
+        try:
+            cache.get_or_load(KEY, failing_loader)
+        except ConnectionError as e:
+            errors.append(e)
+
+    leader = threading.Thread(target=call)
+    leader.start()
+    started.wait(5)
+    waiter = threading.Thread(target=call)
+    waiter.start()
+    while cache.stats["coalesced"] < 1:
+        time.sleep(0.001)
+    release.set()
+    leader.join()
+    waiter.join()
+
+    assert len(errors) == 2
+    assert cache.metrics()["load_errors"] == 1
+    assert cache.metrics()["entries"] == 0
+
+
+# ============== 提前刷新与过期 ==============
+def test_refresh_ahead_returns_stale_value_and_reloads_once(clock, cache):
+    loader = CountingLoader()
+    assert rate(cache.get_or_load(KEY, loader)) == "1"
+
+    clock.now += 47
+    assert rate(cache.get_or_load(KEY, loader)) == "1"
+    assert cache.metrics()["refreshes"] == 0
+
+    # 使用80%有效期后: 立即返回旧值，后台只刷新一次
+    loader.release.clear()
+    clock.now += 1
+    assert rate(cache.get_or_load(KEY, loader)) == "1"
+    assert rate(cache.get_or_load(KEY, loader)) == "1"
+    loader.release.set()
+    cache.close()
+
+    assert loader.calls == 2
+    assert cache.metrics()["refreshes"] == 1
+    assert rate(cache.get_or_load(KEY, loader)) == "2"
+
+
+def test_entry_expires_after_ttl(clock, cache):
+    loader = CountingLoader()
+    cache.get_or_load(KEY, loader, ttl=5)
+
+    clock.now += 5
+    assert rate(cache.get_or_load(KEY, loader, ttl=5)) == "2"
+    assert cache.metrics()["misses"] == 2
+
+
+# ============== 异步接口 ==============
+def test_async_concurrent_misses_share_one_load(cache):
+    loader = CountingLoader()
+
+    async def run():
+        return await asyncio.gather(*(cache.get_or_load_async(KEY, loader.load_async) for _ in range(16)))
+
+    results = asyncio.run(run())
+
+    assert loader.calls == 1
+    assert [rate(r) for r in results] == ["1"] * 16
+    assert cache.metrics()["coalesced"] == 15
+
+
+def test_async_refresh_ahead_runs_in_background(clock, cache):
+    loader = CountingLoader()
+
+    async def run():
+        first = await cache.get_or_load_async(KEY, loader.load_async)
+        clock.now += 50
+        stale = await asyncio.gather(*(cache.get_or_load_async(KEY, loader.load_async) for _ in range(4)))
+        await asyncio.sleep(0.05)
+        fresh = await cache.get_or_load_async(KEY, loader.load_async)
+        return first, stale, fresh
+
+    first, stale, fresh = asyncio.run(run())
+
+    assert rate(first) == "1"
+    assert [rate(r) for r in stale] == ["1"] * 4
+    assert rate(fresh) == "2"
+    assert loader.calls == 2
+    assert cache.metrics()["refreshes"] == 1
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+BS支付系统 - 回调去重测试
+验证预占的互斥、释放、应答记录，以及预占超过有效期后可被其他进程接管
+"""
+
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import callback_dedup
+from callback_dedup import IN_PROGRESS, CallbackDedupStore
+
+KEY = "CZ1|1|sign"
+SUCCESS = {"code": "success"}
+
+
+class FakeClock:
+    """可手动推进的 time.time"""
+
+    def __init__(self, now: float = 1_000_000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(callback_dedup.time, "time", clock)
+    return clock
+
+
+@pytest.fixture
+def open_store(tmp_path):
+    """同一SQLite文件上的多个存储，模拟多个回调进程"""
+    stores = []
+
+    def open_store(**kwargs) -> CallbackDedupStore:
+        store = CallbackDedupStore(str(tmp_path / "dedup.db"), **kwargs)
+        stores.append(store)
+        return store
+
+    yield open_store
+    for store in stores:
+        store.close()
+
+
+def test_reserve_is_exclusive_until_released(clock, open_store):
+    a, b = open_store(), open_store()
+
+    assert a.reserve(KEY) is None
+    assert b.reserve(KEY) == IN_PROGRESS
+    assert b.stats["in_progress"] == 1
+
+    a.release(KEY)
+    assert b.reserve(KEY) is None
+
+
+def test_stored_response_is_returned_to_other_process(clock, open_store):
+    a, b = open_store(), open_store()
+
+    assert a.reserve(KEY) is None
+    a.put(KEY, SUCCESS)
+
+    assert b.reserve(KEY) == SUCCESS
+    assert b.stats["disk_hits"] == 1
+    assert a.reserve(KEY) == SUCCESS
+    assert a.stats["hits"] == 1
+
+
+def test_expired_lease_is_taken_over(clock, open_store):
+    a, b = open_store(lease=60), open_store(lease=60)
+
+    assert a.reserve(KEY) is None
+    clock.now += 59
+    assert b.reserve(KEY) == IN_PROGRESS
+
+    # 处理方崩溃未释放，预占过期后由另一进程接管，接管后重新计时
+    clock.now += 2
+    assert b.reserve(KEY) is None
+    assert a.reserve(KEY) == IN_PROGRESS
+
+    b.put(KEY, SUCCESS)
+    assert a.reserve(KEY) == SUCCESS
+
+
+def test_release_does_not_delete_stored_response(clock, open_store):
+    store = open_store()
+
+    assert store.reserve(KEY) is None
+    store.put(KEY, SUCCESS)
+    store.release(KEY)
+
+    assert open_store().reserve(KEY) == SUCCESS
+
+
+def test_expired_response_can_be_reserved_again(clock, open_store):
+    a, b = open_store(ttl=3600), open_store(ttl=3600)
+
+    assert a.reserve(KEY) is None
+    a.put(KEY, SUCCESS)
+
+    clock.now += 3601
+    assert b.reserve(KEY) is None
+    assert a.reserve(KEY) == IN_PROGRESS
+
+
+def test_concurrent_reserve_has_single_winner(open_store):
+    stores = [open_store() for _ in range(4)]
+    barrier = threading.Barrier(16)
+    results = []
+
+    def worker(store):
+        barrier.wait()
+        results.append(store.reserve(KEY))
+
+    threads = [threading.Thread(target=worker, args=(stores[i % 4],)) for i in range(16)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results.count(None) == 1
+    assert results.count(IN_PROGRESS) == 15
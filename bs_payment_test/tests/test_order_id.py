@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+BS支付系统 - 订单号生成器测试
+验证多线程生成的订单号不重复（含时钟停滞、回拨），以及机器号租约互斥
+"""
+
+import os
+import sys
+import threading
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import order_id
+from order_id import MAX_WORKER_ID, SEQUENCE_MASK, OrderNoGenerator
+
+needs_flock = pytest.mark.skipif(order_id.fcntl is None, reason="平台不支持文件锁")
+
+
+class FakeClock:
+    """可手动设置的 time.time"""
+
+    def __init__(self, now: float = 1770811845.123):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(order_id, "time", SimpleNamespace(time=clock))
+    monkeypatch.setattr(order_id, "_time", clock)
+    return clock
+
+
+@pytest.fixture
+def leases():
+    """测试结束时释放本测试租用的机器号"""
+    before = set(order_id._leases)
+    yield
+    with order_id._leases_lock:
+        for worker_id in set(order_id._leases) - before:
+            os.close(order_id._leases.pop(worker_id))
+
+
+def generate(generator: OrderNoGenerator, threads: int, count: int) -> list:
+    """多线程生成，返回每个线程的ID列表"""
+    barrier = threading.Barrier(threads)
+    results = [None] * threads
+
+    def worker(index):
+        barrier.wait()
+        results[index] = [generator.next_id() for _ in range(count)]
+
+    pool = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    return results
+
+
+def assert_unique(generator: OrderNoGenerator, results: list):
+    ids = [value for chunk in results for value in chunk]
+    assert len(set(ids)) == len(ids)
+    for chunk in results:
+        # 同一线程内单调递增
+        assert all(a < b for a, b in zip(chunk, chunk[1:]))
+    assert {OrderNoGenerator.parse(f"{value:019d}")["worker_id"] for value in ids} == {generator.worker_id}
+
+
+# ============== 唯一性 ==============
+def test_ids_are_unique_across_threads():
+    generator = OrderNoGenerator(worker_id=7)
+
+    assert_unique(generator, generate(generator, threads=8, count=20000))
+
+
+def test_ids_are_unique_when_clock_stalls(clock):
+    # 时钟停在同一毫秒: 单毫秒4096个用完后借用下一毫秒，机器号不受影响
+    generator = OrderNoGenerator(worker_id=MAX_WORKER_ID)
+    results = generate(generator, threads=4, count=5000)
+
+    assert_unique(generator, results)
+    sequences = {OrderNoGenerator.parse(f"{value:019d}")["sequence"] for chunk in results for value in chunk}
+    assert sequences == set(range(SEQUENCE_MASK + 1))
+
+
+def test_ids_keep_increasing_when_clock_goes_back(clock):
+    generator = OrderNoGenerator(worker_id=1)
+    before = [generator.next_id() for _ in range(1000)]
+
+    clock.now -= 5
+    after = [generator.next_id() for _ in range(1000)]
+
+    assert before[-1] < after[0]
+    assert_unique(generator, [before + after])
+
+
+def test_order_no_format_and_parse(clock):
+    order_no = OrderNoGenerator(worker_id=42).next_order_no("DF")
+
+    assert order_no.startswith("DF") and len(order_no) == 21
+    assert OrderNoGenerator.parse(order_no) == {
+        "timestamp_ms": int(clock.now * 1000), "worker_id": 42, "sequence": 0
+    }
+
+
+def test_worker_id_out_of_range():
+    with pytest.raises(ValueError):
+        OrderNoGenerator(worker_id=MAX_WORKER_ID + 1)
+
+
+# ============== 机器号租约 ==============
+@needs_flock
+def test_leased_worker_ids_are_distinct(tmp_path, leases):
+    worker_ids = [order_id.lease_worker_id(str(tmp_path)) for _ in range(8)]
+
+    assert len(set(worker_ids)) == 8
+
+
+@needs_flock
+def test_lease_skips_worker_id_locked_by_other_process(tmp_path, leases):
+    # 另一个打开的文件描述符持有锁，等同于其他进程已租用
+    taken = os.getpid() & MAX_WORKER_ID
+    fd = os.open(str(tmp_path / f"worker-{taken}.lock"), os.O_RDWR | os.O_CREAT)
+    order_id.fcntl.flock(fd, order_id.fcntl.LOCK_EX | order_id.fcntl.LOCK_NB)
+    try:
+        assert order_id.lease_worker_id(str(tmp_path)) == (taken + 1) & MAX_WORKER_ID
+    finally:
+        os.close(fd)
+
+
+@needs_flock
+def test_default_worker_id_uses_environment(monkeypatch, tmp_path, leases):
+    monkeypatch.setenv("BS_WORKER_ID", "99")
+    assert OrderNoGenerator().worker_id == 99
+
+    monkeypatch.delenv("BS_WORKER_ID")
+    monkeypatch.setenv("BS_WORKER_LOCK_DIR", str(tmp_path))
+    worker_id = OrderNoGenerator().worker_id
+    assert (tmp_path / f"worker-{worker_id}.lock").exists()
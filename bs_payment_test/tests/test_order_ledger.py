@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+BS支付系统 - 订单台账测试
+验证终态不会被迟到的“处理中”回调或查询结果覆盖
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from order_ledger import OrderLedger
+
+
+@pytest.fixture
+def ledger(tmp_path):
+    ledger = OrderLedger(str(tmp_path / "orders.db"))
+    yield ledger
+    ledger.close()
+
+
+@pytest.mark.parametrize("terminal", ["1", "2"])
+def test_terminal_status_is_not_downgraded(ledger, terminal):
+    ledger.record_order("remit", "DF1", amount="1", coin_type="USDT_TRC20", submit_time="20260211120000")
+    ledger.update_status("DF1", terminal)
+    ledger.update_status("DF1", "0", data={"status": "0"})
+    ledger.flush()
+
+    order = ledger.get("DF1")
+    assert order["status"] == terminal
+    assert order["submit_time"] == "20260211120000"
+    assert order["data"] == {"status": "0"}
+
+
+def test_late_processing_status_in_same_batch_is_ignored(ledger):
+    # 终态与迟到的处理中状态合并在同一个事务里提交
+    assert ledger.update_status("CZ1", "1", order_type="collection") is True
+    assert ledger.update_status("CZ1", "0", wait=5)
+
+    assert ledger.get("CZ1")["status"] == "1"
+
+
+def test_processing_status_advances_and_terminal_can_change(ledger):
+    ledger.record_order("collection", "CZ2")
+    ledger.update_status("CZ2", "0")
+    ledger.update_status("CZ2", "1")
+    ledger.flush()
+    assert ledger.get("CZ2")["status"] == "1"
+
+    # 终态之间的变更（如成功后冲正为失败）照常写入
+    ledger.update_status("CZ2", "2", wait=5)
+    assert ledger.get("CZ2")["status"] == "2"
+    assert ledger.count("2") == 1
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+BS支付系统 - 订单轮询测试
+用桩客户端模拟查询接口，验证回调（或台账中的终态）到达后立即停止轮询
+"""
+
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from order_ledger import OrderLedger
+from order_poller import OrderPoller
+from request_log import reset_request_logger
+
+SUBMIT_TIME = "20260211120000"
+
+
+class StubClient:
+    """查询接口桩: 按预设依次返回订单状态（用完后保持最后一个），并记录查询参数"""
+
+    def __init__(self, statuses=("0",)):
+        self.statuses = list(statuses)
+        self.calls = []
+
+    def _query(self, merchant_order_no, submit_time=None):
+        self.calls.append((merchant_order_no, submit_time))
+        status = self.statuses.pop(0) if len(self.statuses) > 1 else self.statuses[0]
+        return {"code": "0", "msg": "ok", "data": {"merchantOrderNo": merchant_order_no, "status": status}}
+
+    query_collection_order = _query
+    query_remit_order = _query
+    query_cny_remit_order = _query
+
+
+def make_poller(client, **kwargs) -> OrderPoller:
+    options = dict(max_qps=0, initial_delay=0.02, max_delay=0.05, jitter=0)
+    options.update(kwargs)
+    return OrderPoller(client, **options)
+
+
+@pytest.fixture(autouse=True, scope="module")
+def request_log():
+    # 轮询服务会创建共享请求日志，结束后丢弃，其他测试按自己的 CONFIG["logging"] 重建
+    yield
+    reset_request_logger()
+
+
+@pytest.fixture
+def ledger(tmp_path):
+    ledger = OrderLedger(str(tmp_path / "orders.db"))
+    yield ledger
+    ledger.close()
+
+
+# ============== 单订单轮询 ==============
+def test_callback_completes_poll_until_complete():
+    client = StubClient()
+    poller = make_poller(client)
+    timer = threading.Timer(0.1, poller.on_callback, [{"merchantOrderNo": "DF1", "status": "1"}])
+    timer.start()
+
+    start = time.monotonic()
+    result = poller.poll_until_complete("DF1", "remit", SUBMIT_TIME, timeout=5)
+
+    assert time.monotonic() - start < 1
+    assert result["code"] == "0"
+    assert result["data"]["status"] == "1"
+    assert result["msg"] == "回调已完成"
+    assert poller.stats["by_callback"] == 1
+    assert poller.pending() == 0
+
+    queries = len(client.calls)
+    time.sleep(0.1)
+    assert len(client.calls) == queries
+
+
+def test_non_terminal_callback_keeps_polling():
+    client = StubClient(["0", "0", "2"])
+    poller = make_poller(client)
+
+    poller.on_callback({"merchantOrderNo": "DF2", "status": "0"})
+    result = poller.poll_until_complete("DF2", "remit", SUBMIT_TIME, timeout=5)
+
+    assert result["data"]["status"] == "2"
+    assert len(client.calls) == 3
+    assert poller.stats == {"queries": 3, "completed": 1, "by_callback": 0, "expired": 0}
+
+
+def test_terminal_status_in_ledger_completes_without_query(ledger):
+    # 其他进程的回调已写入台账
+    ledger.record_order("remit", "DF3", submit_time=SUBMIT_TIME)
+    ledger.update_status("DF3", "2", wait=5)
+    client = StubClient()
+    poller = make_poller(client, ledger=ledger)
+
+    result = poller.poll_until_complete("DF3", "remit", timeout=5)
+
+    assert result["data"]["status"] == "2"
+    assert client.calls == []
+    assert poller.stats["by_callback"] == 1
+
+
+def test_timeout_returns_last_query_result():
+    client = StubClient()
+    poller = make_poller(client)
+
+    result = poller.poll_until_complete("DF4", "remit", SUBMIT_TIME, timeout=0.1)
+
+    assert result["data"]["status"] == "0"
+    assert poller.stats["expired"] == 1
+    assert poller.pending() == 0
+
+
+# ============== 提交时间 ==============
+def test_queries_use_order_submit_time(ledger):
+    ledger.record_order("collection", "CZ5", submit_time="20260101000000")
+    ledger.flush()
+    client = StubClient(["1"])
+    poller = make_poller(client, ledger=ledger)
+
+    poller.poll_until_complete("CZ5", "collection", timeout=5)
+    poller.poll_until_complete("CZ6", "collection", SUBMIT_TIME, timeout=5)
+
+    assert client.calls == [("CZ5", "20260101000000"), ("CZ6", SUBMIT_TIME)]
+
+
+def test_missing_submit_time_is_rejected(ledger):
+    poller = make_poller(StubClient(), ledger=ledger)
+
+    with pytest.raises(ValueError):
+        poller.track("DF7", "remit")
+    with pytest.raises(ValueError):
+        poller.poll_until_complete("DF7", "remit", timeout=1)
+    with pytest.raises(ValueError):
+        poller.track("DF7", "refund", SUBMIT_TIME)
+
+
+# ============== 后台服务 ==============
+def test_callback_stops_background_polling():
+    client = StubClient()
+    poller = make_poller(client)
+    poller.start()
+    try:
+        for i in range(5):
+            poller.track(f"DF{i}", "remit", SUBMIT_TIME)
+        time.sleep(0.1)
+        for i in range(5):
+            poller.on_callback({"merchantOrderNo": f"DF{i}", "status": "1"})
+
+        assert [poller.wait(f"DF{i}", timeout=1) for i in range(5)] == ["1"] * 5
+        assert poller.pending() == 0
+
+        # 回调到达时可能已有查询在途，等其返回后不应再有新的查询
+        time.sleep(0.05)
+        queries = len(client.calls)
+        time.sleep(0.2)
+        assert len(client.calls) == queries
+    finally:
+        poller.stop()
+
+    assert poller.stats["by_callback"] == 5
+    assert poller.stats["completed"] == 5
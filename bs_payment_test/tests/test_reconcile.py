@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+BS支付系统 - 订单对账测试
+验证排序归并比对的重复单号、单边缺失、金额与状态不一致，以及外部排序后的对账单对账
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from order_ledger import OrderLedger
+from reconcile import (
+    AMOUNT_MISMATCH, DUPLICATE_REMOTE, MISSING_LOCAL, MISSING_REMOTE, STATUS_DIVERGED,
+    OrderRecord, ReconcileReport, ensure_sorted, external_sort, merge_join, reconcile_statement
+)
+
+
+def records(*rows) -> list:
+    return [OrderRecord(*row) for row in rows]
+
+
+def order_nos(report: ReconcileReport, kind: str) -> list:
+    return [entry["merchantOrderNo"] for entry in report.samples.get(kind, [])]
+
+
+# ============== 归并比对 ==============
+def test_duplicate_remote_rows_are_reported_once_each():
+    local = records(("CZ1", "10", "1"), ("CZ2", "20", "1"))
+    remote = records(("CZ1", "10", "1"), ("CZ1", "10", "1"), ("CZ1", "10", "1"), ("CZ2", "20", "1"))
+
+    report = merge_join(local, remote, ReconcileReport())
+
+    assert report.counts[DUPLICATE_REMOTE] == 2
+    assert order_nos(report, DUPLICATE_REMOTE) == ["CZ1", "CZ1"]
+    assert report.matched == 2
+    assert (report.local_total, report.remote_total) == (2, 4)
+
+
+def test_missing_on_either_side_including_tails():
+    local = records(("CZ1", "10", "1"), ("CZ3", "10", "1"), ("CZ5", "10", "1"), ("CZ6", "10", "1"))
+    remote = records(("CZ0", "10", "1"), ("CZ1", "10", "1"), ("CZ4", "10", "1"), ("CZ7", "10", "1"))
+
+    report = merge_join(local, remote, ReconcileReport())
+
+    assert order_nos(report, MISSING_REMOTE) == ["CZ3", "CZ5", "CZ6"]
+    assert order_nos(report, MISSING_LOCAL) == ["CZ0", "CZ4", "CZ7"]
+    assert report.matched == 1
+    assert (report.local_total, report.remote_total) == (4, 4)
+
+
+@pytest.mark.parametrize("local, remote", [([], []), (records(("CZ1",)), []), ([], records(("CZ1",)))])
+def test_empty_sides(local, remote):
+    report = merge_join(local, remote, ReconcileReport())
+
+    assert report.discrepancies == len(local) + len(remote)
+    assert (report.local_total, report.remote_total) == (len(local), len(remote))
+
+
+def test_amount_and_status_mismatch():
+    local = records(("CZ1", "10", "1"), ("CZ2", "10", "1"), ("CZ3", "10", "0"), ("CZ4", None, None))
+    remote = records(("CZ1", "10.00", "1"), ("CZ2", "10.01", "2"), ("CZ3", "10", "1"), ("CZ4", None, "0"))
+
+    report = merge_join(local, remote, ReconcileReport())
+
+    # 金额按数值比较（10 与 10.00 相同）；状态缺失视为0（处理中）
+    assert order_nos(report, AMOUNT_MISMATCH) == ["CZ2"]
+    assert order_nos(report, STATUS_DIVERGED) == ["CZ2", "CZ3"]
+    assert report.matched == 2
+    assert report.discrepancies == 3
+
+
+def test_unparseable_amount_is_mismatch():
+    report = merge_join(records(("CZ1", "10")), records(("CZ1", "ten")), ReconcileReport())
+
+    assert report.counts[AMOUNT_MISMATCH] == 1
+
+
+# ============== 排序 ==============
+def test_external_sort_merges_runs(tmp_path):
+    unsorted = records(*((f"CZ{n:03d}", str(n)) for n in (5, 3, 9, 1, 7, 2, 8, 4, 6, 0)))
+
+    result = list(external_sort(unsorted, chunk_size=3, tmp_dir=str(tmp_path)))
+
+    assert [r.merchant_order_no for r in result] == [f"CZ{n:03d}" for n in range(10)]
+    assert [r.amount for r in result] == [str(n) for n in range(10)]
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_ensure_sorted_rejects_out_of_order_input():
+    with pytest.raises(ValueError):
+        list(ensure_sorted(records(("CZ2",), ("CZ1",)), "statement.csv"))
+
+
+def test_reconcile_statement_with_unsorted_csv(tmp_path):
+    ledger = OrderLedger(str(tmp_path / "orders.db"))
+    for order_no, amount, status in [("CZ1", "10", "1"), ("CZ2", "20", "1"), ("CZ3", "30", "0")]:
+        ledger.record_order("collection", order_no, amount=amount, status=status,
+                            submit_time="20260211120000")
+    ledger.flush()
+
+    statement = tmp_path / "statement.csv"
+    statement.write_text(
+        "merchantOrderNo,amount,status,submitTime\n"
+        "CZ4,40,1,20260211120000\n"
+        "CZ2,20,1,20260211120000\n"
+        "CZ1,10,1,20260211120000\n"
+        "CZ2,20,1,20260211120000\n",
+        encoding="utf-8"
+    )
+
+    try:
+        summary = reconcile_statement(ledger, str(statement), chunk_size=2)
+    finally:
+        ledger.close()
+
+    assert summary["matched"] == 2
+    assert summary["counts"] == {MISSING_REMOTE: 1, MISSING_LOCAL: 1, DUPLICATE_REMOTE: 1}
+    assert (summary["local_total"], summary["remote_total"]) == (3, 4)
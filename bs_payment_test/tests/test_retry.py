@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+BS支付系统 - 下单重试测试
+用桩传输层模拟网关，验证下单结果未知时走查询确认，而不是返回普通失败
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import bs_api_client
+from bs_api_client import CONFIG, BSClient
+from retry import INVALID, reset_retry_policies
+
+CREATE = "/api/coin/payOrder/create"
+QUERY = "/api/coin/payOrder/query"
+
+WAF_PAGE = b"<html><body>502 Bad Gateway</body></html>"
+
+
+class StubResponse:
+    def __init__(self, status_code: int, content: bytes):
+        self.status_code = status_code
+        self.content = content
+
+
+class StubTransport:
+    """按端点依次返回预设响应，并记录调用顺序"""
+
+    def __init__(self, responses: dict):
+        self.responses = {endpoint: list(items) for endpoint, items in responses.items()}
+        self.calls = []
+
+    def post(self, url, body, endpoint):
+        self.calls.append(endpoint)
+        return self.responses[endpoint].pop(0)
+
+
+@pytest.fixture
+def client(monkeypatch):
+    CONFIG["logging"]["level"] = "OFF"
+    reset_retry_policies()
+    monkeypatch.setattr(bs_api_client.time, "sleep", lambda seconds: None)
+    client = BSClient("mock", verbose=False)
+    yield client
+    reset_retry_policies()
+
+
+def test_invalid_create_response_is_ambiguous(client):
+    assert client.retry_policy.is_ambiguous(INVALID)
+    assert client.retry_policy.should_retry(CREATE, 1, INVALID)
+    assert not client.retry_policy.should_retry(QUERY, 1, INVALID)
+
+
+def test_unparseable_create_response_confirms_by_query(client):
+    order = b'{"code":"0","msg":"ok","data":{"merchantOrderNo":"CZ1","status":"0"}}'
+    client.transport = StubTransport({
+        CREATE: [StubResponse(200, WAF_PAGE)],
+        QUERY: [StubResponse(200, order)]
+    })
+
+    result = client.create_collection_order("10", "USDT_TRC20", "USDT", merchant_order_no="CZ1")
+
+    assert result["code"] == "0"
+    assert result["data"]["merchantOrderNo"] == "CZ1"
+    assert client.transport.calls == [CREATE, QUERY]
+
+
+def test_unparseable_create_response_resubmits_when_missing(client):
+    created = b'{"code":"0","msg":"ok","data":{"merchantOrderNo":"CZ2"}}'
+    client.transport = StubTransport({
+        CREATE: [StubResponse(403, WAF_PAGE), StubResponse(200, created)],
+        QUERY: [StubResponse(200, b'{"code":"5","msg":"not found"}')]
+    })
+
+    result = client.create_collection_order("10", "USDT_TRC20", "USDT", merchant_order_no="CZ2")
+
+    assert result["code"] == "0"
+    assert client.transport.calls == [CREATE, QUERY, CREATE]
+
+
+def test_unparseable_create_response_without_retry_is_unknown(client):
+    client.retry_policy.max_attempts = 1
+    client.transport = StubTransport({CREATE: [StubResponse(200, WAF_PAGE)]})
+
+    result = client.create_collection_order("10", "USDT_TRC20", "USDT", merchant_order_no="CZ3")
+
+    assert result["code"] == -1
+    assert "状态未知" in result["msg"]
+    assert client.transport.calls == [CREATE]
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+BS支付系统 - HTTP传输层
+
+功能:
+1. 按主机维护连接池（HTTP keep-alive，复用TCP+TLS连接）
+2. 连接池大小可配置
+3. 按端点配置超时
+4. 进程内所有BSClient共享同一传输层
+5. 统计连接池命中/未命中次数
+
+作者: OpenClaw
+日期: 2026-02-11
+"""
+
+import threading
+from typing import Dict, Optional, Tuple, Union
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# 超时: 秒数，或 (连接超时, 读取超时)
+Timeout = Union[float, Tuple[float, float]]
+
+
+class HTTPTransport:
+    """带连接池的HTTP传输层"""
+
+    def __init__(
+        self,
+        pool_connections: int = 10,
+        pool_maxsize: int = 50,
+        default_timeout: Timeout = 30,
+        endpoint_timeouts: Optional[Dict[str, Timeout]] = None
+    ):
+        """
+        初始化传输层
+
+        Args:
+            pool_connections: 缓存的主机连接池数量
+            pool_maxsize: 每个主机连接池的最大连接数
+            default_timeout: 默认超时
+            endpoint_timeouts: 按端点配置的超时，如 {"/api/coin/payOrder/query": 10}
+        """
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.default_timeout = default_timeout
+        self.endpoint_timeouts = dict(endpoint_timeouts or {})
+
+        self._adapter = HTTPAdapter(
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+            pool_block=False
+        )
+        self.session = requests.Session()
+        self.session.mount("https://", self._adapter)
+        self.session.mount("http://", self._adapter)
+        self.session.headers.update({
+            "Content-Type": "application/json",
+            "Accept": "application/json",
+            "Connection": "keep-alive"
+        })
+
+    def get_timeout(self, endpoint: str) -> Timeout:
+        """获取端点超时"""
+        return self.endpoint_timeouts.get(endpoint, self.default_timeout)
+
+    def set_timeout(self, endpoint: str, timeout: Timeout):
+        """设置端点超时"""
+        self.endpoint_timeouts[endpoint] = timeout
+
+    def post(self, url: str, body: Union[bytes, str], endpoint: str = "") -> requests.Response:
+        """
+        发送POST请求
+
+        Args:
+            url: 完整URL
+            body: 已序列化的请求体（见 serializer.dumps）
+            endpoint: API端点（用于查找超时）
+
+        Returns:
+            响应对象
+        """
+        return self.session.post(url, data=body, timeout=self.get_timeout(endpoint))
+
+    def pool_stats(self) -> Dict[str, Dict[str, int]]:
+        """
+        连接池统计
+
+        hits: 复用已有连接的请求数
+        misses: 新建连接的次数（每次都需TCP+TLS握手）
+
+        Returns:
+            {主机: {"requests", "hits", "misses"}}
+        """
+        stats = {}
+        pools = self._adapter.poolmanager.pools
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            host = f"{key.key_scheme}://{key.key_host}:{key.key_port}"
+            misses = pool.num_connections
+            stats[host] = {
+                "requests": pool.num_requests,
+                "hits": max(pool.num_requests - misses, 0),
+                "misses": misses
+            }
+        return stats
+
+    def host_stats(self, url: str) -> Dict[str, int]:
+        """单个主机的连接池统计"""
+        parts = urlsplit(url)
+        port = parts.port or (443 if parts.scheme == "https" else 80)
+        host = f"{parts.scheme}://{parts.hostname}:{port}"
+        return self.pool_stats().get(host, {"requests": 0, "hits": 0, "misses": 0})
+
+    def close(self):
+        """关闭所有连接"""
+        self.session.close()
+
+
+# ============== 进程级共享实例 ==============
+_shared_transport: Optional[HTTPTransport] = None
+_shared_lock = threading.Lock()
+
+
+def get_transport(**kwargs) -> HTTPTransport:
+    """
+    获取进程内共享的传输层（首次调用时按参数创建）
+
+    Args:
+        **kwargs: HTTPTransport初始化参数，仅首次调用生效
+
+    Returns:
+        共享的HTTPTransport实例
+    """
+    global _shared_transport
+    if _shared_transport is None:
+        with _shared_lock:
+            if _shared_transport is None:
+                _shared_transport = HTTPTransport(**kwargs)
+    return _shared_transport
+
+
+def reset_transport():
+    """关闭并丢弃共享传输层（下次get_transport时重建）"""
+    global _shared_transport
+    with _shared_lock:
+        if _shared_transport is not None:
+            _shared_transport.close()
+        _shared_transport = None
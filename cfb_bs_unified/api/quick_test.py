@@ -5,20 +5,13 @@ BS API 快速测试
 """
 import sys
 import json
-import hashlib
 import requests
 from datetime import datetime
 sys.path.insert(0, '.')
 
 from config import CONFIG
-
-def md5_sign(params, secret_key):
-    """MD5签名"""
-    filtered = {k: v for k, v in params.items() if v}
-    sorted_keys = sorted(filtered.keys())
-    sign_str = '&'.join([f'{k}={filtered[k]}' for k in sorted_keys])
-    sign_str = f'{sign_str}&key={secret_key}'
-    return hashlib.md5(sign_str.encode()).hexdigest()
+# 签名串构建: 与 bs_payment_test/sign_string.py 保持一致的副本
+from sign_string import md5_sign
 
 def test_balance():
     """余额查询"""
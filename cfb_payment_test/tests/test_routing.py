@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+CFB支付系统 - 请求路由测试
+功能: 每个操作使用其所属系统的Session和URL（管理后台接口不会走商户后台的Session），
+      未登录响应（HTTP 401或响应体未登录码）时重新认证并重试一次
+"""
+
+import sys
+import inspect
+from pathlib import Path
+
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parents[1] / "utils"))
+
+from api import APIClient
+from auth import is_unauthenticated
+from endpoints import ENDPOINTS
+
+CONFIG = {
+    "systems": {
+        "admin": {"url": "https://admin.example.test"},
+        "agent": {"url": "https://agent.example.test"},
+        "merch": {"url": "https://merch.example.test"}
+    }
+}
+
+
+# 各操作的 (系统, 路径)，按重构前 api.py 中的URL逐条固定，不从 ENDPOINTS 推导
+EXPECTED_ROUTES = {
+    "create_merchant": ("admin", "/api/merchant/create"),
+    "query_merchant_list": ("admin", "/api/merchant/list"),
+    "get_merchant_status": ("admin", "/api/merchant/status"),
+    "approve_merchant": ("admin", "/api/merchant/approve"),
+    "freeze_merchant": ("admin", "/api/merchant/freeze"),
+    "unfreeze_merchant": ("admin", "/api/merchant/unfreeze"),
+    "update_merchant_config": ("merch", "/api/merchant/config"),
+    "query_available_channels": ("merch", "/api/channel/list"),
+    "bind_channel": ("merch", "/api/channel/bind"),
+    "query_channel_config": ("admin", "/api/channel/config"),
+    "update_channel_config": ("admin", "/api/channel/config"),
+    "create_collection_order": ("merch", "/api/order/collection/create"),
+    "query_collection_order": ("merch", "/api/order/collection/query"),
+    "create_payment_order": ("merch", "/api/order/payment/create"),
+    "query_payment_order": ("merch", "/api/order/payment/query"),
+    "create_refund_order": ("merch", "/api/order/refund/create"),
+    "query_refund_order": ("merch", "/api/order/refund/query"),
+    "create_replenish_order": ("admin", "/api/order/replenish/create"),
+    "query_replenish_order": ("admin", "/api/order/replenish/query"),
+    "adjust_limit": ("admin", "/api/merchant/limit/adjust"),
+    "query_limit": ("merch", "/api/merchant/limit/query"),
+    "merchant_transfer": ("admin", "/api/transfer/merchant"),
+    "manual_collection": ("merch", "/api/collection/manual"),
+    "auto_collection_status": ("merch", "/api/collection/auto/status"),
+    "get_balance": ("merch", "/api/account/balance"),
+    "get_transaction_history": ("merch", "/api/account/history")
+}
+
+
+class StubResponse:
+    def __init__(self, status_code: int = 200, body: dict = None):
+        self.status_code = status_code
+        self.body = {"code": "0"} if body is None else body
+
+    def json(self):
+        return self.body
+
+
+class StubSession:
+    """记录发出的请求，按顺序返回预设响应（用完后返回成功）"""
+
+    def __init__(self, system: str):
+        self.system = system
+        self.sent = []
+        self.responses = []
+
+    def post(self, url, json=None, timeout=None):
+        self.sent.append(url)
+        return self.responses.pop(0) if self.responses else StubResponse()
+
+    def get(self, url, params=None, timeout=None):
+        return self.post(url)
+
+
+class StubAuth:
+    """每个系统一个Session，记录认证请求的系统"""
+
+    def __init__(self):
+        self.sessions = {system: StubSession(system) for system in CONFIG["systems"]}
+        self.authenticated = []
+        self.invalidated = []
+
+    def get_authenticated_session(self, system):
+        self.authenticated.append(system)
+        return self.sessions[system]
+
+    def session_for(self, system):
+        return self.sessions[system]
+
+    def needs_login(self, status_code, result):
+        return is_unauthenticated(status_code, result)
+
+    def invalidate(self, system, since=None):
+        self.invalidated.append(system)
+
+
+def call_operation(api: APIClient, operation: str):
+    """调用业务方法，必填参数（session之后）填占位值"""
+    method = getattr(api, operation)
+    required = [p for p in list(inspect.signature(method).parameters.values())[1:]
+                if p.default is inspect.Parameter.empty]
+    return method(None, *({} for _ in required))
+
+
+def test_every_endpoint_is_pinned():
+    assert set(ENDPOINTS) == set(EXPECTED_ROUTES)
+
+
+@pytest.mark.parametrize("operation,expected", sorted(EXPECTED_ROUTES.items()))
+def test_operation_uses_its_system_session(operation, expected):
+    system, path = expected
+    auth = StubAuth()
+    api = APIClient(CONFIG, auth)
+
+    call_operation(api, operation)
+
+    assert auth.authenticated == [system]
+    sent = [(name, url) for name, session in auth.sessions.items() for url in session.sent]
+    assert sent == [(system, CONFIG["systems"][system]["url"] + path)]
+
+
+def test_admin_operations_do_not_use_merchant_session():
+    auth = StubAuth()
+    api = APIClient(CONFIG, auth)
+
+    api.approve_merchant(None, "M001")
+    api.create_replenish_order(None, {})
+    api.adjust_limit(None, {})
+
+    assert auth.authenticated == ["admin", "admin", "admin"]
+    assert auth.sessions["merch"].sent == []
+
+
+@pytest.mark.parametrize("response", [
+    StubResponse(401, {"msg": "Unauthorized"}),
+    StubResponse(200, {"code": 401, "msg": "未登录"})
+])
+def test_not_logged_in_response_reauthenticates_and_retries(response):
+    auth = StubAuth()
+    auth.sessions["admin"].responses = [response]
+    api = APIClient(CONFIG, auth)
+
+    result = api.approve_merchant(None, "M001")
+
+    assert result == {"code": "0"}
+    assert auth.invalidated == ["admin"]
+    assert auth.authenticated == ["admin", "admin"]
+    assert len(auth.sessions["admin"].sent) == 2
+
+
+def test_business_error_is_not_retried():
+    auth = StubAuth()
+    auth.sessions["merch"].responses = [StubResponse(200, {"code": "500", "msg": "系统繁忙"})]
+    api = APIClient(CONFIG, auth)
+
+    result = api.get_balance(None)
+
+    assert result["code"] == "500"
+    assert auth.invalidated == []
+    assert len(auth.sessions["merch"].sent) == 1
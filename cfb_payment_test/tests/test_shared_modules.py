@@ -0,0 +1,22 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+CFB支付系统 - 共享模块一致性测试
+功能: utils 中的密钥注册表、签名串构建、批量签名是 bs_payment_test 同名模块的副本，
+      两个项目独立运行，修改任一份时需同步另一份（检出中没有 bs_payment_test 时跳过）
+"""
+
+from pathlib import Path
+
+import pytest
+
+UTILS = Path(__file__).resolve().parents[1] / "utils"
+BS_PROJECT = Path(__file__).resolve().parents[2] / "bs_payment_test"
+
+
+@pytest.mark.parametrize("name", ["keystore.py", "sign_string.py", "batch_sign.py"])
+def test_shared_module_matches_bs_copy(name):
+    upstream = BS_PROJECT / name
+    if not upstream.exists():
+        pytest.skip("未检出 bs_payment_test")
+    assert (UTILS / name).read_text(encoding="utf-8") == upstream.read_text(encoding="utf-8")
@@ -10,6 +10,8 @@ import time
 import requests
 from typing import Optional, Dict, List
 
+from endpoints import Route, build_routes, describe
+
 
 class APIClient:
     """API客户端"""
@@ -18,209 +20,209 @@ class APIClient:
         """
         初始化API客户端
         
+        Session由认证管理器按系统统一管理（各自连接池和Cookie），多线程可共用同一个APIClient；
+        路由表（endpoints.py）在此解析一次，调用时按操作名查表
+        
         Args:
             config: 配置字典
             auth_manager: 认证管理器
         """
         self.config = config
         self.auth = auth_manager
-        self.session = requests.Session()
+        self.routes: Dict[str, Route] = build_routes(config)
+    
+    def endpoints(self) -> List[Dict]:
+        """全部端点（操作名、系统、方法、URL、幂等类别、超时）"""
+        return describe(self.routes)
     
     def _request(self, 
-                 method: str, 
-                 endpoint: str, 
+                 operation: str, 
                  data: Dict = None,
                  use_auth: bool = True) -> Dict:
         """
         发起API请求
         
         Args:
-            method: 请求方法
-            endpoint: API端点
+            operation: 操作名（见 endpoints.ENDPOINTS）
             data: 请求数据
             use_auth: 是否使用认证
             
         Returns:
             dict: 响应结果
         """
-        url = endpoint
+        route = self.routes[operation]
+        system = route.system
         
-        # 如果需要认证，获取已认证的Session
+        # 如果需要认证，获取已认证的Session（AuthManager缓存验证状态，稳态下不额外请求）
         if use_auth:
-            # 根据endpoint判断使用哪个系统
-            if "/admin/" in endpoint:
-                self.session = self.auth.get_authenticated_session("admin")
-            elif "/agent/" in endpoint:
-                self.session = self.auth.get_authenticated_session("agent")
-            else:
-                self.session = self.auth.get_authenticated_session("merch")
-            
-            if not self.session:
+            session = self.auth.get_authenticated_session(system)
+            if not session:
                 return {"success": False, "error": "认证失败"}
+        else:
+            session = self.auth.session_for(system)
         
         try:
-            if method.upper() == "GET":
-                response = self.session.get(url, params=data, timeout=30)
-            else:
-                response = self.session.post(url, json=data, timeout=30)
+            sent_at = time.time()
+            response = self._send(session, route, data)
+            result = self._decode(response)
             
-            return response.json()
+            # 401或未登录响应码: Session已失效，标记失效后重新认证并重试一次
+            if use_auth and self.auth.needs_login(response.status_code, result):
+                self.auth.invalidate(system, since=sent_at)
+                session = self.auth.get_authenticated_session(system)
+                if not session:
+                    return {"success": False, "error": "认证失败"}
+                response = self._send(session, route, data)
+                result = self._decode(response)
+            
+            if result is None:
+                return {"success": False, "error": f"响应不是JSON（HTTP {response.status_code}）"}
+            return result
             
         except Exception as e:
             return {"success": False, "error": str(e)}
     
+    @staticmethod
+    def _decode(response: requests.Response) -> Optional[Dict]:
+        """解析响应JSON（非JSON返回None）"""
+        try:
+            return response.json()
+        except ValueError:
+            return None
+    
+    @staticmethod
+    def _send(session: requests.Session, route: Route, data: Dict = None) -> requests.Response:
+        """发送一次请求"""
+        if route.method == "GET":
+            return session.get(route.url, params=data, timeout=route.timeout)
+        return session.post(route.url, json=data, timeout=route.timeout)
+    
     # ============== 商户管理API ==============
     
     def create_merchant(self, session, data: Dict) -> Dict:
         """创建商户"""
         # TODO: 根据实际接口修改
-        endpoint = f"{self.config['systems']['admin']['url']}/api/merchant/create"
-        return self._request("POST", endpoint, data)
+        return self._request("create_merchant", data)
     
     def query_merchant_list(self, session, params: Dict = None) -> List:
         """查询商户列表"""
-        endpoint = f"{self.config['systems']['admin']['url']}/api/merchant/list"
-        return self._request("POST", endpoint, params)
+        return self._request("query_merchant_list", params)
     
     def get_merchant_status(self, session, merchant_no: str) -> Dict:
         """查询商户状态"""
-        endpoint = f"{self.config['systems']['admin']['url']}/api/merchant/status"
-        return self._request("POST", endpoint, {"merchantNo": merchant_no})
+        return self._request("get_merchant_status", {"merchantNo": merchant_no})
     
     def approve_merchant(self, session, merchant_no: str) -> Dict:
         """审核商户"""
-        endpoint = f"{self.config['systems']['admin']['url']}/api/merchant/approve"
-        return self._request("POST", endpoint, {"merchantNo": merchant_no, "action": "APPROVE"})
+        return self._request("approve_merchant", {"merchantNo": merchant_no, "action": "APPROVE"})
     
     def freeze_merchant(self, session, merchant_no: str) -> Dict:
         """冻结商户"""
-        endpoint = f"{self.config['systems']['admin']['url']}/api/merchant/freeze"
-        return self._request("POST", endpoint, {"merchantNo": merchant_no})
+        return self._request("freeze_merchant", {"merchantNo": merchant_no})
     
     def unfreeze_merchant(self, session, merchant_no: str) -> Dict:
         """解冻商户"""
-        endpoint = f"{self.config['systems']['admin']['url']}/api/merchant/unfreeze"
-        return self._request("POST", endpoint, {"merchantNo": merchant_no})
+        return self._request("unfreeze_merchant", {"merchantNo": merchant_no})
     
     def update_merchant_config(self, session, config: Dict) -> Dict:
         """更新商户配置"""
-        endpoint = f"{self.config['systems']['merch']['url']}/api/merchant/config"
-        return self._request("POST", endpoint, config)
+        return self._request("update_merchant_config", config)
     
     # ============== 通道管理API ==============
     
     def query_available_channels(self, session) -> List:
         """查询可用通道"""
-        endpoint = f"{self.config['systems']['merch']['url']}/api/channel/list"
-        return self._request("POST", endpoint, {})
+        return self._request("query_available_channels", {})
     
     def bind_channel(self, session, channel_id: str) -> Dict:
         """绑定通道"""
-        endpoint = f"{self.config['systems']['merch']['url']}/api/channel/bind"
-        return self._request("POST", endpoint, {"channelId": channel_id})
+        return self._request("bind_channel", {"channelId": channel_id})
     
     def query_channel_config(self, session) -> List:
         """查询通道配置"""
-        endpoint = f"{self.config['systems']['admin']['url']}/api/channel/config"
-        return self._request("POST", endpoint, {})
+        return self._request("query_channel_config", {})
     
     def update_channel_config(self, session, config: Dict) -> Dict:
         """更新通道配置"""
-        endpoint = f"{self.config['systems']['admin']['url']}/api/channel/config"
-        return self._request("POST", endpoint, config)
+        return self._request("update_channel_config", config)
     
     # ============== 交易API - 代收 ==============
     
     def create_collection_order(self, session, data: Dict) -> Dict:
         """创建代收订单"""
-        endpoint = f"{self.config['systems']['merch']['url']}/api/order/collection/create"
-        return self._request("POST", endpoint, data)
+        return self._request("create_collection_order", data)
     
     def query_collection_order(self, session, order_no: str) -> Dict:
         """查询代收订单"""
-        endpoint = f"{self.config['systems']['merch']['url']}/api/order/collection/query"
-        return self._request("POST", endpoint, {"orderNo": order_no})
+        return self._request("query_collection_order", {"orderNo": order_no})
     
     # ============== 交易API - 代付 ==============
     
     def create_payment_order(self, session, data: Dict) -> Dict:
         """创建代付订单"""
-        endpoint = f"{self.config['systems']['merch']['url']}/api/order/payment/create"
-        return self._request("POST", endpoint, data)
+        return self._request("create_payment_order", data)
     
     def query_payment_order(self, session, order_no: str) -> Dict:
         """查询代付订单"""
-        endpoint = f"{self.config['systems']['merch']['url']}/api/order/payment/query"
-        return self._request("POST", endpoint, {"orderNo": order_no})
+        return self._request("query_payment_order", {"orderNo": order_no})
     
     # ============== 退款API ==============
     
     def create_refund_order(self, session, data: Dict) -> Dict:
         """创建退款订单"""
-        endpoint = f"{self.config['systems']['merch']['url']}/api/order/refund/create"
-        return self._request("POST", endpoint, data)
+        return self._request("create_refund_order", data)
     
     def query_refund_order(self, session, order_no: str) -> Dict:
         """查询退款订单"""
-        endpoint = f"{self.config['systems']['merch']['url']}/api/order/refund/query"
-        return self._request("POST", endpoint, {"orderNo": order_no})
+        return self._request("query_refund_order", {"orderNo": order_no})
     
     # ============== 补单API ==============
     
     def create_replenish_order(self, session, data: Dict) -> Dict:
         """创建补单"""
-        endpoint = f"{self.config['systems']['admin']['url']}/api/order/replenish/create"
-        return self._request("POST", endpoint, data)
+        return self._request("create_replenish_order", data)
     
     def query_replenish_order(self, session, order_no: str) -> Dict:
         """查询补单"""
-        endpoint = f"{self.config['systems']['admin']['url']}/api/order/replenish/query"
-        return self._request("POST", endpoint, {"orderNo": order_no})
+        return self._request("query_replenish_order", {"orderNo": order_no})
     
     # ============== 调额API ==============
     
     def adjust_limit(self, session, data: Dict) -> Dict:
         """调整限额"""
-        endpoint = f"{self.config['systems']['admin']['url']}/api/merchant/limit/adjust"
-        return self._request("POST", endpoint, data)
+        return self._request("adjust_limit", data)
     
     def query_limit(self, session, merchant_no: str = None) -> Dict:
         """查询限额"""
-        endpoint = f"{self.config['systems']['merch']['url']}/api/merchant/limit/query"
         params = {"merchantNo": merchant_no} if merchant_no else {}
-        return self._request("POST", endpoint, params)
+        return self._request("query_limit", params)
     
     # ============== 转账API ==============
     
     def merchant_transfer(self, session, data: Dict) -> Dict:
         """商户间转账"""
-        endpoint = f"{self.config['systems']['admin']['url']}/api/transfer/merchant"
-        return self._request("POST", endpoint, data)
+        return self._request("merchant_transfer", data)
     
     # ============== 归集API ==============
     
     def manual_collection(self, session, data: Dict) -> Dict:
         """手动归集"""
-        endpoint = f"{self.config['systems']['merch']['url']}/api/collection/manual"
-        return self._request("POST", endpoint, data)
+        return self._request("manual_collection", data)
     
     def auto_collection_status(self, session) -> Dict:
         """查询自动归集状态"""
-        endpoint = f"{self.config['systems']['merch']['url']}/api/collection/auto/status"
-        return self._request("POST", endpoint, {})
+        return self._request("auto_collection_status", {})
     
     # ============== 账户API ==============
     
     def get_balance(self, session, coin_type: str = None) -> Dict:
         """查询余额"""
-        endpoint = f"{self.config['systems']['merch']['url']}/api/account/balance"
         params = {"coinType": coin_type} if coin_type else {}
-        return self._request("POST", endpoint, params)
+        return self._request("get_balance", params)
     
     def get_transaction_history(self, session, params: Dict = None) -> List:
         """查询交易历史"""
-        endpoint = f"{self.config['systems']['merch']['url']}/api/account/history"
-        return self._request("POST", endpoint, params or {})
+        return self._request("get_transaction_history", params or {})
 
 
 # ============== 便捷函数 ==============
@@ -256,6 +258,6 @@ if __name__ == "__main__":
     print("✅ API客户端初始化成功")
     
     print("\n可用的API方法:")
-    methods = [method for method in dir(api) if not method.startswith('_')]
-    for method in methods:
-        print(f"  - {method}")
+    for route in api.routes.values():
+        print(f"  - {route.name:<26} {route.system:<6} {route.method:<5} {route.idempotency:<15} "
+              f"{route.timeout:>4}s  {route.path}")
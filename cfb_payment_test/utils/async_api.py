@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+CFB支付系统 - 异步API客户端
+基于 asyncio + aiohttp，业务方法与 APIClient 一一对应
+
+功能:
+1. 继承APIClient，所有业务方法（商户、通道、代收、代付、退款、补单、调额、转账、归集、账户）
+   参数不变，返回可await的协程
+2. 认证复用 AuthManager: 验证状态有效时不额外请求；需要登录/验证时在线程中执行，
+   并把Cookie同步到该系统的aiohttp会话（每个系统独立的连接池和Cookie）
+3. 信号量限制并发（同时也是每个系统的连接上限）
+4. 批量调用: 结果按提交顺序返回，附带单次调用耗时
+
+使用示例:
+    async with AsyncAPIClient(CONFIG, auth, concurrency=64) as api:
+        order = await api.query_collection_order(None, "C123")
+
+        specs = [{"method": "approve_merchant", "params": {"session": None, "merchant_no": no}}
+                 for no in merchant_nos]
+        results = await api.submit_many(specs)
+"""
+
+import time
+import asyncio
+from typing import Dict, List, Optional
+
+import aiohttp
+from yarl import URL
+
+from api import APIClient
+from endpoints import Route
+
+
+class AsyncAPIClient(APIClient):
+    """
+    异步API客户端
+
+    仅将 _request 替换为协程，因此 create_merchant / query_payment_order 等所有业务方法
+    在本类中都返回可await的协程，参数与APIClient完全相同。
+    """
+
+    def __init__(self, config: dict, auth_manager, concurrency: int = 64):
+        """
+        初始化异步API客户端
+
+        Args:
+            config: 配置字典
+            auth_manager: 认证管理器（可与同步APIClient共用）
+            concurrency: 最大并发请求数，同时也是每个系统的连接上限
+        """
+        super().__init__(config, auth_manager)
+        self.concurrency = concurrency
+        self._timeouts: Dict[float, aiohttp.ClientTimeout] = {}   # 端点超时（秒） -> aiohttp超时
+        self._sessions: Dict[str, aiohttp.ClientSession] = {}
+        self._synced = set()        # Cookie已同步到aiohttp会话的系统
+        self._auth_locks: Dict[str, asyncio.Lock] = {}
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    def _get_session(self, system: str) -> aiohttp.ClientSession:
+        """获取系统的aiohttp会话（需在事件循环内首次调用）"""
+        session = self._sessions.get(system)
+        if session is None or session.closed:
+            connector = aiohttp.TCPConnector(limit=self.concurrency, keepalive_timeout=30)
+            session = self._sessions[system] = aiohttp.ClientSession(
+                connector=connector,
+                # 测试环境可能通过IP访问，允许IP主机的Cookie
+                cookie_jar=aiohttp.CookieJar(unsafe=True)
+            )
+            self._synced.discard(system)
+        return session
+
+    async def _authenticate(self, system: str) -> bool:
+        """
+        确保系统已认证，并把Cookie同步到aiohttp会话
+
+        验证状态有效且已同步时直接返回；否则同一系统只有一个协程在线程中登录/验证。
+        """
+        if system in self._synced and self.auth.is_valid(system):
+            return True
+
+        lock = self._auth_locks.setdefault(system, asyncio.Lock())
+        async with lock:
+            if system in self._synced and self.auth.is_valid(system):
+                return True
+            session = await asyncio.to_thread(self.auth.get_authenticated_session, system)
+            if not session:
+                return False
+            jar = self._get_session(system).cookie_jar
+            jar.clear()
+            jar.update_cookies(session.cookies.get_dict(),
+                               response_url=URL(self.config["systems"][system]["url"]))
+            self._synced.add(system)
+            return True
+
+    async def _request(self,
+                       operation: str,
+                       data: Dict = None,
+                       use_auth: bool = True) -> Dict:
+        """
+        发起API请求（异步，401或未登录响应码时重新认证并重试一次，与APIClient._request相同）
+
+        Args:
+            operation: 操作名（见 endpoints.ENDPOINTS）
+            data: 请求数据
+            use_auth: 是否使用认证
+
+        Returns:
+            dict: 响应结果
+        """
+        route = self.routes[operation]
+        system = route.system
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+
+        async with self._semaphore:
+            if use_auth and not await self._authenticate(system):
+                return {"success": False, "error": "认证失败"}
+
+            try:
+                sent_at = time.time()
+                status, result = await self._send_async(route, data)
+
+                if use_auth and self.auth.needs_login(status, result):
+                    self.auth.invalidate(system, since=sent_at)
+                    self._synced.discard(system)
+                    if not await self._authenticate(system):
+                        return {"success": False, "error": "认证失败"}
+                    status, result = await self._send_async(route, data)
+
+                if result is None:
+                    return {"success": False, "error": f"响应不是JSON（HTTP {status}）"}
+                return result
+
+            except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+                return {"success": False, "error": str(e) or type(e).__name__}
+
+    async def _send_async(self, route: Route, data: Dict = None) -> tuple:
+        """
+        发送一次请求
+
+        Returns:
+            (HTTP状态码, 响应结果)，响应不是JSON时结果为None
+        """
+        session = self._get_session(route.system)
+        timeout = self._timeouts.get(route.timeout)
+        if timeout is None:
+            timeout = self._timeouts[route.timeout] = aiohttp.ClientTimeout(total=route.timeout)
+        if route.method == "GET":
+            request = session.get(route.url, params=data, timeout=timeout)
+        else:
+            request = session.post(route.url, json=data, timeout=timeout)
+        async with request as response:
+            try:
+                return response.status, await response.json(content_type=None)
+            except ValueError:
+                return response.status, None
+
+    async def close(self):
+        """关闭所有会话"""
+        for session in self._sessions.values():
+            if not session.closed:
+                await session.close()
+        self._sessions.clear()
+        self._synced.clear()
+
+    # ============== 批量调用 ==============
+    async def submit_many(self, specs: List[Dict]) -> List[Dict]:
+        """
+        批量并发调用（并发数受初始化时的concurrency限制）
+
+        Args:
+            specs: 调用列表，每项为 {"method": 方法名, "params": 关键字参数}
+                   方法名为APIClient的任意业务方法，如 approve_merchant
+
+        Returns:
+            按提交顺序排列的结果列表，每项为:
+            {"index", "method", "result", "latency_ms", "error"}
+        """
+        async def run_one(index: int, spec: Dict) -> Dict:
+            method_name = spec["method"]
+            start = time.perf_counter()
+            try:
+                result = await getattr(self, method_name)(**spec.get("params", {}))
+                error = None
+            except Exception as e:
+                result = None
+                error = f"{type(e).__name__}: {e}"
+            return {
+                "index": index,
+                "method": method_name,
+                "result": result,
+                "latency_ms": (time.perf_counter() - start) * 1000,
+                "error": error
+            }
+
+        # gather 保证结果顺序与提交顺序一致
+        return await asyncio.gather(*(run_one(i, spec) for i, spec in enumerate(specs)))
+
+
+# ============== 便捷函数 ==============
+def run_many(config: dict, auth_manager, specs: List[Dict], concurrency: int = 64) -> List[Dict]:
+    """
+    同步入口: 创建异步客户端并批量调用
+
+    Args:
+        config: 配置字典
+        auth_manager: 认证管理器
+        specs: 调用列表（格式同 AsyncAPIClient.submit_many）
+        concurrency: 最大并发数
+
+    Returns:
+        按提交顺序排列的结果列表
+    """
+    async def _run():
+        async with AsyncAPIClient(config, auth_manager, concurrency=concurrency) as api:
+            return await api.submit_many(specs)
+
+    return asyncio.run(_run())
+
+
+if __name__ == "__main__":
+    # 批量查询代收订单，观察并发耗时
+    import argparse
+    import os
+    import sys
+
+    parser = argparse.ArgumentParser(description="CFB支付系统 - 异步批量调用")
+    parser.add_argument("--config", default="./config/config.js", help="配置文件路径")
+    parser.add_argument("--orders", nargs="+", required=True, help="代收订单号")
+    parser.add_argument("--concurrency", "-c", type=int, default=64, help="并发数")
+    args = parser.parse_args()
+
+    sys.path.insert(0, os.path.dirname(args.config))
+    from config import CONFIG
+    from auth import create_auth_manager
+
+    specs = [{"method": "query_collection_order", "params": {"session": None, "order_no": no}}
+             for no in args.orders]
+
+    start = time.perf_counter()
+    results = run_many(CONFIG, create_auth_manager(args.config), specs, args.concurrency)
+    elapsed = time.perf_counter() - start
+
+    ok = sum(1 for r in results if r["result"] and r["result"].get("code") == "0")
+    print("\n" + "=" * 60)
+    print(f"📊 {len(specs)} 次调用，并发 {args.concurrency}")
+    print(f"   成功: {ok}")
+    print(f"   总耗时: {elapsed:.2f}s（{len(specs) / elapsed:.1f} 次/秒）")
@@ -7,33 +7,148 @@ CFB支付系统 - 认证模块
 功能:
 1. 登录获取Cookie
 2. Cookie管理（保存/加载）
-3. Token刷新
+3. Session缓存（按系统记录验证状态，验证间隔内不读文件、不请求验证接口）
+4. 按系统的Session池（各自的连接池和Cookie，多线程共用）
+5. Token刷新（提前后台刷新，并发调用合并为一次刷新）
 """
 
 import json
 import os
 import time
+import threading
 import requests
+from requests.adapters import HTTPAdapter
 from typing import Optional, Dict
 
+# Cookie有效期（秒），与Cookie文件的过期判断一致
+COOKIE_MAX_AGE = 24 * 3600
+
+# 默认验证间隔（秒）: 上次验证/登录后多久内直接复用Session
+DEFAULT_VERIFY_INTERVAL = 300
+
+# 表示未登录/Session失效的响应体code（网关对未登录请求可能返回HTTP 200），
+# 可在 config["auth"]["unauthenticated_codes"] 中覆盖
+DEFAULT_UNAUTHENTICATED_CODES = ("401",)
+
+# 默认连接池配置，可在 config["http"] 中覆盖，或在 config["systems"][系统] 中按系统覆盖
+DEFAULT_POOL = {
+    "pool_maxsize": 50,     # 每个系统的最大keep-alive连接数
+    "pool_block": True      # 连接用尽时等待（而不是新建后丢弃），并发超过上限时形成背压
+}
+
+
+def is_unauthenticated(status_code: int, result: Optional[Dict],
+                       codes=DEFAULT_UNAUTHENTICATED_CODES) -> bool:
+    """
+    响应是否表示未登录: HTTP 401，或响应体code为未登录码
+
+    Args:
+        status_code: HTTP状态码
+        result: 响应JSON（非JSON时为None）
+        codes: 未登录码
+    """
+    if status_code == 401:
+        return True
+    return isinstance(result, dict) and str(result.get("code")) in codes
+
 
 class AuthManager:
-    """认证管理器"""
+    """
+    认证管理器（线程安全）
+    
+    每个系统（admin/agent/merch）一个 requests.Session，各自的连接池和Cookie，
+    不同系统的Cookie互不覆盖；同一系统的登录/验证加锁，并发线程只登录一次。
+    """
     
-    def __init__(self, config: dict):
+    def __init__(self, config: dict, verify_interval: float = None):
         """
         初始化认证管理器
         
         Args:
             config: 配置字典，包含账户信息
+            verify_interval: Session验证间隔（秒），默认取 config["auth"]["verify_interval"]，
+                             未配置时为300；0 表示每次都验证
         """
         self.config = config
         self.cookies_dir = "./config/cookies"
-        self.session = requests.Session()
+        
+        self._sessions: Dict[str, requests.Session] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._pool_options: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+        
+        if verify_interval is None:
+            verify_interval = config.get("auth", {}).get("verify_interval", DEFAULT_VERIFY_INTERVAL)
+        self.verify_interval = verify_interval
+        self.unauthenticated_codes = tuple(
+            str(code) for code in config.get("auth", {}).get("unauthenticated_codes", DEFAULT_UNAUTHENTICATED_CODES)
+        )
+        
+        # 系统 -> {"verified_at": 上次验证/登录时间, "expires_at": Cookie过期时间}（time.time()）
+        self._valid: Dict[str, Dict[str, float]] = {}
+        self._saved_at: Dict[str, float] = {}  # 系统 -> 已加载Cookie的保存时间
+        self.stats = {"hits": 0, "verifications": 0, "logins": 0, "invalidations": 0}
+        self._stats_lock = threading.Lock()
         
         # 确保cookie目录存在
         os.makedirs(self.cookies_dir, exist_ok=True)
     
+    def _count(self, name: str):
+        with self._stats_lock:
+            self.stats[name] += 1
+    
+    # ============== Session池 ==============
+    def session_for(self, system: str) -> requests.Session:
+        """
+        获取系统的Session（首次调用时创建，之后复用；不做认证）
+        
+        Args:
+            system: 系统名称
+            
+        Returns:
+            Session: 该系统专用的Session
+        """
+        session = self._sessions.get(system)
+        if session is None:
+            with self._lock:
+                session = self._sessions.get(system)
+                if session is None:
+                    session = self._sessions[system] = self._create_session(system)
+                    self._locks[system] = threading.Lock()
+        return session
+    
+    def _create_session(self, system: str) -> requests.Session:
+        """创建带独立连接池的Session"""
+        options = dict(DEFAULT_POOL)
+        options.update(self.config.get("http", {}))
+        options.update({k: v for k, v in self.config["systems"][system].items() if k in DEFAULT_POOL})
+        
+        adapter = HTTPAdapter(
+            pool_connections=1,  # 每个系统只访问一个主机
+            pool_maxsize=options["pool_maxsize"],
+            pool_block=options["pool_block"]
+        )
+        session = requests.Session()
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        self._pool_options[system] = options
+        return session
+    
+    def pool_stats(self) -> Dict:
+        """各系统Session的连接池配置和Cookie数"""
+        return {
+            system: dict(self._pool_options[system], cookies=len(session.cookies))
+            for system, session in list(self._sessions.items())
+        }
+    
+    def close(self):
+        """关闭所有Session"""
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions.clear()
+            self._valid.clear()
+    
     def login(self, system: str, username: str, password: str) -> Dict:
         """
         登录系统获取Cookie
@@ -58,14 +173,20 @@ class AuthManager:
                 "password": password
             }
             
-            response = self.session.post(login_url, json=login_data, timeout=30)
+            session = self.session_for(system)
+            # 清掉旧Cookie，避免与新下发的同名Cookie并存
+            session.cookies.clear()
+            response = session.post(login_url, json=login_data, timeout=30)
             result = response.json()
             
             if result.get("code") == "0":
                 print(f"✅ 登录成功")
+                self._count("logins")
+                self._mark_valid(system, time.time())
                 # 保存Cookie
-                self._save_cookies(system, self.session.cookies.get_dict())
-                return {"success": True, "cookies": self.session.cookies.get_dict()}
+                cookies = session.cookies.get_dict()
+                self._save_cookies(system, cookies)
+                return {"success": True, "cookies": cookies}
             else:
                 print(f"❌ 登录失败: {result.get('msg')}")
                 return {"success": False, "error": result.get('msg')}
@@ -118,10 +239,11 @@ class AuthManager:
         save_time = time.strptime(cookie_data["save_time"], "%Y-%m-%d %H:%M:%S")
         save_timestamp = time.mktime(save_time)
         
-        if time.time() - save_timestamp > 24 * 3600:
+        if time.time() - save_timestamp > COOKIE_MAX_AGE:
             print(f"⚠️ Cookie已过期（超过24小时）")
             return None
         
+        self._saved_at[system] = save_timestamp
         print(f"📂 Cookie已加载: {system}")
         return cookie_data["cookies"]
     
@@ -129,36 +251,89 @@ class AuthManager:
         """
         获取已认证的Session
         
+        验证间隔内直接返回缓存的Session（不读Cookie文件、不请求验证接口）；
+        超过验证间隔、Cookie过期或被 invalidate() 后，才重新加载验证或登录。
+        
         Args:
             system: 系统名称
             
         Returns:
             Session: 已设置Cookie的Session，如果认证失败返回None
         """
-        # 尝试加载已有Cookie
-        cookies = self.load_cookies(system)
-        
-        if cookies:
-            self.session.cookies.update(cookies)
+        session = self.session_for(system)
+        if self.is_valid(system):
+            self._count("hits")
+            return session
+        
+        # 同一系统同时只有一个线程验证/登录，其余线程等待后复用结果
+        with self._locks[system]:
+            if self.is_valid(system):
+                self._count("hits")
+                return session
             
-            # 验证Cookie是否有效
-            if self._verify_session(system):
-                return self.session
-        
-        # 需要重新登录
-        account_key = "admin" if system == "admin" else "merchant"
-        account = self.config["accounts"][account_key]
-        
-        username_key = "username" if "username" in account else "id"
-        username = account[username_key]
-        password = account.get("password", "")
-        
-        result = self.login(system, username, password)
-        
-        if result["success"]:
-            return self.session
+            # 尝试加载已有Cookie
+            cookies = self.load_cookies(system)
+            
+            if cookies:
+                session.cookies.update(cookies)
+                
+                # 验证Cookie是否有效
+                self._count("verifications")
+                if self._verify_session(system):
+                    self._mark_valid(system, self._saved_at[system])
+                    return session
+            
+            self._valid.pop(system, None)
+            
+            # 需要重新登录
+            account_key = "admin" if system == "admin" else "merchant"
+            account = self.config["accounts"][account_key]
+            
+            username_key = "username" if "username" in account else "id"
+            username = account[username_key]
+            password = account.get("password", "")
+            
+            result = self.login(system, username, password)
+            
+            if result["success"]:
+                return session
+            
+            return None
+    
+    def is_valid(self, system: str) -> bool:
+        """系统Session是否在验证间隔内且Cookie未过期"""
+        state = self._valid.get(system)
+        if state is None:
+            return False
+        now = time.time()
+        return now < state["expires_at"] and now - state["verified_at"] < self.verify_interval
+    
+    def _mark_valid(self, system: str, saved_at: float):
+        """记录系统Session已验证（Cookie按保存时间计算过期）"""
+        self._valid[system] = {
+            "verified_at": time.time(),
+            "expires_at": saved_at + COOKIE_MAX_AGE
+        }
+    
+    def needs_login(self, status_code: int, result: Optional[Dict]) -> bool:
+        """响应是否表示Session已失效（HTTP 401，或响应体code为配置的未登录码）"""
+        return is_unauthenticated(status_code, result, self.unauthenticated_codes)
+    
+    def invalidate(self, system: str, since: float = None):
+        """
+        标记系统Session失效（收到401或未登录响应码时调用），下次获取时重新验证或登录
         
-        return None
+        Args:
+            system: 系统名称
+            since: 失败请求的发送时间（time.time()）；该时间之后已重新验证/登录的不再标记失效，
+                   避免多个线程同时收到401时重复登录
+        """
+        with self._lock:
+            state = self._valid.get(system)
+            if state is None or (since is not None and state["verified_at"] > since):
+                return
+            del self._valid[system]
+        self._count("invalidations")
     
     def _verify_session(self, system: str) -> bool:
         """
@@ -174,7 +349,7 @@ class AuthManager:
         verify_url = f"{base_url}/api/user/info"
         
         try:
-            response = self.session.get(verify_url, timeout=10)
+            response = self.session_for(system).get(verify_url, timeout=10)
             result = response.json()
             
             if result.get("code") == "0":
@@ -189,13 +364,51 @@ class AuthManager:
             return False
 
 
+class _TokenState:
+    """Token及其有效期（整体替换，读取方无需加锁）"""
+    
+    __slots__ = ("token", "expires_at", "refresh_at")
+    
+    def __init__(self, token: str, expires_at: float, refresh_at: float):
+        self.token = token
+        self.expires_at = expires_at
+        self.refresh_at = refresh_at
+
+
 class TokenAuth:
-    """Token认证类（用于API调用）"""
+    """
+    Token认证类（用于API调用，线程安全）
+    
+    1. 读取Token不加锁: 当前Token存为一个不可变对象，刷新时整体替换
+    2. 提前刷新: 使用超过 refresh_ahead 比例的有效期后，后台线程刷新，调用方仍拿到当前Token
+    3. 合并刷新: 同时只有一个刷新请求；Token已过期时，并发调用方等待同一次刷新的结果
+    4. 失败冷却: 刷新失败后 RETRY_DELAY 秒内不再请求，等待中的调用方直接返回None
+    """
+    
+    # 后台刷新失败后，多久再尝试（秒）
+    RETRY_DELAY = 5
     
-    def __init__(self, config: dict):
+    def __init__(self, config: dict, refresh_ahead: float = None):
+        """
+        初始化
+        
+        Args:
+            config: 配置字典
+            refresh_ahead: 提前刷新比例，默认取 config["auth"]["token_refresh_ahead"]，
+                           未配置时为0.8（>=1 关闭提前刷新）
+        """
         self.config = config
         self.token = None
         self.expire_time = None
+        
+        if refresh_ahead is None:
+            refresh_ahead = config.get("auth", {}).get("token_refresh_ahead", 0.8)
+        self.refresh_ahead = refresh_ahead
+        
+        self._state: Optional[_TokenState] = None
+        self._refresh_lock = threading.Lock()
+        self._retry_at = 0.0
+        self.stats = {"refreshes": 0, "background_refreshes": 0, "failures": 0}
     
     def get_token(self) -> Optional[str]:
         """
@@ -204,22 +417,51 @@ class TokenAuth:
         Returns:
             str: Token字符串
         """
-        # 检查Token是否过期
-        if self.token and self.expire_time and time.time() < self.expire_time:
-            return self.token
-        
-        # 重新获取Token
-        return self._refresh_token()
+        state = self._state
+        if state is not None:
+            now = time.monotonic()
+            if now < state.expires_at:
+                if now >= state.refresh_at:
+                    self._refresh_in_background()
+                return state.token
+        
+        # 没有Token或已过期: 等待刷新（并发调用方只刷新一次）
+        if time.monotonic() < self._retry_at:
+            return None
+        with self._refresh_lock:
+            state = self._state
+            now = time.monotonic()
+            if state is not None and now < state.expires_at:
+                return state.token
+            # 等待期间的刷新失败了: 与其共享失败结果，不再逐个重试
+            if now < self._retry_at:
+                return None
+            return self._refresh_token()
+    
+    def _refresh_in_background(self):
+        """启动后台刷新（已有刷新进行中或刚失败过时跳过）"""
+        if time.monotonic() < self._retry_at or not self._refresh_lock.acquire(blocking=False):
+            return
+        
+        def run():
+            try:
+                self.stats["background_refreshes"] += 1
+                self._refresh_token()
+            finally:
+                self._refresh_lock.release()
+        
+        threading.Thread(target=run, name="token-refresh", daemon=True).start()
     
     def _refresh_token(self) -> Optional[str]:
         """
-        刷新Token
+        刷新Token（调用方持有 _refresh_lock）
         
         Returns:
             str: 新Token
         """
         # TODO: 根据实际接口修改
         print("🔄 刷新Token...")
+        self.stats["refreshes"] += 1
         
         merchant = self.config["accounts"]["merchant"]
         
@@ -235,17 +477,23 @@ class TokenAuth:
             result = response.json()
             
             if result.get("code") == "0":
-                self.token = result["data"]["access_token"]
-                self.expire_time = time.time() + result["data"]["expires_in"]
+                token = result["data"]["access_token"]
+                ttl = result["data"]["expires_in"]
+                now = time.monotonic()
+                self._state = _TokenState(token, now + ttl, now + ttl * self.refresh_ahead)
+                self.token = token
+                self.expire_time = time.time() + ttl
                 print(f"✅ Token获取成功")
-                return self.token
+                return token
             else:
                 print(f"❌ Token获取失败: {result.get('msg')}")
-                return None
                 
         except Exception as e:
             print(f"❌ Token获取异常: {e}")
-            return None
+        
+        self.stats["failures"] += 1
+        self._retry_at = time.monotonic() + self.RETRY_DELAY
+        return None
     
     def get_auth_headers(self) -> Dict:
         """
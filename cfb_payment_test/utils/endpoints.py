@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+CFB支付系统 - API端点路由表
+每个业务操作的系统、请求方法、路径、幂等类别、超时在此声明一次，
+APIClient 初始化时按配置解析出完整URL，调用时按操作名直接查表
+
+幂等类别:
+1. QUERY: 只读查询，可安全重试
+2. IDEMPOTENT: 设置为目标状态（审核、冻结、更新配置等），重复执行结果相同
+3. NON_IDEMPOTENT: 创建订单、转账、调额等，重复执行会产生新的业务数据
+
+使用示例:
+    routes = build_routes(CONFIG)
+    route = routes["query_collection_order"]
+    print(route.system, route.method, route.url, route.idempotency, route.timeout)
+
+    # 压测/工具: 只取查询类端点
+    queries = [r for r in routes.values() if r.idempotency == QUERY]
+"""
+
+from typing import Dict, List, Tuple
+
+# 幂等类别
+QUERY = "query"
+IDEMPOTENT = "idempotent"
+NON_IDEMPOTENT = "non_idempotent"
+
+# 各幂等类别的默认超时（秒），可用 config["endpoint_timeouts"][操作名] 覆盖
+DEFAULT_TIMEOUTS = {
+    QUERY: 10,
+    IDEMPOTENT: 30,
+    NON_IDEMPOTENT: 30
+}
+
+# 操作名: (系统, 请求方法, 路径, 幂等类别)，操作名与APIClient的方法名一致
+ENDPOINTS: Dict[str, Tuple[str, str, str, str]] = {
+    # 商户管理
+    "create_merchant": ("admin", "POST", "/api/merchant/create", NON_IDEMPOTENT),
+    "query_merchant_list": ("admin", "POST", "/api/merchant/list", QUERY),
+    "get_merchant_status": ("admin", "POST", "/api/merchant/status", QUERY),
+    "approve_merchant": ("admin", "POST", "/api/merchant/approve", IDEMPOTENT),
+    "freeze_merchant": ("admin", "POST", "/api/merchant/freeze", IDEMPOTENT),
+    "unfreeze_merchant": ("admin", "POST", "/api/merchant/unfreeze", IDEMPOTENT),
+    "update_merchant_config": ("merch", "POST", "/api/merchant/config", IDEMPOTENT),
+
+    # 通道管理
+    "query_available_channels": ("merch", "POST", "/api/channel/list", QUERY),
+    "bind_channel": ("merch", "POST", "/api/channel/bind", IDEMPOTENT),
+    "query_channel_config": ("admin", "POST", "/api/channel/config", QUERY),
+    "update_channel_config": ("admin", "POST", "/api/channel/config", IDEMPOTENT),
+
+    # 代收
+    "create_collection_order": ("merch", "POST", "/api/order/collection/create", NON_IDEMPOTENT),
+    "query_collection_order": ("merch", "POST", "/api/order/collection/query", QUERY),
+
+    # 代付
+    "create_payment_order": ("merch", "POST", "/api/order/payment/create", NON_IDEMPOTENT),
+    "query_payment_order": ("merch", "POST", "/api/order/payment/query", QUERY),
+
+    # 退款
+    "create_refund_order": ("merch", "POST", "/api/order/refund/create", NON_IDEMPOTENT),
+    "query_refund_order": ("merch", "POST", "/api/order/refund/query", QUERY),
+
+    # 补单
+    "create_replenish_order": ("admin", "POST", "/api/order/replenish/create", NON_IDEMPOTENT),
+    "query_replenish_order": ("admin", "POST", "/api/order/replenish/query", QUERY),
+
+    # 调额
+    "adjust_limit": ("admin", "POST", "/api/merchant/limit/adjust", NON_IDEMPOTENT),
+    "query_limit": ("merch", "POST", "/api/merchant/limit/query", QUERY),
+
+    # 转账
+    "merchant_transfer": ("admin", "POST", "/api/transfer/merchant", NON_IDEMPOTENT),
+
+    # 归集
+    "manual_collection": ("merch", "POST", "/api/collection/manual", NON_IDEMPOTENT),
+    "auto_collection_status": ("merch", "POST", "/api/collection/auto/status", QUERY),
+
+    # 账户
+    "get_balance": ("merch", "POST", "/api/account/balance", QUERY),
+    "get_transaction_history": ("merch", "POST", "/api/account/history", QUERY)
+}
+
+
+class Route:
+    """解析后的端点（完整URL、超时已确定）"""
+
+    __slots__ = ("name", "system", "method", "path", "url", "idempotency", "timeout")
+
+    def __init__(self, name: str, system: str, method: str, path: str, url: str,
+                 idempotency: str, timeout: float):
+        self.name = name
+        self.system = system
+        self.method = method
+        self.path = path
+        self.url = url
+        self.idempotency = idempotency
+        self.timeout = timeout
+
+    @property
+    def retryable(self) -> bool:
+        """失败后重试是否安全（不会重复产生业务数据）"""
+        return self.idempotency != NON_IDEMPOTENT
+
+    def to_dict(self) -> Dict:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __repr__(self) -> str:
+        return f"Route({self.name}: {self.method} {self.url}, {self.idempotency}, {self.timeout}s)"
+
+
+def build_routes(config: dict) -> Dict[str, Route]:
+    """
+    按配置解析路由表
+
+    Args:
+        config: 配置字典（systems.*.url，可选 endpoint_timeouts）
+
+    Returns:
+        dict: 操作名 -> Route
+    """
+    overrides = config.get("endpoint_timeouts", {})
+    routes = {}
+    for name, (system, method, path, idempotency) in ENDPOINTS.items():
+        base_url = config["systems"][system]["url"].rstrip("/")
+        routes[name] = Route(
+            name, system, method, path, f"{base_url}{path}", idempotency,
+            overrides.get(name, DEFAULT_TIMEOUTS[idempotency])
+        )
+    return routes
+
+
+def describe(routes: Dict[str, Route]) -> List[Dict]:
+    """路由表转为字典列表（工具、压测脚本使用）"""
+    return [route.to_dict() for route in routes.values()]
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+BS/CFB支付系统 - 签名串构建
+
+所有签名/验签共用同一套规则:
+1. 排除 sign 字段
+2. 过滤空值（None 和 ""）
+3. 按键名ASCII排序
+4. 拼接为 k1=v1&k2=v2
+5. MD5签名再追加 &key=密钥
+
+快速路径:
+- 签名串写入线程内复用的缓冲区，不构建中间dict/排序列表
+- 为端点预编译字段顺序（FieldSchema），参数键都在字段表内时跳过排序
+
+作者: OpenClaw
+日期: 2026-02-11
+"""
+
+import hashlib
+import threading
+from typing import Dict, Iterable, Optional
+
+# 不参与签名的字段
+EXCLUDED_FIELDS = frozenset({"sign"})
+
+_MISSING = object()
+
+
+class FieldSchema:
+    """预编译的端点字段表（按ASCII顺序）"""
+
+    __slots__ = ("name", "fields", "_pairs")
+
+    def __init__(self, name: str, fields: Iterable[str]):
+        """
+        Args:
+            name: 名称（通常为API端点）
+            fields: 端点可能出现的全部字段
+        """
+        self.name = name
+        self.fields = tuple(sorted(set(fields) - EXCLUDED_FIELDS))
+        # 预先拼好 "key=" 前缀
+        self._pairs = tuple((f, f + "=") for f in self.fields)
+
+    def __repr__(self) -> str:
+        return f"FieldSchema({self.name!r}, {len(self.fields)} fields)"
+
+
+class SignStringBuilder:
+    """签名串构建器（每个线程复用一个缓冲区）"""
+
+    def __init__(self):
+        self._local = threading.local()
+
+    def _buffer(self) -> list:
+        buf = getattr(self._local, "buf", None)
+        if buf is None:
+            buf = self._local.buf = []
+        return buf
+
+    def build(self, params: Dict, schema: Optional[FieldSchema] = None) -> str:
+        """
+        构建签名串
+
+        Args:
+            params: 参数字典
+            schema: 端点字段表（可选）；参数出现字段表外的键时自动回退到排序路径
+
+        Returns:
+            签名串
+        """
+        buf = self._buffer()
+        try:
+            if schema is not None:
+                present = 0
+                for field, prefix in schema._pairs:
+                    value = params.get(field, _MISSING)
+                    if value is _MISSING:
+                        continue
+                    present += 1
+                    if value is None or value == "":
+                        continue
+                    buf.append(prefix + str(value))
+
+                if present == len(params) - ("sign" in params):
+                    return "&".join(buf)
+                buf.clear()
+
+            for key in sorted(params):
+                if key in EXCLUDED_FIELDS:
+                    continue
+                value = params[key]
+                if value is None or value == "":
+                    continue
+                buf.append(f"{key}={value}")
+            return "&".join(buf)
+        finally:
+            buf.clear()
+
+
+# ============== 默认实例与端点字段表 ==============
+_builder = SignStringBuilder()
+_schemas: Dict[str, FieldSchema] = {}
+
+
+def register_schema(name: str, fields: Iterable[str]) -> FieldSchema:
+    """注册端点字段表"""
+    schema = FieldSchema(name, fields)
+    _schemas[name] = schema
+    return schema
+
+
+def get_schema(name: str) -> Optional[FieldSchema]:
+    """获取端点字段表，未注册返回None"""
+    return _schemas.get(name)
+
+
+def build_sign_string(params: Dict, schema: Optional[FieldSchema] = None) -> str:
+    """构建签名串（不含密钥）"""
+    return _builder.build(params, schema)
+
+
+def md5_sign(params: Dict, secret_key: str, schema: Optional[FieldSchema] = None) -> str:
+    """
+    MD5签名（32位小写）
+
+    Args:
+        params: 参数字典
+        secret_key: 商户密钥
+        schema: 端点字段表（可选）
+
+    Returns:
+        签名字符串
+    """
+    sign_str = _builder.build(params, schema) + "&key=" + secret_key
+    return hashlib.md5(sign_str.encode("utf-8")).hexdigest()
@@ -10,14 +10,17 @@ CFB支付系统 - 签名模块
 3. 签名验证
 """
 
-import hashlib
 import json
 import time
 import random
-from typing import Dict, Optional
-from cryptography.hazmat.primitives import hashes, serialization
+from typing import Dict, List, Optional
+from cryptography.hazmat.primitives import hashes
 from cryptography.hazmat.primitives.asymmetric import padding
-from cryptography.hazmat.backends import default_backend
+
+# 密钥注册表（PEM只解析一次）、签名串构建、批量签名: 与 bs_payment_test 同名模块保持一致的副本
+from keystore import KEY_REGISTRY
+from sign_string import build_sign_string, md5_sign
+from batch_sign import get_batch_signer
 
 
 class SignatureManager:
@@ -45,21 +48,8 @@ class SignatureManager:
         Returns:
             str: 签名结果
         """
-        # 1. 过滤空值和None
-        filtered = {k: v for k, v in params.items() 
-                   if v is not None and str(v).strip() != ""}
-        
-        # 2. 排序（按key字母顺序）
-        sorted_items = sorted(filtered.items(), key=lambda x: x[0])
-        
-        # 3. 拼接签名串
-        sign_str = "&".join([f"{k}={v}" for k, v in sorted_items])
-        sign_str += f"&key={api_key}"
-        
-        # 4. MD5加密并转小写
-        sign_result = hashlib.md5(sign_str.encode('utf-8')).hexdigest().lower()
-        
-        return sign_result
+        # 过滤空值 → 排序 → 拼接签名串 → 追加密钥 → MD5（小写）
+        return md5_sign(params, api_key)
     
     def rsa_sign(self, params: Dict, private_key: str) -> str:
         """
@@ -72,22 +62,11 @@ class SignatureManager:
         Returns:
             str: 签名结果（Base64编码）
         """
-        # 1. 过滤空值
-        filtered = {k: v for k, v in params.items() 
-                   if v is not None and str(v).strip() != ""}
-        
-        # 2. 排序
-        sorted_items = sorted(filtered.items(), key=lambda x: x[0])
-        
-        # 3. 拼接签名串
-        sign_str = "&".join([f"{k}={v}" for k, v in sorted_items])
+        # 1-3. 过滤空值、排序、拼接签名串
+        sign_str = build_sign_string(params)
         
-        # 4. 加载私钥
-        private_key_obj = serialization.load_pem_private_key(
-            private_key.encode('utf-8'),
-            password=None,
-            backend=default_backend()
-        )
+        # 4. 加载私钥（按指纹缓存）
+        private_key_obj = KEY_REGISTRY.private_key(private_key)
         
         # 5. RSA签名
         signature = private_key_obj.sign(
@@ -100,6 +79,34 @@ class SignatureManager:
         import base64
         return base64.b64encode(signature).decode('utf-8')
     
+    def sign_many(self,
+                  params_list: List[Dict],
+                  private_key: Optional[str] = None,
+                  workers: Optional[int] = None,
+                  executor: str = "process") -> List[str]:
+        """
+        RSA批量签名（SHA256，多进程并行）
+        
+        Args:
+            params_list: 请求参数字典列表
+            private_key: RSA私钥（默认使用配置中的商户私钥）
+            workers: 工作进程数（默认CPU核数）
+            executor: process（进程池）或 thread（线程池）
+            
+        Returns:
+            list: 签名列表（Base64编码），与输入顺序一致
+            
+        Raises:
+            ValueError: 私钥为空或无法解析（在启动进程池之前检查）
+        """
+        if private_key is None:
+            private_key = self.config.get("accounts", {}).get("merchant", {}).get("rsa_private_key", "")
+        if not private_key:
+            raise ValueError("未配置商户RSA私钥（accounts.merchant.rsa_private_key），无法批量签名")
+        
+        signer = get_batch_signer(private_key, "SHA256", workers, executor)
+        return signer.sign_many(params_list)
+    
     def rsa_verify(self, params: Dict, signature: str, public_key: str) -> bool:
         """
         RSA签名验证
@@ -112,21 +119,11 @@ class SignatureManager:
         Returns:
             bool: 签名是否有效
         """
-        # 1. 过滤空值
-        filtered = {k: v for k, v in params.items() 
-                   if v is not None and str(v).strip() != ""}
-        
-        # 2. 排序
-        sorted_items = sorted(filtered.items(), key=lambda x: x[0])
+        # 1-3. 过滤空值、排序、拼接签名串
+        sign_str = build_sign_string(params)
         
-        # 3. 拼接签名串
-        sign_str = "&".join([f"{k}={v}" for k, v in sorted_items])
-        
-        # 4. 加载公钥
-        public_key_obj = serialization.load_pem_public_key(
-            public_key.encode('utf-8'),
-            backend=default_backend()
-        )
+        # 4. 加载公钥（按指纹缓存）
+        public_key_obj = KEY_REGISTRY.public_key(public_key)
         
         # 5. Base64解码签名
         import base64
@@ -144,6 +141,24 @@ class SignatureManager:
         except Exception:
             return False
     
+    def rotate_key(self, name: str, new_pem: str, private: bool = True) -> str:
+        """
+        轮换密钥（旧密钥对象从缓存中淘汰）
+        
+        Args:
+            name: 密钥名称
+            new_pem: 新PEM内容
+            private: 是否为私钥
+            
+        Returns:
+            str: 新密钥指纹
+        """
+        return KEY_REGISTRY.rotate(name, new_pem, private)
+    
+    def evict_key(self, pem_or_fingerprint: str):
+        """从缓存中淘汰密钥"""
+        KEY_REGISTRY.evict(pem_or_fingerprint)
+    
     def generate_signature_params(self, 
                                  params: Dict, 
                                  api_key: str,